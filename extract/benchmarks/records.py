@@ -0,0 +1,81 @@
+"""
+Benchmark the memory held per Tweet as parsed dicts and as records.
+
+Run from the extract directory:
+
+    python -m benchmarks.records --n_tweets 100000
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from time import perf_counter
+
+from util.json_codec import get_codec
+from util.records import page_tweets
+
+
+def make_page(n_tweets: int) -> bytes:
+    """A search response shaped like the graph field profile's"""
+    return json.dumps(
+        {
+            "data": [
+                {
+                    "id": str(1600000000000000000 + i),
+                    "author_id": str(100000 + i % 5000),
+                    "created_at": "2022-12-01T12:34:56.000Z",
+                    "lang": "en",
+                    "text": f"Tweet number {i} about #python and #rust",
+                    "entities": {
+                        "hashtags": [
+                            {"start": 23, "end": 30, "tag": "python"},
+                            {"start": 35, "end": 40, "tag": "rust"},
+                        ]
+                    },
+                    "referenced_tweets": [
+                        {"type": "quoted", "id": str(1500000000000000000 + i)}
+                    ],
+                }
+                for i in range(n_tweets)
+            ],
+            "meta": {"result_count": n_tweets},
+        }
+    ).encode("utf-8")
+
+
+def measure(build):
+    """The bytes still allocated by, and seconds taken to run, `build`"""
+    gc.collect()
+    tracemalloc.start()
+    start = perf_counter()
+    held = build()
+    elapsed = perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n_tweets", type=int, default=100_000)
+    args = parser.parse_args()
+
+    codec = get_codec()
+    body = make_page(args.n_tweets)
+    results = {
+        "dicts": measure(lambda: codec.loads(body)["data"]),
+        "records": measure(lambda: page_tweets(codec.loads(body))),
+    }
+    for name, (size, elapsed) in results.items():
+        print(
+            f"{name:<8} {size / args.n_tweets:7.0f} bytes/tweet"
+            + f"  {elapsed * 1000:8.1f} ms"
+        )
+    ratio = results["records"][0] / results["dicts"][0]
+    print(f"records hold {ratio:.0%} of the memory of dicts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark how long the extract CLI takes to start.
+
+Run from the extract directory:
+
+    python -m benchmarks.startup --runs 20
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+COMMANDS = {
+    "python -c pass": [sys.executable, "-c", "pass"],
+    "main.py --help": [sys.executable, "main.py", "--help"],
+}
+
+
+def time_command(command: list, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = perf_counter()
+        subprocess.run(command, check=True, capture_output=True)
+        timings.append(perf_counter() - start)
+    return timings
+
+
+def slowest_imports(command: list, n: int = 10) -> list:
+    """The `n` top-level imports with the largest cumulative import time."""
+    result = subprocess.run(
+        [command[0], "-X", "importtime", *command[1:]],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        if not name.startswith("  "):
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    for name, command in COMMANDS.items():
+        timings = time_command(command, args.runs)
+        print(
+            f"{name:<20} median {statistics.median(timings) * 1000:7.1f} ms"
+            + f"  min {min(timings) * 1000:7.1f} ms"
+        )
+
+    print(f"\n{'Slowest imports for main.py --help':-^40}")
+    for cumulative, name in slowest_imports(COMMANDS["main.py --help"]):
+        print(f"{cumulative / 1000:7.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
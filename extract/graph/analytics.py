@@ -0,0 +1,220 @@
+from typing import IO, Iterable, Optional, Tuple
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from graph.cooccurrence import HashtagGraph, merge_weights
+
+
+def weighted_degree(adjacency) -> np.ndarray:
+    """The total edge weight at every node"""
+    return np.asarray(adjacency.sum(axis=1)).ravel()
+
+
+def pagerank(
+    adjacency,
+    damping: float = 0.85,
+    tol: float = 1e-10,
+    max_iter: int = 100,
+) -> np.ndarray:
+    """
+    PageRank by power iteration over a weighted adjacency matrix
+
+    Parameters
+    ----------
+    adjacency: scipy.sparse.csr_matrix
+        Square matrix of edge weights, row to column
+    damping: float
+        Probability of following an edge rather than jumping at random
+    tol: float
+        Stop once the L1 change between iterations falls below this
+    max_iter: int
+        Stop after this many iterations regardless
+
+    Returns
+    -------
+    ranks: np.ndarray
+        One rank per node, summing to 1
+    """
+    from scipy import sparse
+
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_weight = weighted_degree(adjacency)
+    dangling = out_weight == 0
+    inverse = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    # column-stochastic transition matrix, so one step is a single SpMV
+    transition = (sparse.diags(inverse) @ adjacency).T.tocsr()
+
+    ranks = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        # nodes without edges spread their rank evenly over every node
+        jump = (1 - damping + damping * ranks[dangling].sum()) / n
+        updated = damping * (transition @ ranks) + jump
+        change = np.abs(updated - ranks).sum()
+        ranks = updated
+        if change < tol:
+            break
+    return ranks / ranks.sum()
+
+
+def top_k_neighbours(
+    adjacency, k: int = 10
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The k heaviest neighbours of every node, heaviest first
+
+    Ties are broken by the lower neighbour id.
+
+    Returns
+    -------
+    sources, targets, weights, ranks: Tuple[np.ndarray, ...]
+        One entry per kept edge, where `ranks` counts from 1
+    """
+    adjacency = adjacency.tocsr()
+    adjacency.sort_indices()
+    sources = np.repeat(
+        np.arange(adjacency.shape[0]), np.diff(adjacency.indptr)
+    )
+    # rows stay in order, and within a row the heaviest come first
+    order = np.lexsort((adjacency.indices, -adjacency.data, sources))
+    sources = sources[order]
+    ranks = np.arange(len(order)) - adjacency.indptr[sources]
+    keep = ranks < k
+    return (
+        sources[keep],
+        adjacency.indices[order][keep],
+        adjacency.data[order][keep],
+        ranks[keep] + 1,
+    )
+
+
+def label_propagation(
+    adjacency,
+    max_iter: int = 50,
+    update_fraction: float = 0.5,
+    seed: Optional[int] = 0,
+) -> np.ndarray:
+    """
+    Community detection by weighted label propagation
+
+    Every node starts in its own community and repeatedly adopts the
+    label carrying the most edge weight among its neighbours, keeping
+    its current label on a tie. Each iteration scores every node at
+    once, but only a random `update_fraction` of them move, which stops
+    the oscillation that fully synchronous updates fall into.
+
+    Returns
+    -------
+    communities: np.ndarray
+        A community id per node, numbered from 0 by decreasing size
+    """
+    adjacency = adjacency.tocoo()
+    n = adjacency.shape[0]
+    rng = np.random.default_rng(seed)
+    labels = np.arange(n)
+    rows = adjacency.row.astype(np.int64)
+    for _ in range(max_iter):
+        keys, weights = merge_weights(
+            rows * n + labels[adjacency.col], adjacency.data
+        )
+        nodes, candidates = keys // n, keys % n
+        order = np.lexsort(
+            (candidates, candidates != labels[nodes], -weights, nodes)
+        )
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = nodes[order][1:] != nodes[order][:-1]
+        best = labels.copy()
+        best[nodes[order][first]] = candidates[order][first]
+
+        changed = best != labels
+        if not changed.any():
+            break
+        move = changed & (rng.random(n) < update_fraction)
+        labels = np.where(move, best, labels)
+
+    _, communities, sizes = np.unique(
+        labels, return_inverse=True, return_counts=True
+    )
+    by_size = np.empty(len(sizes), dtype=np.int64)
+    by_size[np.argsort(-sizes, kind="stable")] = np.arange(len(sizes))
+    return by_size[communities]
+
+
+@dataclass
+class GraphAnalytics:
+    """
+    Per-hashtag rankings and communities of a HashtagGraph
+    """
+
+    graph: HashtagGraph
+    top_k: int = 10
+    damping: float = 0.85
+
+    def __post_init__(self):
+        adjacency = self.graph.to_csr()
+        self.degree = weighted_degree(adjacency)
+        self.pagerank = pagerank(adjacency, damping=self.damping)
+        self.community = label_propagation(adjacency)
+        self.neighbours = top_k_neighbours(adjacency, k=self.top_k)
+
+    def node_rows(self) -> Iterable[dict]:
+        """Rows of the `hashtag_nodes` table"""
+        for tag, tweet_count, degree, rank, community in zip(
+            self.graph.vocabulary.tags,
+            self.graph.node_counts.tolist(),
+            self.degree.tolist(),
+            self.pagerank.tolist(),
+            self.community.tolist(),
+        ):
+            yield {
+                "hashtag": tag,
+                "tweet_count": tweet_count,
+                "weighted_degree": int(degree),
+                "pagerank": rank,
+                "community": community,
+            }
+
+    def neighbour_rows(self) -> Iterable[dict]:
+        """Rows of the `hashtag_neighbours` table"""
+        tags = self.graph.vocabulary.tags
+        sources, targets, weights, ranks = self.neighbours
+        for source, target, weight, rank in zip(
+            sources.tolist(),
+            targets.tolist(),
+            weights.tolist(),
+            ranks.tolist(),
+        ):
+            yield {
+                "hashtag": tags[source],
+                "neighbour": tags[target],
+                "weight": int(weight),
+                "rank": rank,
+            }
+
+    @staticmethod
+    def _write_rows(rows: Iterable[dict], f: IO[str]) -> None:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+    def write_tables(self, directory: str) -> Tuple[str, str]:
+        """
+        Write `hashtag_nodes.jsonl` and `hashtag_neighbours.jsonl`,
+        one JSON row per line, matching the tables in load/queries/tables.py
+
+        Returns
+        -------
+        filenames: Tuple[str, str]
+            The nodes and neighbours files
+        """
+        os.makedirs(directory, exist_ok=True)
+        nodes_file = os.path.join(directory, "hashtag_nodes.jsonl")
+        neighbours_file = os.path.join(directory, "hashtag_neighbours.jsonl")
+        with open(nodes_file, "w") as f:
+            self._write_rows(self.node_rows(), f)
+        with open(neighbours_file, "w") as f:
+            self._write_rows(self.neighbour_rows(), f)
+        return nodes_file, neighbours_file
@@ -0,0 +1,243 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from array import array
+from itertools import combinations
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from util.file_formats import iter_pages
+from util.records import HashtagEdge, Tweet, page_tweets
+
+# edges (i, j) with i < j are packed into one int64 as i << 32 | j
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+
+
+def pack_edges(rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    return (rows.astype(np.int64) << ID_BITS) | cols.astype(np.int64)
+
+
+def unpack_edges(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    return keys >> ID_BITS, keys & ID_MASK
+
+
+def merge_weights(
+    keys: np.ndarray, weights: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum the weights of duplicate keys
+
+    Returns
+    -------
+    keys, weights: np.ndarray
+        Sorted unique keys, and their summed weights
+    """
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    summed = np.bincount(inverse, weights=weights, minlength=len(unique_keys))
+    return unique_keys, summed.astype(np.int64)
+
+
+@dataclass
+class HashtagVocabulary:
+    """
+    Interns hashtags to dense integer ids, in order of first appearance.
+    """
+
+    tags: List[str] = field(default_factory=list)
+    ids: Dict[str, int] = field(default_factory=dict, init=False)
+
+    def __post_init__(self):
+        self.ids = {tag: index for index, tag in enumerate(self.tags)}
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def intern(self, tag: str) -> int:
+        tag_id = self.ids.get(tag)
+        if tag_id is None:
+            tag_id = self.ids[tag] = len(self.tags)
+            self.tags.append(tag)
+        return tag_id
+
+    def encode(self) -> np.ndarray:
+        """The tags as newline-separated UTF-8 bytes"""
+        return np.frombuffer("\n".join(self.tags).encode("utf-8"), np.uint8)
+
+    @classmethod
+    def decode(cls, data: np.ndarray) -> "HashtagVocabulary":
+        text = data.tobytes().decode("utf-8")
+        return cls(tags=text.split("\n") if text else [])
+
+
+@dataclass
+class HashtagGraph:
+    """
+    Undirected, weighted hashtag co-occurrence graph in COO form.
+
+    Each edge is stored once, with `rows < cols`. `node_counts` holds
+    the number of Tweets each hashtag appeared in.
+    """
+
+    vocabulary: HashtagVocabulary
+    rows: np.ndarray
+    cols: np.ndarray
+    weights: np.ndarray
+    node_counts: np.ndarray
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.vocabulary)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.weights)
+
+    def save(self, path: str) -> None:
+        """Write the graph as an uncompressed .npz, for fast loading"""
+        np.savez(
+            path,
+            rows=self.rows.astype(np.uint32),
+            cols=self.cols.astype(np.uint32),
+            weights=self.weights,
+            node_counts=self.node_counts,
+            tags=self.vocabulary.encode(),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "HashtagGraph":
+        with np.load(path) as data:
+            return cls(
+                vocabulary=HashtagVocabulary.decode(data["tags"]),
+                rows=data["rows"].astype(np.int64),
+                cols=data["cols"].astype(np.int64),
+                weights=data["weights"],
+                node_counts=data["node_counts"],
+            )
+
+    def edges(self) -> Iterable[HashtagEdge]:
+        tags = self.vocabulary.tags
+        for row, col, weight in zip(
+            self.rows.tolist(), self.cols.tolist(), self.weights.tolist()
+        ):
+            yield HashtagEdge(tags[row], tags[col], weight)
+
+    def to_csr(self):
+        """
+        The symmetric adjacency matrix as a scipy.sparse.csr_matrix
+        """
+        from scipy import sparse
+
+        return sparse.coo_matrix(
+            (
+                np.concatenate([self.weights, self.weights]).astype(
+                    np.float64
+                ),
+                (
+                    np.concatenate([self.rows, self.cols]),
+                    np.concatenate([self.cols, self.rows]),
+                ),
+            ),
+            shape=(self.n_nodes, self.n_nodes),
+        ).tocsr()
+
+
+@dataclass
+class CooccurrenceBuilder:
+    """
+    Streams Tweets into a hashtag co-occurrence graph.
+
+    Edge keys are buffered in a compact int64 array and periodically folded
+    into sorted unique keys with summed weights, so memory grows with the
+    number of distinct hashtags and edges rather than the number of Tweets.
+    """
+
+    buffer_size: int = 1 << 22
+    vocabulary: HashtagVocabulary = field(default_factory=HashtagVocabulary)
+    keys: np.ndarray = field(
+        default_factory=lambda: np.empty(0, np.int64), init=False
+    )
+    weights: np.ndarray = field(
+        default_factory=lambda: np.empty(0, np.int64), init=False
+    )
+    node_counts: array = field(default_factory=lambda: array("q"), init=False)
+    _buffer: array = field(default_factory=lambda: array("q"), init=False)
+
+    def add_hashtags(self, hashtags: Iterable[str]) -> None:
+        """Add one Tweet's hashtags"""
+        tag_ids = sorted({self.vocabulary.intern(tag) for tag in hashtags})
+        if not tag_ids:
+            return
+        if len(self.node_counts) < len(self.vocabulary):
+            self.node_counts.extend(
+                [0] * (len(self.vocabulary) - len(self.node_counts))
+            )
+        for tag_id in tag_ids:
+            self.node_counts[tag_id] += 1
+        for row, col in combinations(tag_ids, 2):
+            self._buffer.append(row << ID_BITS | col)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def add_tweet(self, tweet: Tweet) -> None:
+        self.add_hashtags(tag.casefold() for tag in tweet.hashtags)
+
+    def add_page(self, page: dict) -> None:
+        for tweet in page_tweets(page):
+            self.add_tweet(tweet)
+
+    def add_file(self, filename: str) -> None:
+        for page in iter_pages(filename):
+            self.add_page(page)
+
+    def flush(self) -> None:
+        """Fold buffered edges into the sorted edge arrays"""
+        if not self._buffer:
+            return
+        buffered = np.frombuffer(self._buffer, dtype=np.int64)
+        self.keys, self.weights = merge_weights(
+            np.concatenate([self.keys, buffered]),
+            np.concatenate([self.weights, np.ones(len(buffered), np.int64)]),
+        )
+        self._buffer = array("q")
+
+    def build(self) -> HashtagGraph:
+        self.flush()
+        rows, cols = unpack_edges(self.keys)
+        node_counts = np.zeros(len(self.vocabulary), np.int64)
+        node_counts[: len(self.node_counts)] = np.frombuffer(
+            self.node_counts, dtype=np.int64
+        )
+        return HashtagGraph(
+            vocabulary=self.vocabulary,
+            rows=rows,
+            cols=cols,
+            weights=self.weights.copy(),
+            node_counts=node_counts,
+        )
+
+
+def build_graph(
+    filenames: Iterable[str], buffer_size: Optional[int] = None
+) -> HashtagGraph:
+    """
+    Build the hashtag co-occurrence graph of every Tweet in some JSONL files
+
+    Parameters
+    ----------
+    filenames: Iterable[str]
+        JSONL files of pages, as written by extract/main.py
+    buffer_size: Optional[int]
+        Number of edges to buffer between merges
+
+    Returns
+    -------
+    graph: HashtagGraph
+    """
+    builder = (
+        CooccurrenceBuilder()
+        if buffer_size is None
+        else CooccurrenceBuilder(buffer_size=buffer_size)
+    )
+    for filename in filenames:
+        builder.add_file(filename)
+    return builder.build()
@@ -0,0 +1,306 @@
+from typing import Dict, Iterable, List, Optional
+import hashlib
+import json
+import os
+import re
+from datetime import date, timedelta
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from graph.cooccurrence import (
+    CooccurrenceBuilder,
+    HashtagGraph,
+    HashtagVocabulary,
+    merge_weights,
+    unpack_edges,
+)
+
+DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def file_date(filename: str) -> str:
+    """
+    The extraction date in a file name, e.g. `#python_2022-12-01.jsonl`
+    """
+    matches = DATE_PATTERN.findall(os.path.basename(filename))
+    if not matches:
+        raise ValueError(f"No YYYY-MM-DD date in {filename}")
+    return matches[-1]
+
+
+def fingerprint(filename: str) -> str:
+    stat = os.stat(filename)
+    identity = (
+        f"{os.path.basename(filename)}:{stat.st_size}:{stat.st_mtime_ns}"
+    )
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class EdgeDelta:
+    """
+    Edge and node weights contributed by some Tweets, keyed by global ids.
+    """
+
+    keys: np.ndarray = field(default_factory=lambda: np.empty(0, np.int64))
+    weights: np.ndarray = field(default_factory=lambda: np.empty(0, np.int64))
+    node_ids: np.ndarray = field(default_factory=lambda: np.empty(0, np.int64))
+    node_counts: np.ndarray = field(
+        default_factory=lambda: np.empty(0, np.int64)
+    )
+
+    def __add__(self, other: "EdgeDelta") -> "EdgeDelta":
+        keys, weights = merge_weights(
+            np.concatenate([self.keys, other.keys]),
+            np.concatenate([self.weights, other.weights]),
+        )
+        node_ids, node_counts = merge_weights(
+            np.concatenate([self.node_ids, other.node_ids]),
+            np.concatenate([self.node_counts, other.node_counts]),
+        )
+        return EdgeDelta(keys, weights, node_ids, node_counts).prune()
+
+    def __neg__(self) -> "EdgeDelta":
+        return EdgeDelta(
+            self.keys, -self.weights, self.node_ids, -self.node_counts
+        )
+
+    def __sub__(self, other: "EdgeDelta") -> "EdgeDelta":
+        return self + -other
+
+    def prune(self) -> "EdgeDelta":
+        """Drop edges and nodes whose weight has gone to zero"""
+        edges = self.weights != 0
+        nodes = self.node_counts != 0
+        return EdgeDelta(
+            self.keys[edges],
+            self.weights[edges],
+            self.node_ids[nodes],
+            self.node_counts[nodes],
+        )
+
+    @classmethod
+    def from_builder(cls, builder: CooccurrenceBuilder) -> "EdgeDelta":
+        builder.flush()
+        node_counts = np.frombuffer(builder.node_counts, dtype=np.int64)
+        node_ids = np.flatnonzero(node_counts)
+        return cls(
+            builder.keys,
+            builder.weights,
+            node_ids.astype(np.int64),
+            node_counts[node_ids],
+        )
+
+    def save(self, path: str, **extra: np.ndarray) -> None:
+        temp_path = f"{path}.tmp.npz"
+        np.savez(
+            temp_path,
+            keys=self.keys,
+            weights=self.weights,
+            node_ids=self.node_ids,
+            node_counts=self.node_counts,
+            **extra,
+        )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "EdgeDelta":
+        with np.load(path) as data:
+            return cls(
+                data["keys"],
+                data["weights"],
+                data["node_ids"],
+                data["node_counts"],
+            )
+
+    def to_graph(self, vocabulary: HashtagVocabulary) -> HashtagGraph:
+        rows, cols = unpack_edges(self.keys)
+        node_counts = np.zeros(len(vocabulary), np.int64)
+        node_counts[self.node_ids] = self.node_counts
+        return HashtagGraph(
+            vocabulary=vocabulary,
+            rows=rows,
+            cols=cols,
+            weights=self.weights,
+            node_counts=node_counts,
+        )
+
+
+@dataclass
+class Window:
+    """
+    The graph of the `n_days` days up to and including `end`.
+    """
+
+    end: date
+    n_days: int
+    delta: EdgeDelta
+
+    @property
+    def dates(self) -> List[str]:
+        return [
+            (self.end - timedelta(days=offset)).isoformat()
+            for offset in range(self.n_days)
+        ]
+
+
+@dataclass
+class GraphStore:
+    """
+    Incrementally maintained hashtag graph, stored in a directory.
+
+    Each extracted file's edges are kept as a delta under
+    `deltas/<date>/`, and `total.npz` holds the sum of every merged delta
+    along with which version of each file it includes. Merging a file
+    again replaces its previous contribution rather than adding to it,
+    so re-processing is idempotent. The vocabulary is append-only, so
+    hashtag ids are stable across merges.
+    """
+
+    directory: str
+    vocabulary: HashtagVocabulary = field(init=False)
+
+    def __post_init__(self):
+        os.makedirs(os.path.join(self.directory, "deltas"), exist_ok=True)
+        self.vocabulary = HashtagVocabulary()
+        if os.path.exists(self.vocabulary_path):
+            with open(self.vocabulary_path, "rb") as f:
+                self.vocabulary = HashtagVocabulary.decode(
+                    np.frombuffer(f.read(), np.uint8)
+                )
+
+    @property
+    def vocabulary_path(self) -> str:
+        return os.path.join(self.directory, "vocabulary.txt")
+
+    @property
+    def total_path(self) -> str:
+        return os.path.join(self.directory, "total.npz")
+
+    def delta_path(self, source: str, version: str) -> str:
+        return os.path.join(
+            self.directory,
+            "deltas",
+            file_date(source),
+            f"{source}.{version}.npz",
+        )
+
+    def included(self) -> Dict[str, str]:
+        """Each merged file name and the version of it in the total"""
+        if not os.path.exists(self.total_path):
+            return {}
+        with np.load(self.total_path) as data:
+            return json.loads(data["included"].tobytes().decode("utf-8"))
+
+    def total(self) -> EdgeDelta:
+        if not os.path.exists(self.total_path):
+            return EdgeDelta()
+        return EdgeDelta.load(self.total_path)
+
+    def _save_vocabulary(self) -> None:
+        temp_path = f"{self.vocabulary_path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.vocabulary.encode().tobytes())
+        os.replace(temp_path, self.vocabulary_path)
+
+    def merge(self, filenames: Iterable[str]) -> List[str]:
+        """
+        Merge extracted files into the graph
+
+        Parameters
+        ----------
+        filenames: Iterable[str]
+            JSONL files of pages, named with their extraction date
+
+        Returns
+        -------
+        merged: List[str]
+            The files that were new or changed since they were last merged
+        """
+        included = self.included()
+        total = self.total()
+        replaced = []
+        merged = []
+        for filename in filenames:
+            source = os.path.basename(filename)
+            version = fingerprint(filename)
+            if included.get(source) == version:
+                continue
+
+            builder = CooccurrenceBuilder(vocabulary=self.vocabulary)
+            builder.add_file(filename)
+            delta = EdgeDelta.from_builder(builder)
+
+            path = self.delta_path(source, version)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            delta.save(path)
+
+            total = total + delta
+            if source in included:
+                old_path = self.delta_path(source, included[source])
+                total = total - EdgeDelta.load(old_path)
+                replaced.append(old_path)
+            included[source] = version
+            merged.append(filename)
+
+        if not merged:
+            return merged
+
+        # the vocabulary only grows, so saving it first is always safe;
+        # writing the total commits the merge
+        self._save_vocabulary()
+        total.save(
+            self.total_path,
+            included=np.frombuffer(
+                json.dumps(included, sort_keys=True).encode("utf-8"), np.uint8
+            ),
+        )
+        for path in replaced:
+            os.remove(path)
+        return merged
+
+    def day(
+        self, day: str, included: Optional[Dict[str, str]] = None
+    ) -> EdgeDelta:
+        """The sum of every merged file for one date"""
+        if included is None:
+            included = self.included()
+        delta = EdgeDelta()
+        for source, version in included.items():
+            if file_date(source) == day:
+                delta = delta + EdgeDelta.load(
+                    self.delta_path(source, version)
+                )
+        return delta
+
+    def window(self, end: date, n_days: int) -> Window:
+        """The graph of the `n_days` days up to and including `end`"""
+        included = self.included()
+        window = Window(end=end, n_days=n_days, delta=EdgeDelta())
+        for day in window.dates:
+            window.delta = window.delta + self.day(day, included)
+        return window
+
+    def slide(self, window: Window, end: date) -> Window:
+        """
+        Move a window to a later end date by adding the days that enter it
+        and subtracting the days that leave it
+        """
+        slid = Window(end=end, n_days=window.n_days, delta=window.delta)
+        entering = set(slid.dates) - set(window.dates)
+        leaving = set(window.dates) - set(slid.dates)
+        if len(entering) >= window.n_days:
+            return self.window(end, window.n_days)
+        included = self.included()
+        for day in entering:
+            slid.delta = slid.delta + self.day(day, included)
+        for day in leaving:
+            slid.delta = slid.delta - self.day(day, included)
+        return slid
+
+    def graph(self, delta: Optional[EdgeDelta] = None) -> HashtagGraph:
+        """The total graph, or the graph of a delta such as a window's"""
+        return (self.total() if delta is None else delta).to_graph(
+            self.vocabulary
+        )
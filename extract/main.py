@@ -1,9 +1,16 @@
-from typing import Any
+from typing import Any, List
 import argparse
+import sys
+from functools import partial
 
-from util.base_api import DateFormatter
-from src.apis import get_api_class
+# keep module-level imports light so that `--help` and argument validation
+# start quickly; API, HTTP and storage modules are imported where used
+from util.api_enums import FileFormats
+from util.batch import BatchRunner, ExtractJob, JobResult, read_manifest
+from util.dates import DateFormatter
 from util.gcp_utils import GCPUtil
+from util.watermarks import WatermarkStore
+from src.twitter_profiles import FieldProfiles
 
 
 def get_args():
@@ -16,11 +23,13 @@ def get_args():
     parser.add_argument(
         "api",
         type=str,
+        nargs="?",
         help="The API to use.",
     )
     parser.add_argument(
         "query",
         type=str,
+        nargs="?",
         help="The search term.",
     )
     parser.add_argument(
@@ -40,19 +49,253 @@ def get_args():
     parser.add_argument(
         "--bucket",
         type=str,
-        help="The GCS Bucket in which to upload resutls.",
-        required=True,
+        help="The GCS Bucket in which to upload resutls. "
+        + "If omitted, files are kept locally instead.",
+        required=False,
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        help="JSONL file of {api, query, date[, n_pages]} jobs to run "
+        + "as a batch, instead of a single api and query.",
+        required=False,
+    )
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        help="The maximum number of batch jobs to run concurrently.",
+        required=False,
+        default=4,
+    )
+    parser.add_argument(
+        "--checkpoints",
+        type=str,
+        help="SQLite file in which to checkpoint pagination, so interrupted "
+        + "runs resume where they stopped and finished ones are skipped.",
+        required=False,
+    )
+    parser.add_argument(
+        "--watermarks",
+        type=str,
+        help="JSON file of the newest id extracted per query. When given, "
+        + "only results newer than the last run are fetched.",
+        required=False,
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        help="Directory in which to cache raw API responses.",
+        required=False,
+    )
+    parser.add_argument(
+        "--cache_ttl",
+        type=float,
+        help="Hours for which cached responses stay valid.",
+        required=False,
+        default=24,
+    )
+    parser.add_argument(
+        "--cache_max_mb",
+        type=int,
+        help="Size above which least recently used responses are evicted.",
+        required=False,
+        default=1024,
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Serve every request from --cache_dir, never the network.",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--file_format",
+        type=str,
+        choices=[file_format.name.lower() for file_format in FileFormats],
+        help="The format in which to write results.",
+        required=False,
+        default=FileFormats.JSONL.name.lower(),
+    )
+    parser.add_argument(
+        "--fields",
+        type=str,
+        choices=[profile.label for profile in FieldProfiles],
+        help="The profile of expansions and fields to request. "
+        + "graph-minimal requests only what the hashtag graph needs.",
+        required=False,
+        default=FieldProfiles.FULL.label,
+    )
+    args = parser.parse_args()
+    if args.offline and args.cache_dir is None:
+        parser.error("--offline requires --cache_dir")
+    if args.manifest is None and (args.api is None or args.query is None):
+        parser.error("api and query are required without --manifest")
+    return args
+
+
+def run_job(
+    job: ExtractJob,
+    bucket: str,
+    cloud_util: GCPUtil,
+    watermark_store: WatermarkStore = None,
+    upload: bool = True,
+    **api_kwargs,
+) -> Any:
+    """
+    Write a job's pages to a file, then upload and finish it, or without
+    `upload`, return the API so `upload_jobs` can do so for many jobs.
+    """
+    from src.apis import get_api_class
+
+    api_class = get_api_class(job.api)
+    since_id = None
+    if watermark_store is not None:
+        since_id = watermark_store.get(job.query)
+    api = api_class(
+        query=job.query,
+        date=job.date,
+        cloud_util=cloud_util,
+        since_id=since_id,
+        **api_kwargs,
+    )
+    # an incremental run with no new tweets keeps the same key, so
+    # finishing one never means the next is already done
+    if (
+        api.checkpoint_store is not None
+        and not api.incremental
+        and api.checkpoint_store.is_complete(*api.checkpoint_key)
+    ):
+        print(f"Skipping {api.filename}, already complete.")
+        return None
+
+    filename = api.write_file(n_pages=job.n_pages)
+    print(
+        f"{filename}: {api.limiter_wait:.2f}s waiting on rate limits, "
+        + f"{api.network_time:.2f}s waiting on the network"
+    )
+    if not upload:
+        return api
+    if bucket is not None:
+        cloud_util.upload_file_to_bucket(filename, bucket)
+    finish_job(
+        api, uploaded=bucket is not None, watermark_store=watermark_store
+    )
+    return api
+
+
+def finish_job(
+    api: Any, uploaded: bool, watermark_store: WatermarkStore = None
+) -> None:
+    """
+    Mark a job complete and advance its watermark, once its file is
+    uploaded or, with no bucket, written.
+    """
+    api.finish(api.filename, uploaded=uploaded)
+    if watermark_store is not None and api.newest_id is not None:
+        watermark_store.update(api.query, api.newest_id)
+
+
+def upload_jobs(
+    results: List[JobResult],
+    bucket: str,
+    cloud_util: GCPUtil,
+    watermark_store: WatermarkStore = None,
+) -> None:
+    """
+    Upload the files of every written job concurrently, then finish
+    each job whose file was uploaded. A failed upload fails its job.
+    """
+    written = [
+        result
+        for result in results
+        if result.succeeded and result.result is not None
+    ]
+    if bucket is None:
+        for result in written:
+            finish_job(result.result, False, watermark_store)
+        return
+    errors = dict(
+        cloud_util.upload_files_to_bucket(
+            [result.result.filename for result in written], bucket
+        )
+    )
+    for result in written:
+        error = errors[result.result.filename]
+        if error is not None:
+            result.error = error
+        else:
+            finish_job(result.result, True, watermark_store)
 
 
 def main():
     args = get_args()
-    api_class = get_api_class(args.api)
-    api = api_class(query=args.query, date=args.date, cloud_util=GCPUtil())
-    api.get_responses()
-    # api.paginate_tweets(n_pages=args.n_pages)
-    api.write_and_upload(api.results, api.filename, args.bucket)
+
+    from src.apis import get_api_class
+    from util.checkpoints import CheckpointStore
+    from util.file_formats import get_formatter
+    from util.response_cache import ResponseCache
+    from src.twitter_profiles import get_field_profile
+
+    cloud_util = GCPUtil()
+    checkpoint_store = (
+        CheckpointStore(args.checkpoints)
+        if args.checkpoints is not None
+        else None
+    )
+    watermark_store = (
+        WatermarkStore(args.watermarks)
+        if args.watermarks is not None
+        else None
+    )
+    response_cache = (
+        ResponseCache(
+            directory=args.cache_dir,
+            ttl=args.cache_ttl * 60 * 60,
+            max_bytes=args.cache_max_mb * 1024 * 1024,
+            offline=args.offline,
+        )
+        if args.cache_dir is not None
+        else None
+    )
+    job_function = partial(
+        run_job,
+        bucket=args.bucket,
+        cloud_util=cloud_util,
+        watermark_store=watermark_store,
+        checkpoint_store=checkpoint_store,
+        response_cache=response_cache,
+        file_formatter=get_formatter(args.file_format),
+        field_profile=get_field_profile(args.fields),
+    )
+
+    if args.manifest is None:
+        jobs = [
+            ExtractJob(
+                api=args.api,
+                query=args.query,
+                date=args.date,
+                n_pages=args.n_pages,
+            )
+        ]
+    else:
+        jobs = read_manifest(args.manifest, n_pages=args.n_pages)
+        # fail fast on unknown APIs before any requests are made
+        for job in jobs:
+            get_api_class(job.api)
+
+    if args.manifest is None:
+        for job in jobs:
+            job_function(job)
+        return
+
+    # write every file first, then upload them all at once
+    runner = BatchRunner(
+        job_function=partial(job_function, upload=False),
+        max_workers=args.max_workers,
+    )
+    results = runner.run(jobs)
+    upload_jobs(results, args.bucket, cloud_util, watermark_store)
+    print(runner.report(results))
+    if not all(result.succeeded for result in results):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,207 @@
+"""
+Process pages written by main.py into the hashtag graph.
+"""
+
+import argparse
+from datetime import date
+
+
+def build(args: argparse.Namespace) -> None:
+    from graph.cooccurrence import build_graph
+
+    graph = build_graph(args.files, buffer_size=args.buffer_size)
+    graph.save(args.output)
+    print(
+        f"Wrote {graph.n_nodes} hashtags and {graph.n_edges} edges "
+        + f"to {args.output}"
+    )
+
+
+def merge(args: argparse.Namespace) -> None:
+    from graph.store import GraphStore
+
+    merged = GraphStore(args.store).merge(args.files)
+    print(f"Merged {len(merged)} new or changed files into {args.store}")
+
+
+def window(args: argparse.Namespace) -> None:
+    from graph.store import GraphStore
+
+    store = GraphStore(args.store)
+    graph = store.graph(store.window(args.end, args.days).delta)
+    graph.save(args.output)
+    print(
+        f"Wrote the {args.days} days to {args.end}: {graph.n_edges} edges "
+        + f"to {args.output}"
+    )
+
+
+def analyze(args: argparse.Namespace) -> None:
+    from graph.analytics import GraphAnalytics
+    from graph.cooccurrence import HashtagGraph
+
+    analytics = GraphAnalytics(
+        HashtagGraph.load(args.graph), top_k=args.top_k, damping=args.damping
+    )
+    for filename in analytics.write_tables(args.output_dir):
+        print(f"Wrote {filename}")
+
+
+def normalize(args: argparse.Namespace) -> None:
+    from util.file_formats import get_formatter
+    from util.normalize import normalize_files
+
+    counts = normalize_files(
+        args.files, args.output_dir, get_formatter(args.file_format)
+    )
+    for entities, count in counts.items():
+        print(f"Wrote {count} new {entities.name.lower()}")
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="process.py",
+        description="Build the hashtag graph from extracted pages.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser(
+        "build",
+        help="Build a hashtag co-occurrence graph from JSONL files.",
+    )
+    build_parser.add_argument(
+        "files",
+        type=str,
+        nargs="+",
+        help="JSONL files of pages, optionally gzip or zstd compressed.",
+    )
+    build_parser.add_argument(
+        "--output",
+        type=str,
+        help="The .npz file in which to write the graph.",
+        required=True,
+    )
+    build_parser.add_argument(
+        "--buffer_size",
+        type=int,
+        help="The number of edges to buffer between merges.",
+        required=False,
+    )
+    build_parser.set_defaults(function=build)
+
+    merge_parser = subparsers.add_parser(
+        "merge",
+        help="Merge new or changed files into an incremental graph store.",
+    )
+    merge_parser.add_argument(
+        "files",
+        type=str,
+        nargs="+",
+        help="JSONL files of pages, named <query>_<YYYY-MM-DD>...",
+    )
+    merge_parser.add_argument(
+        "--store",
+        type=str,
+        help="The graph store directory.",
+        required=True,
+    )
+    merge_parser.set_defaults(function=merge)
+
+    window_parser = subparsers.add_parser(
+        "window",
+        help="Write the graph of a trailing window of days from a store.",
+    )
+    window_parser.add_argument(
+        "--store",
+        type=str,
+        help="The graph store directory.",
+        required=True,
+    )
+    window_parser.add_argument(
+        "--end",
+        type=date.fromisoformat,
+        help="The last ISO 8601 date in the window.",
+        required=True,
+    )
+    window_parser.add_argument(
+        "--days",
+        type=int,
+        help="The number of days in the window.",
+        required=False,
+        default=7,
+    )
+    window_parser.add_argument(
+        "--output",
+        type=str,
+        help="The .npz file in which to write the graph.",
+        required=True,
+    )
+    window_parser.set_defaults(function=window)
+
+    analyze_parser = subparsers.add_parser(
+        "analyze",
+        help="Rank hashtags and detect communities in a graph.",
+    )
+    analyze_parser.add_argument(
+        "graph",
+        type=str,
+        help="A .npz graph written by build or window.",
+    )
+    analyze_parser.add_argument(
+        "--output_dir",
+        type=str,
+        help="The directory in which to write the JSONL tables.",
+        required=True,
+    )
+    analyze_parser.add_argument(
+        "--top_k",
+        type=int,
+        help="The number of neighbours to keep per hashtag.",
+        required=False,
+        default=10,
+    )
+    analyze_parser.add_argument(
+        "--damping",
+        type=float,
+        help="The PageRank damping factor.",
+        required=False,
+        default=0.85,
+    )
+    analyze_parser.set_defaults(function=analyze)
+
+    normalize_parser = subparsers.add_parser(
+        "normalize",
+        help="Split pages into deduplicated Tweets, Users, media and Places.",
+    )
+    normalize_parser.add_argument(
+        "files",
+        type=str,
+        nargs="+",
+        help="JSONL files of pages, optionally gzip or zstd compressed.",
+    )
+    normalize_parser.add_argument(
+        "--output_dir",
+        type=str,
+        help="The directory in which to write one folder per entity.",
+        required=True,
+    )
+    normalize_parser.add_argument(
+        "--file_format",
+        type=str,
+        help="The format of the output files.",
+        choices=["jsonl", "jsonl_gz", "jsonl_zst"],
+        required=False,
+        default="jsonl",
+    )
+    normalize_parser.set_defaults(function=normalize)
+
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    args.function(args)
+
+
+if __name__ == "__main__":
+    main()
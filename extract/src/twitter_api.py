@@ -1,20 +1,22 @@
-from typing import Union
+from typing import Iterator, Optional, Tuple, Union
 import os
-import json
 from dataclasses import dataclass, field
 
 from util.base_api import APIBase
 from util.file_formats import JSONLFormatter, Formatter
-from util.enums_utils import join_enums, dictify_enums
+from util.enums_utils import dictify_enums
 from util.gcp_utils import GCPUtil
 import src.twitter_enums as TwitterFields
 from src.twitter_enums import *
+from src.twitter_profiles import FieldProfile, FieldProfiles
 
 
 class TwitterAPIDefaults(Enum):
     META = "meta"
     DATA = "data"
     NEXT_TOKEN = "next_token"
+    NEWEST_ID = "newest_id"
+    SINCE_ID = "since_id"
 
 
 class TwitterURLs(Enum):
@@ -31,7 +33,9 @@ class TwitterAPI(APIBase):
     date: str
     cloud_util: Union[GCPUtil]
     max_results: int = field(default=100)
-    file_formatter: Formatter = field(default=JSONLFormatter(), init=False)
+    since_id: Optional[str] = None
+    file_formatter: Formatter = field(default_factory=JSONLFormatter)
+    field_profile: FieldProfile = field(default=FieldProfiles.FULL.value)
 
     bearer_token: str = os.getenv("BEARER_TOKEN")
     api_key: str = os.getenv("API_KEY")
@@ -41,14 +45,31 @@ class TwitterAPI(APIBase):
     client_id: str = os.getenv("CLIENT_ID")
     client_secret: str = os.getenv("CLIENT_SECRET")
 
-    results: list = field(default_factory=list, init=False)
+    newest_id: Optional[str] = field(default=None, init=False)
+
+    @property
+    def run_label(self) -> str:
+        """The date, plus the watermark for incremental runs"""
+        if self.since_id is None:
+            return str(self.date)
+        return f"{self.date}_since_{self.since_id}"
+
+    @property
+    def incremental(self) -> bool:
+        return self.since_id is not None
 
     @property
     def filename(self) -> str:
-        name = f"{self.query}_{self.date}{self.file_formatter.file_format}"
+        name = (
+            f"{self.query}_{self.run_label}{self.file_formatter.file_format}"
+        )
         self.file_formatter.check_file(name)
         return name
 
+    @property
+    def checkpoint_key(self) -> Tuple[str, str]:
+        return (self.query, self.run_label)
+
     @property
     def headers(self) -> dict:
         return {
@@ -66,54 +87,91 @@ class TwitterAPI(APIBase):
     def query_dict(self) -> dict:
         return {
             "query": self.query,
-            "expansions": join_enums(TweetExpansions),
-            "media.fields": join_enums(TweetMediaFields),
-            "place.fields": join_enums(TweetPlaceFields),
-            "poll.fields": join_enums(TweetPollFields),
-            "tweet.fields": join_enums(TweetTweetFields),
-            "user.fields": join_enums(TweetUserFields),
+            **self.field_profile.params,
             "max_results": self.max_results,
+            **self.time_window,
+        }
+
+    @property
+    def time_window(self) -> dict:
+        """
+        Incremental runs ask for everything newer than the watermark,
+        otherwise the whole day is searched.
+        """
+        if self.since_id is not None:
+            return {TwitterAPIDefaults.SINCE_ID.value: self.since_id}
+        return {
             "start_time": self.date_formatter.add_start_of_day_time(self.date),
             "end_time": self.date_formatter.add_end_of_day_time(self.date),
         }
 
-    def validation_function(self, response: str):
-        """Check that responses are good"""
-        if not "meta" in json.loads(response).keys():
+    def validation_function(self, page: dict):
+        """Check that a parsed response is good"""
+        if not "meta" in page.keys():
             raise ValidationException("`meta` key not present")
 
     def perform_search(
         self, endpoint: str = "search_recent", next_token=None
     ) -> dict:
+        query = self.query_dict
         if next_token is not None:
-            self.query_dict["next_token"] = next_token
+            query[TwitterAPIDefaults.NEXT_TOKEN.value] = next_token
         search_request = self.create_request(
             host=TwitterURLs.HOST.value,
             endpoint=self.endpoints.get(endpoint),
-            query=self.query_dict,
+            query=query,
             headers=self.headers,
             safe=":",
         )
         data = self.pull_request_data(search_request)
-        return json.loads(data)
-
-    def get_responses(self, n_pages=5) -> None:
-        page_count = 1
+        # parsed once; the page keeps its bytes for the file writer
+        return self.json_codec.load_page(data)
 
-        # always check the first page at least, and keep even if 0 results
-        first_result = self.perform_search()
-        self.results.append(first_result)
-        next_token = first_result.get(TwitterAPIDefaults.META.value).get(
+    @staticmethod
+    def get_next_token(page: dict) -> Optional[str]:
+        return page.get(TwitterAPIDefaults.META.value).get(
             TwitterAPIDefaults.NEXT_TOKEN.value
         )
 
+    def track_newest_id(self, page: dict) -> None:
+        """
+        Keep the newest id seen across pages, for the next incremental run.
+
+        The first page holds the newest results, but a resumed run may
+        never see it, so take the maximum over whatever pages it does see.
+        """
+        newest_id = page.get(TwitterAPIDefaults.META.value).get(
+            TwitterAPIDefaults.NEWEST_ID.value
+        )
+        if newest_id is not None and (
+            self.newest_id is None or int(newest_id) > int(self.newest_id)
+        ):
+            self.newest_id = newest_id
+
+    def get_responses(
+        self, n_pages=5, next_token=None, page_count=0
+    ) -> Iterator[dict]:
+        """
+        Lazily page through search results, yielding each page
+        as soon as it arrives.
+
+        To resume an interrupted run, pass the number of pages already
+        collected and the `next_token` from the last of them.
+        """
+        # always check the first page at least, and keep even if 0 results
+        if page_count == 0:
+            page_results = self.perform_search()
+            page_count += 1
+            self.track_newest_id(page_results)
+            yield page_results
+            next_token = self.get_next_token(page_results)
+
         # only get extra pages if there is another page
         # and if max pages not exceeded
         while next_token is not None and page_count < n_pages:
             page_count += 1
 
             page_results = self.perform_search(next_token=next_token)
-            self.results.append(page_results)
-            next_token = page_results.get(TwitterAPIDefaults.META.value).get(
-                TwitterAPIDefaults.NEXT_TOKEN.value
-            )
+            self.track_newest_id(page_results)
+            yield page_results
+            next_token = self.get_next_token(page_results)
@@ -0,0 +1,93 @@
+from typing import Tuple
+from enum import Enum
+from dataclasses import dataclass
+
+from util.enums_utils import join_enums
+from src.twitter_enums import (
+    TweetExpansions,
+    TweetMediaFields,
+    TweetPlaceFields,
+    TweetPollFields,
+    TweetTweetFields,
+    TweetUserFields,
+)
+
+
+@dataclass(frozen=True)
+class FieldProfile:
+    """
+    The expansions and fields to request, as subsets of the Twitter enums.
+
+    Fields of expanded objects are only requested along with an
+    expansion that returns them, and empty parameters are left out.
+    """
+
+    expansions: Tuple[TweetExpansions, ...] = ()
+    media_fields: Tuple[TweetMediaFields, ...] = ()
+    place_fields: Tuple[TweetPlaceFields, ...] = ()
+    poll_fields: Tuple[TweetPollFields, ...] = ()
+    tweet_fields: Tuple[TweetTweetFields, ...] = ()
+    user_fields: Tuple[TweetUserFields, ...] = ()
+
+    @property
+    def params(self) -> dict:
+        params = {
+            "expansions": join_enums(self.expansions),
+            "media.fields": join_enums(self.media_fields),
+            "place.fields": join_enums(self.place_fields),
+            "poll.fields": join_enums(self.poll_fields),
+            "tweet.fields": join_enums(self.tweet_fields),
+            "user.fields": join_enums(self.user_fields),
+        }
+        return {key: value for key, value in params.items() if value}
+
+
+class FieldProfiles(Enum):
+    # every field, as requested before profiles existed
+    FULL = FieldProfile(
+        expansions=tuple(TweetExpansions),
+        media_fields=tuple(TweetMediaFields),
+        place_fields=tuple(TweetPlaceFields),
+        poll_fields=tuple(TweetPollFields),
+        tweet_fields=tuple(TweetTweetFields),
+        user_fields=tuple(TweetUserFields),
+    )
+    # just enough to build the hashtag graph
+    GRAPH_MINIMAL = FieldProfile(
+        tweet_fields=(
+            TweetTweetFields.ID,
+            TweetTweetFields.CREATED_AT,
+            TweetTweetFields.ENTITIES,
+            TweetTweetFields.AUTHOR_ID,
+            TweetTweetFields.REFERENCED_TWEETS,
+        ),
+    )
+    # the graph, plus the columns of Parquet output and the authors
+    GRAPH = FieldProfile(
+        expansions=(TweetExpansions.AUTHOR_ID,),
+        tweet_fields=(
+            TweetTweetFields.ID,
+            TweetTweetFields.CREATED_AT,
+            TweetTweetFields.ENTITIES,
+            TweetTweetFields.AUTHOR_ID,
+            TweetTweetFields.REFERENCED_TWEETS,
+            TweetTweetFields.LANG,
+            TweetTweetFields.TEXT,
+        ),
+        user_fields=(
+            TweetUserFields.ID,
+            TweetUserFields.USERNAME,
+            TweetUserFields.NAME,
+        ),
+    )
+
+    @property
+    def label(self) -> str:
+        return self.name.lower().replace("_", "-")
+
+
+def get_field_profile(name: str) -> FieldProfile:
+    try:
+        return FieldProfiles[name.upper().replace("-", "_")].value
+    except KeyError:
+        raise ValueError(f"Invalid field profile: {name}")
@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+
+import pytest
+
+from util.batch import BatchRunner, ExtractJob, read_manifest
+
+
+def test_read_manifest(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(
+        "\n".join(
+            [
+                json.dumps(
+                    {"api": "twitter", "query": "#a", "date": "2022-12-01"}
+                ),
+                "",
+                json.dumps(
+                    {
+                        "api": "twitter",
+                        "query": "#b",
+                        "date": "2022-12-02",
+                        "n_pages": 2,
+                    }
+                ),
+            ]
+        )
+    )
+    jobs = read_manifest(str(manifest), n_pages=7)
+    assert jobs == [
+        ExtractJob(api="twitter", query="#a", date="2022-12-01", n_pages=7),
+        ExtractJob(api="twitter", query="#b", date="2022-12-02", n_pages=2),
+    ]
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        {"api": "twitter", "query": "#a"},
+        {"api": "twitter", "query": "#a", "date": "2022-31-12"},
+    ],
+)
+def test_read_manifest_invalid(tmp_path, entry):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(json.dumps(entry))
+    with pytest.raises(ValueError):
+        read_manifest(str(manifest))
+
+
+def test_batch_runner_caps_concurrency_and_reports_failures():
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def job_function(job: ExtractJob) -> str:
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        if job.query == "#bad":
+            raise RuntimeError("boom")
+        return job.query
+
+    jobs = [
+        ExtractJob(api="twitter", query=query, date="2022-12-01")
+        for query in ["#a", "#bad", "#c", "#d", "#e"]
+    ]
+    runner = BatchRunner(job_function=job_function, max_workers=2)
+    results = runner.run(jobs)
+
+    assert peak <= 2
+    assert [result.job for result in results] == jobs
+    assert [result.succeeded for result in results] == [
+        True,
+        False,
+        True,
+        True,
+        True,
+    ]
+    assert results[0].result == "#a"
+    report = runner.report(results)
+    assert "4 of 5 jobs succeeded." in report
+    assert "RuntimeError: boom" in report
@@ -0,0 +1,117 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from util.file_formats import CSVFormatter, JSONLFormatter, get_formatter
+
+
+def test_jsonl_writer_streams_pages(tmp_path):
+    filename = str(tmp_path / "out.jsonl")
+    formatter = JSONLFormatter()
+    pages = ({"meta": {"page": page}} for page in range(3))
+    formatter.write_file(pages, filename)
+
+    with open(filename) as f:
+        assert [json.loads(line) for line in f] == [
+            {"meta": {"page": page}} for page in range(3)
+        ]
+
+
+def test_jsonl_resumes_from_last_complete_page(tmp_path):
+    filename = str(tmp_path / "out.jsonl")
+    formatter = JSONLFormatter()
+    with formatter.open_writer(filename) as writer:
+        writer.write_page({"meta": {"page": 0}})
+        offset = writer.tell()
+    # simulate a crash part way through writing the next page
+    with open(filename, "ab") as f:
+        f.write(b'{"meta": {"pa')
+
+    assert formatter.valid_length(filename) == offset
+    with formatter.open_writer(filename, offset=offset) as writer:
+        writer.write_page({"meta": {"page": 1}})
+
+    with open(filename) as f:
+        assert [json.loads(line)["meta"]["page"] for line in f] == [0, 1]
+
+
+def test_csv_writer(tmp_path):
+    filename = str(tmp_path / "out.csv")
+    CSVFormatter().write_file([["a", "b"], [1, 2]], filename)
+    with open(filename, newline="") as f:
+        assert f.read() == "a,b\r\n1,2\r\n"
+
+
+def make_page(page: int) -> dict:
+    return {
+        "data": [
+            {
+                "id": str(page),
+                "author_id": "7",
+                "created_at": "2022-12-01T12:00:00.000Z",
+                "lang": "en",
+                "text": "#python #rust",
+                "entities": {"hashtags": [{"tag": "python"}, {"tag": "rust"}]},
+                "referenced_tweets": [{"type": "quoted", "id": "3"}],
+            }
+        ],
+        "meta": {"result_count": 1},
+    }
+
+
+def test_csv_writer_flattens_pages(tmp_path):
+    filename = str(tmp_path / "out.csv")
+    with CSVFormatter().open_writer(filename) as writer:
+        writer.write_page(make_page(0))
+        writer.write_page({"meta": {"result_count": 0}})
+        writer.write_page(make_page(1))
+    with open(filename, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["id"] for row in rows] == ["0", "1"]
+    assert rows[0] == {
+        "id": "0",
+        "author_id": "7",
+        "created_at": "2022-12-01 12:00:00+00:00",
+        "lang": "en",
+        "text": "#python #rust",
+        "hashtags": "python rust",
+        "referenced_tweet_ids": "3",
+    }
+
+
+def test_gzip_jsonl_resumes_mid_file(tmp_path):
+    filename = str(tmp_path / "out.jsonl.gz")
+    formatter = get_formatter("jsonl_gz")
+    formatter.check_file(filename)
+    with formatter.open_writer(filename) as writer:
+        writer.write_page(make_page(0))
+        offset = writer.tell()
+        writer.write_page(make_page(1))
+    with formatter.open_writer(filename, offset=offset) as writer:
+        writer.write_page(make_page(2))
+
+    with gzip.open(filename, "rt") as f:
+        assert [json.loads(line)["data"][0]["id"] for line in f] == ["0", "2"]
+
+
+def test_parquet_writes_a_row_group_per_page(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    filename = str(tmp_path / "out.parquet")
+    formatter = get_formatter("parquet")
+    formatter.write_file(
+        [make_page(0), {"meta": {"result_count": 0}}, make_page(1)], filename
+    )
+
+    parquet_file = pq.ParquetFile(filename)
+    assert parquet_file.metadata.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column("id").to_pylist() == [0, 1]
+    assert table.column("hashtags").to_pylist()[0] == ["python", "rust"]
+    assert table.column("referenced_tweet_ids").to_pylist()[0] == [3]
+
+
+def test_invalid_format():
+    with pytest.raises(ValueError):
+        get_formatter("xml")
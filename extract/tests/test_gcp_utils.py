@@ -0,0 +1,96 @@
+import threading
+
+from util.gcp_utils import GCPUtil
+
+
+class FakeBlob:
+    def __init__(self, bucket, name, chunk_size=None):
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = chunk_size
+
+    def upload_from_filename(self, filename, **kwargs):
+        if "broken" in filename:
+            raise ConnectionError("upload failed")
+        with open(filename, "rb") as f:
+            data = f.read()
+        with self.bucket.lock:
+            self.bucket.blobs[self.name] = (data, self.chunk_size)
+
+
+class FakeBucket:
+    def __init__(self, name):
+        self.name = name
+        self.blobs = {}
+        self.lock = threading.Lock()
+
+    def blob(self, name, chunk_size=None):
+        return FakeBlob(self, name, chunk_size)
+
+
+class FakeClient:
+    """Local stand-in for google.cloud.storage.Client."""
+
+    def __init__(self):
+        self.buckets = {}
+
+    def bucket(self, name):
+        return self.buckets.setdefault(name, FakeBucket(name))
+
+
+def test_upload_files_to_bucket(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name, size in [("small.jsonl", 10), ("large.jsonl", 2048)]:
+        (tmp_path / name).write_bytes(b"x" * size)
+    (tmp_path / "broken.jsonl").write_bytes(b"x")
+
+    client = FakeClient()
+    gcp_util = GCPUtil(client=client, chunk_size=1024, max_workers=2)
+    results = gcp_util.upload_files_to_bucket(
+        ["small.jsonl", "large.jsonl", "broken.jsonl"], "tweets"
+    )
+
+    assert [filename for filename, _ in results] == [
+        "small.jsonl",
+        "large.jsonl",
+        "broken.jsonl",
+    ]
+    assert isinstance(results[2][1], ConnectionError)
+    blobs = client.buckets["tweets"].blobs
+    assert blobs["small.jsonl"] == (b"x" * 10, None)
+    assert blobs["large.jsonl"] == (b"x" * 2048, 1024)
+
+
+class FakeAPI:
+    def __init__(self, filename):
+        self.filename = filename
+        self.query = filename
+        self.newest_id = None
+        self.finished = None
+
+    def finish(self, filename, uploaded):
+        self.finished = uploaded
+
+
+def test_upload_jobs_uploads_written_files_together(tmp_path, monkeypatch):
+    from main import upload_jobs
+    from util.batch import ExtractJob, JobResult
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.jsonl").write_bytes(b"a")
+    (tmp_path / "broken.jsonl").write_bytes(b"b")
+    job = ExtractJob(api="twitter", query="#python", date="2022-12-01")
+    results = [
+        JobResult(job=job, elapsed=0, result=FakeAPI("a.jsonl")),
+        JobResult(job=job, elapsed=0, result=FakeAPI("broken.jsonl")),
+        # skipped as already complete
+        JobResult(job=job, elapsed=0, result=None),
+    ]
+
+    client = FakeClient()
+    upload_jobs(results, "tweets", GCPUtil(client=client))
+
+    assert set(client.buckets["tweets"].blobs) == {"a.jsonl"}
+    assert results[0].succeeded and results[0].result.finished is True
+    assert isinstance(results[1].error, ConnectionError)
+    assert results[1].result.finished is None
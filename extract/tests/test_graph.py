@@ -0,0 +1,67 @@
+import json
+from itertools import count
+
+import numpy as np
+
+from graph.cooccurrence import CooccurrenceBuilder, HashtagGraph, build_graph
+
+
+TWEET_IDS = count(1)
+
+
+def tweet(*tags):
+    return {
+        "id": str(next(TWEET_IDS)),
+        "entities": {"hashtags": [{"tag": tag} for tag in tags]},
+    }
+
+
+def write_pages(path, pages):
+    with open(path, "w") as f:
+        for page in pages:
+            f.write(json.dumps(page) + "\n")
+    return str(path)
+
+
+def edge_weights(graph: HashtagGraph) -> dict:
+    tags = graph.vocabulary.tags
+    return {
+        (tags[row], tags[col]): weight
+        for row, col, weight in zip(graph.rows, graph.cols, graph.weights)
+    }
+
+
+def test_build_graph_counts_cooccurrences(tmp_path):
+    filename = write_pages(
+        tmp_path / "#python_2022-12-01.jsonl",
+        [
+            {"data": [tweet("Python", "rust"), tweet("python", "go", "rust")]},
+            {"meta": {"result_count": 0}},
+            {"data": [tweet("python"), {"id": "0", "text": "no hashtags"}]},
+        ],
+    )
+    # a tiny buffer forces several merges
+    graph = build_graph([filename], buffer_size=1)
+
+    assert graph.vocabulary.tags == ["python", "rust", "go"]
+    assert graph.node_counts.tolist() == [3, 2, 1]
+    assert edge_weights(graph) == {
+        ("python", "rust"): 2,
+        ("python", "go"): 1,
+        ("rust", "go"): 1,
+    }
+
+
+def test_graph_round_trip(tmp_path):
+    builder = CooccurrenceBuilder()
+    builder.add_hashtags(["a", "b", "c"])
+    builder.add_hashtags(["b", "c"])
+    graph = builder.build()
+    graph.save(str(tmp_path / "graph.npz"))
+
+    loaded = HashtagGraph.load(str(tmp_path / "graph.npz"))
+    assert loaded.vocabulary.tags == ["a", "b", "c"]
+    assert edge_weights(loaded) == edge_weights(graph)
+    adjacency = loaded.to_csr().toarray()
+    np.testing.assert_array_equal(adjacency, adjacency.T)
+    assert adjacency[1, 2] == 2
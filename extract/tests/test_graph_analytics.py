@@ -0,0 +1,97 @@
+import json
+
+import numpy as np
+from scipy import sparse
+
+from graph.analytics import (
+    GraphAnalytics,
+    label_propagation,
+    pagerank,
+    top_k_neighbours,
+    weighted_degree,
+)
+from graph.cooccurrence import build_graph
+from tests.test_graph import tweet, write_pages
+
+
+def symmetric(n, edges):
+    rows, cols, weights = zip(*edges)
+    matrix = sparse.coo_matrix((weights, (rows, cols)), shape=(n, n))
+    return (matrix + matrix.T).tocsr().astype(np.float64)
+
+
+def dense_pagerank(matrix, damping=0.85, n_iter=200):
+    n = len(matrix)
+    out_weight = matrix.sum(axis=1)
+    ranks = np.full(n, 1.0 / n)
+    for _ in range(n_iter):
+        spread = np.zeros(n)
+        for i in range(n):
+            if out_weight[i]:
+                spread += ranks[i] * matrix[i] / out_weight[i]
+            else:
+                spread += ranks[i] / n
+        ranks = (1 - damping) / n + damping * spread
+    return ranks
+
+
+def test_pagerank_matches_dense_reference():
+    # node 4 has no edges
+    adjacency = symmetric(5, [(0, 1, 3), (1, 2, 1), (0, 2, 2), (2, 3, 5)])
+    ranks = pagerank(adjacency)
+    assert np.isclose(ranks.sum(), 1)
+    assert np.allclose(ranks, dense_pagerank(adjacency.toarray()))
+    assert weighted_degree(adjacency).tolist() == [5, 4, 8, 5, 0]
+
+
+def test_top_k_neighbours():
+    adjacency = symmetric(4, [(0, 1, 1), (0, 2, 3), (0, 3, 3), (1, 2, 2)])
+    sources, targets, weights, ranks = top_k_neighbours(adjacency, k=2)
+    assert list(zip(sources, targets, weights, ranks)) == [
+        (0, 2, 3, 1),
+        (0, 3, 3, 2),
+        (1, 2, 2, 1),
+        (1, 0, 1, 2),
+        (2, 0, 3, 1),
+        (2, 1, 2, 2),
+        (3, 0, 3, 1),
+    ]
+
+
+def test_label_propagation_finds_cliques():
+    clique = [(i, j, 5) for i in range(4) for j in range(i + 1, 4)]
+    edges = clique + [(i + 4, j + 4, w) for i, j, w in clique] + [(3, 4, 1)]
+    communities = label_propagation(symmetric(9, edges))
+    assert len(set(communities[:4])) == 1
+    assert len(set(communities[4:8])) == 1
+    assert communities[0] != communities[4]
+    # the isolated node is its own, smallest community
+    assert communities[8] == 2
+
+
+def test_write_tables(tmp_path):
+    graph = build_graph(
+        [
+            write_pages(
+                tmp_path / "#a_2022-12-01.jsonl",
+                [{"data": [tweet("a", "b"), tweet("a", "c"), tweet("a")]}],
+            )
+        ]
+    )
+    nodes_file, neighbours_file = GraphAnalytics(graph, top_k=1).write_tables(
+        str(tmp_path / "tables")
+    )
+    with open(nodes_file) as f:
+        nodes = {row["hashtag"]: row for row in map(json.loads, f)}
+    assert nodes["a"]["tweet_count"] == 3
+    assert nodes["a"]["weighted_degree"] == 2
+    assert nodes["a"]["pagerank"] > nodes["b"]["pagerank"]
+    with open(neighbours_file) as f:
+        neighbours = [json.loads(line) for line in f]
+    assert neighbours[0] == {
+        "hashtag": "a",
+        "neighbour": "b",
+        "weight": 1,
+        "rank": 1,
+    }
+    assert len(neighbours) == 3
@@ -0,0 +1,69 @@
+import os
+from datetime import date
+
+import pytest
+
+from graph.store import GraphStore, file_date
+from tests.test_graph import edge_weights, tweet, write_pages
+
+
+def test_file_date():
+    assert file_date("/data/#python_2022-12-01.jsonl.gz") == "2022-12-01"
+    assert file_date("#python_2022-12-01_since_123.jsonl") == "2022-12-01"
+    with pytest.raises(ValueError):
+        file_date("#python.jsonl")
+
+
+def test_merge_is_idempotent(tmp_path):
+    store = GraphStore(str(tmp_path / "store"))
+    first = write_pages(
+        tmp_path / "#a_2022-12-01.jsonl", [{"data": [tweet("a", "b")]}]
+    )
+    second = write_pages(
+        tmp_path / "#b_2022-12-01.jsonl", [{"data": [tweet("a", "b", "c")]}]
+    )
+    assert store.merge([first, second]) == [first, second]
+    assert store.merge([first, second]) == []
+    assert edge_weights(store.graph()) == {
+        ("a", "b"): 2,
+        ("a", "c"): 1,
+        ("b", "c"): 1,
+    }
+
+    # re-extracting a file replaces its old contribution
+    write_pages(
+        tmp_path / "#b_2022-12-01.jsonl", [{"data": [tweet("c", "d")]}]
+    )
+    os.utime(second, ns=(0, 1))
+    assert store.merge([second]) == [second]
+    graph = GraphStore(str(tmp_path / "store")).graph()
+    assert edge_weights(graph) == {("a", "b"): 1, ("c", "d"): 1}
+    assert graph.vocabulary.tags == ["a", "b", "c", "d"]
+    assert graph.node_counts.tolist() == [1, 1, 1, 1]
+
+
+def test_sliding_window(tmp_path):
+    store = GraphStore(str(tmp_path / "store"))
+    store.merge(
+        [
+            write_pages(
+                tmp_path / f"#a_2022-12-0{day}.jsonl",
+                [{"data": [tweet("a", f"day{day}")]}],
+            )
+            for day in range(1, 5)
+        ]
+    )
+    window = store.window(date(2022, 12, 3), 2)
+    assert set(edge_weights(store.graph(window.delta))) == {
+        ("a", "day2"),
+        ("a", "day3"),
+    }
+
+    slid = store.slide(window, date(2022, 12, 4))
+    assert edge_weights(store.graph(slid.delta)) == edge_weights(
+        store.graph(store.window(date(2022, 12, 4), 2).delta)
+    )
+    assert set(edge_weights(store.graph(slid.delta))) == {
+        ("a", "day3"),
+        ("a", "day4"),
+    }
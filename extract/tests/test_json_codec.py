@@ -0,0 +1,48 @@
+import pytest
+
+from util.file_formats import JSONLFormatter, iter_pages
+from util.json_codec import Codecs, Page, StdlibCodec, get_codec
+
+
+@pytest.mark.parametrize(
+    "codecs", [codecs for codecs in Codecs if codecs.available]
+)
+def test_codecs_round_trip(codecs):
+    codec = get_codec(codecs.name.lower())
+    obj = {"data": [{"id": "1", "text": "café #python"}], "meta": {}}
+    assert codec.loads(codec.dumps(obj)) == obj
+    assert codec.loads(codec.dumps(obj).decode("utf-8")) == obj
+
+
+def test_get_codec():
+    assert get_codec() is get_codec()
+    with pytest.raises(ValueError):
+        get_codec("yaml")
+
+
+def test_load_page_keeps_raw_bytes():
+    raw = b'{"meta": {"result_count": 0}}'
+    page = StdlibCodec().load_page(raw)
+    assert isinstance(page, Page)
+    assert page == {"meta": {"result_count": 0}}
+    assert page.raw is raw
+    assert StdlibCodec().load_page("[1]") == [1]
+
+
+def test_writer_copies_raw_pages(tmp_path):
+    filename = str(tmp_path / "pages.jsonl")
+    # spacing that a re-serialization would not reproduce
+    raw = b'{"meta" :  {"result_count": 0}}'
+    pretty = b'{\n  "meta": {}\n}'
+    codec = StdlibCodec()
+    JSONLFormatter(codec=codec).write_file(
+        [codec.load_page(raw), codec.load_page(pretty), {"data": []}],
+        filename,
+    )
+    with open(filename, "rb") as f:
+        assert f.read() == raw + b'\n{"meta": {}}\n{"data": []}\n'
+    assert list(iter_pages(filename, codec)) == [
+        {"meta": {"result_count": 0}},
+        {"meta": {}},
+        {"data": []},
+    ]
@@ -0,0 +1,119 @@
+import os
+
+import pytest
+
+from tests.test_graph import write_pages
+from util.file_formats import GzipJSONLFormatter, ParquetFormatter, iter_pages
+from util.normalize import (
+    Entities,
+    Normalizer,
+    SeenIds,
+    entity_id,
+    output_stem,
+)
+
+
+def page(tweet_ids, user_ids=(), media_keys=(), place_ids=()):
+    return {
+        "data": [{"id": str(id_)} for id_ in tweet_ids],
+        "includes": {
+            "users": [{"id": str(id_)} for id_ in user_ids],
+            "media": [{"media_key": key} for key in media_keys],
+            "places": [{"id": id_} for id_ in place_ids],
+        },
+    }
+
+
+def read_ids(filename, key="id"):
+    return [
+        entity[key] for page in iter_pages(filename) for entity in page["data"]
+    ]
+
+
+def test_seen_ids():
+    seen = SeenIds(buffer_size=2)
+    assert seen.add([5, 3, 5]) == [True, True, False]
+    assert len(seen.ids) == 2
+    assert seen.add([3, 9, 1]) == [False, True, True]
+    seen.flush()
+    assert seen.ids.tolist() == [1, 3, 5, 9]
+    assert seen.add([]) == []
+
+
+def test_entity_id():
+    assert entity_id("1598000000000000000") == 1598000000000000000
+    assert entity_id("3_1597") == entity_id("3_1597")
+    assert entity_id("3_1597") != entity_id("7_1597")
+    assert -(1 << 63) <= entity_id("ffffffffffffffffffff") < 1 << 63
+
+
+def test_output_stem():
+    assert (
+        output_stem("/a/#python_2022-12-01.jsonl.gz") == "#python_2022-12-01"
+    )
+    assert output_stem("#python_2022-12-01.jsonl") == "#python_2022-12-01"
+
+
+def test_normalize_dedupes_across_files_and_runs(tmp_path):
+    first = write_pages(
+        tmp_path / "#a_2022-12-01.jsonl",
+        [
+            page([1, 2], user_ids=[10], media_keys=["3_1"]),
+            page([2, 3], user_ids=[10, 11], place_ids=["0ab"]),
+        ],
+    )
+    second = write_pages(
+        tmp_path / "#b_2022-12-01.jsonl",
+        [page([3, 4], user_ids=[11], media_keys=["3_1"], place_ids=["0ab"])],
+    )
+    output = str(tmp_path / "out")
+    counts = Normalizer(output).normalize([first, second])
+    assert counts == {
+        Entities.TWEETS: 4,
+        Entities.USERS: 2,
+        Entities.MEDIA: 1,
+        Entities.PLACES: 1,
+    }
+    tweets = os.path.join(output, "tweets")
+    assert read_ids(os.path.join(tweets, "#a_2022-12-01.jsonl")) == [
+        "1",
+        "2",
+        "3",
+    ]
+    assert read_ids(os.path.join(tweets, "#b_2022-12-01.jsonl")) == ["4"]
+    assert read_ids(os.path.join(output, "users", "#b_2022-12-01.jsonl")) == []
+
+    # unchanged files are skipped, and a later run only adds new entities
+    third = write_pages(
+        tmp_path / "#c_2022-12-02.jsonl", [page([1, 5], user_ids=[12])]
+    )
+    counts = Normalizer(output).normalize([first, second, third])
+    assert counts[Entities.TWEETS] == 1
+    assert counts[Entities.USERS] == 1
+    assert read_ids(os.path.join(tweets, "#c_2022-12-02.jsonl")) == ["5"]
+    assert read_ids(os.path.join(tweets, "#a_2022-12-01.jsonl")) == [
+        "1",
+        "2",
+        "3",
+    ]
+
+
+def test_interrupted_run_is_redone(tmp_path):
+    filename = write_pages(tmp_path / "#a_2022-12-01.jsonl", [page([1, 2])])
+    output = str(tmp_path / "out")
+    normalizer = Normalizer(output, file_formatter=GzipJSONLFormatter())
+    # written, but never committed to the index
+    normalizer.normalize_file(filename)
+
+    assert Normalizer(output).seen[Entities.TWEETS].ids.tolist() == []
+    Normalizer(output, file_formatter=GzipJSONLFormatter()).normalize(
+        [filename]
+    )
+    assert read_ids(
+        os.path.join(output, "tweets", "#a_2022-12-01.jsonl.gz")
+    ) == ["1", "2"]
+
+
+def test_normalizer_needs_appendable_format(tmp_path):
+    with pytest.raises(ValueError):
+        Normalizer(str(tmp_path), file_formatter=ParquetFormatter())
@@ -0,0 +1,68 @@
+from util.rate_limits import RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_limiter(headroom: int = 1):
+    clock = FakeClock()
+    return (
+        RateLimiter(headroom=headroom, clock=clock, sleep=clock.sleep),
+        clock,
+    )
+
+
+def test_unknown_endpoint_is_not_limited():
+    limiter, clock = make_limiter()
+    assert limiter.acquire("search") == 0
+    assert clock.sleeps == []
+
+
+def test_paces_remaining_quota_over_window():
+    limiter, clock = make_limiter(headroom=1)
+    limiter.update(
+        "search",
+        {
+            "x-rate-limit-limit": "450",
+            "x-rate-limit-remaining": "5",
+            "x-rate-limit-reset": str(int(clock.now) + 40),
+        },
+    )
+    assert limiter.acquire("search") == 0
+    # 4 left, 1 held back: spread 3 requests over the 40 seconds left
+    assert limiter.acquire("search") == 10
+    assert limiter.buckets["search"].remaining == 3
+
+
+def test_sleeps_until_reset_when_exhausted():
+    limiter, clock = make_limiter(headroom=0)
+    reset = int(clock.now) + 30
+    limiter.update(
+        "search",
+        {
+            "X-Rate-Limit-Limit": "450",
+            "X-Rate-Limit-Remaining": "0",
+            "X-Rate-Limit-Reset": str(reset),
+        },
+    )
+    assert limiter.is_limited("search")
+    assert limiter.acquire("search") == 30
+    assert clock.now == reset
+    assert not limiter.is_limited("search")
+
+
+def test_retry_after_on_throttled_response():
+    limiter, clock = make_limiter()
+    limiter.update("search", {"Retry-After": "12"}, throttled=True)
+    assert limiter.is_limited("search")
+    assert limiter.acquire("search") == 12
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from graph.cooccurrence import build_graph
+from tests.test_graph import tweet, write_pages
+from util.records import HashtagEdge, Tweet, page_tweets
+
+
+def test_page_tweets():
+    tweets = page_tweets(
+        {
+            "data": [
+                {
+                    "id": "12",
+                    "author_id": "7",
+                    "lang": "en",
+                    "created_at": "2022-12-01T12:00:00.000Z",
+                    "entities": {"hashtags": [{"tag": "Python"}]},
+                    "referenced_tweets": [{"type": "quoted", "id": "3"}],
+                }
+            ],
+            "meta": {"result_count": 1, "newest_id": "12"},
+        }
+    )
+    assert tweets == (
+        Tweet(
+            id=12,
+            author_id=7,
+            created_at=datetime(2022, 12, 1, 12, tzinfo=timezone.utc),
+            lang="en",
+            hashtags=("Python",),
+            referenced_tweet_ids=(3,),
+        ),
+    )
+    assert page_tweets({"meta": {"result_count": 0}}) == ()
+
+
+def test_records_have_no_dict():
+    record = Tweet(id=1)
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(AttributeError):
+        record.id = 2
+
+
+def test_graph_edges(tmp_path):
+    graph = build_graph(
+        [
+            write_pages(
+                tmp_path / "#a_2022-12-01.jsonl",
+                [{"data": [tweet("a", "b"), tweet("b", "a")]}],
+            )
+        ]
+    )
+    assert list(graph.edges()) == [HashtagEdge("a", "b", 2)]
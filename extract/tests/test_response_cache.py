@@ -0,0 +1,68 @@
+import os
+import time
+import urllib.request
+
+import pytest
+
+from util.api_exceptions import CacheMissException
+from util.response_cache import ResponseCache
+from tests.test_twitter_api import make_api
+
+
+def make_request(page: int, token: str = "secret"):
+    return urllib.request.Request(
+        f"https://api.twitter.com/2/tweets/search/recent?page={page}",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+
+def test_cache_key_ignores_headers():
+    assert ResponseCache.cache_key(
+        make_request(1, "a")
+    ) == ResponseCache.cache_key(make_request(1, "b"))
+    assert ResponseCache.cache_key(make_request(1)) != ResponseCache.cache_key(
+        make_request(2)
+    )
+
+
+def test_round_trip_and_ttl(tmp_path):
+    cache = ResponseCache(directory=str(tmp_path), ttl=60)
+    request = make_request(1)
+    assert cache.get(request) is None
+    cache.put(request, b'{"meta": {}}')
+    assert cache.get(request) == b'{"meta": {}}'
+
+    path = cache._path(cache.cache_key(request))
+    stale = time.time() - 120
+    os.utime(path, (stale, stale))
+    assert cache.get(request) is None
+    assert not os.path.exists(path)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(directory=str(tmp_path), ttl=None, max_bytes=30)
+    cache.put(make_request(1), b"first")
+    cache.put(make_request(2), b"second")
+    assert cache.get(make_request(1)) is None
+    assert cache.get(make_request(2)) == b"second"
+
+
+def test_offline_mode_serves_only_from_cache(tmp_path):
+    cache = ResponseCache(directory=str(tmp_path), offline=True)
+    api = make_api([], response_cache=cache)
+    request = make_request(1)
+    with pytest.raises(CacheMissException):
+        api.pull_request_data(request)
+    cache.put(request, b'{"meta": {}}')
+    assert api.pull_request_data(request) == b'{"meta": {}}'
+
+
+def test_offline_mode_serves_expired_entries(tmp_path):
+    cache = ResponseCache(directory=str(tmp_path), ttl=60, offline=True)
+    request = make_request(1)
+    cache.put(request, b'{"meta": {}}')
+    path = cache._path(cache.cache_key(request))
+    stale = time.time() - 120
+    os.utime(path, (stale, stale))
+    assert cache.get(request) == b'{"meta": {}}'
+    assert os.path.exists(path)
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+EXTRACT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def imported_modules(*args: str) -> set:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py", *args],
+        cwd=EXTRACT_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return {
+        line.split("|")[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "google.cloud.storage",
+        "http.client",
+        "urllib.request",
+        "sqlite3",
+        "pyarrow",
+    ],
+)
+def test_help_does_not_import_heavy_modules(module):
+    assert module not in imported_modules("--help")
+
+
+def test_help_leaves_concurrent_futures_unloaded():
+    # sys.modules, not -X importtime, also sees modules that were
+    # imported before main.py started
+    script = (
+        "import runpy, sys\n"
+        "sys.argv = ['main.py', '--help']\n"
+        "try:\n"
+        "    runpy.run_path('main.py', run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print('concurrent.futures' in sys.modules, file=sys.stderr)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=EXTRACT_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert result.stderr.strip() == "False"
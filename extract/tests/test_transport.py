@@ -0,0 +1,96 @@
+import gzip
+import json
+import socket
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from util.transport import PooledTransport
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.client_ports.append(self.client_address[1])
+        if self.path.startswith("/missing"):
+            body = b"not found"
+            self.send_response(404)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        body = json.dumps({"meta": {"path": self.path}}).encode()
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.client_ports = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_reuses_connections_and_decodes_gzip(stub_server):
+    host, port = stub_server.server_address
+    transport = PooledTransport()
+    for page in range(3):
+        request = urllib.request.Request(
+            f"http://{host}:{port}/search?page={page}"
+        )
+        response = transport.send(request, timeout=5)
+        assert json.loads(response.body) == {
+            "meta": {"path": f"/search?page={page}"}
+        }
+    assert len(set(stub_server.client_ports)) == 1
+    transport.close()
+
+
+def test_error_status_raises_http_error(stub_server):
+    host, port = stub_server.server_address
+    transport = PooledTransport()
+    request = urllib.request.Request(f"http://{host}:{port}/missing")
+    with pytest.raises(urllib.error.HTTPError) as e:
+        transport.send(request, timeout=5)
+    assert e.value.code == 404
+    transport.close()
+
+
+def test_refused_connection_raises_url_error():
+    # bind a port, then close it, so nothing is listening there
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        host, port = sock.getsockname()
+    transport = PooledTransport()
+    request = urllib.request.Request(f"http://{host}:{port}/search")
+    with pytest.raises(urllib.error.URLError):
+        transport.send(request, timeout=2)
+
+
+def test_timed_out_connection_raises_timeout():
+    # a server that accepts connections but never responds
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        host, port = sock.getsockname()
+        transport = PooledTransport()
+        request = urllib.request.Request(f"http://{host}:{port}/search")
+        with pytest.raises(socket.timeout):
+            transport.send(request, timeout=0.2)
@@ -0,0 +1,175 @@
+import json
+
+import pytest
+
+from src.twitter_api import TwitterAPI
+from src.twitter_profiles import FieldProfiles, get_field_profile
+from util.checkpoints import Checkpoint, CheckpointStore
+from util.watermarks import WatermarkStore
+
+
+class FakeTwitterAPI(TwitterAPI):
+    """TwitterAPI that serves canned pages instead of calling Twitter."""
+
+    def __init__(self, pages, fail_at=None, **kwargs):
+        super().__init__(**kwargs)
+        self.pages = pages
+        self.fail_at = fail_at
+        self.requested_tokens = []
+
+    def perform_search(self, endpoint="search_recent", next_token=None):
+        self.requested_tokens.append(next_token)
+        index = len(self.requested_tokens) - 1
+        if index == self.fail_at:
+            raise ConnectionError("network down")
+        return self.pages[index]
+
+
+def make_pages(n):
+    pages = []
+    for page in range(n):
+        meta = {"result_count": 1}
+        if page < n - 1:
+            meta["next_token"] = f"token{page + 1}"
+        pages.append({"data": [{"id": str(page)}], "meta": meta})
+    return pages
+
+
+def make_api(pages, **kwargs):
+    return FakeTwitterAPI(
+        pages, query="#python", date="2022-12-01", cloud_util=None, **kwargs
+    )
+
+
+def test_get_responses_follows_next_token():
+    api = make_api(make_pages(3))
+    assert [
+        page["data"][0]["id"] for page in api.get_responses(n_pages=5)
+    ] == [
+        "0",
+        "1",
+        "2",
+    ]
+    assert api.requested_tokens == [None, "token1", "token2"]
+
+
+def test_get_responses_stops_at_n_pages():
+    api = make_api(make_pages(5))
+    assert len(list(api.get_responses(n_pages=2))) == 2
+
+
+def test_write_pages_keeps_completed_pages_on_failure(tmp_path):
+    filename = str(tmp_path / "out.jsonl")
+    api = make_api(make_pages(5), fail_at=3)
+    with pytest.raises(ConnectionError):
+        api.write_pages(filename, n_pages=5)
+    with open(filename) as f:
+        assert [json.loads(line)["data"][0]["id"] for line in f] == [
+            "0",
+            "1",
+            "2",
+        ]
+
+
+def test_write_pages_resumes_from_checkpoint(tmp_path):
+    filename = str(tmp_path / "out.jsonl")
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    pages = make_pages(5)
+
+    api = make_api(pages, fail_at=3, checkpoint_store=store)
+    with pytest.raises(ConnectionError):
+        api.write_pages(filename, n_pages=5)
+    checkpoint = store.get("#python", "2022-12-01")
+    assert checkpoint.next_token == "token3"
+    assert checkpoint.page_count == 3
+
+    # a partial line from the crash is discarded on resume
+    with open(filename, "ab") as f:
+        f.write(b'{"data"')
+
+    api = make_api(pages[3:], checkpoint_store=store)
+    assert api.write_pages(filename, n_pages=5) == 5
+    assert api.requested_tokens == ["token3", "token4"]
+    with open(filename) as f:
+        assert [json.loads(line)["data"][0]["id"] for line in f] == [
+            "0",
+            "1",
+            "2",
+            "3",
+            "4",
+        ]
+
+
+def test_checkpoint_store_marks_complete(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    assert not store.is_complete("#python", "2022-12-01")
+    store.save(Checkpoint("#python", "2022-12-01", "token1", 1, 10))
+    assert not store.is_complete("#python", "2022-12-01")
+    store.mark_complete("#python", "2022-12-01")
+    assert store.is_complete("#python", "2022-12-01")
+    assert store.get("#python", "2022-12-01").next_token == "token1"
+
+
+def test_incremental_run_uses_since_id():
+    api = make_api([], since_id="100")
+    assert api.query_dict["since_id"] == "100"
+    assert "start_time" not in api.query_dict
+    assert api.filename == "#python_2022-12-01_since_100.jsonl"
+    assert api.checkpoint_key == ("#python", "2022-12-01_since_100")
+
+
+def test_incremental_run_without_new_tweets_repeats(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    empty = [{"meta": {"result_count": 0}}]
+
+    for _ in range(2):
+        api = make_api(empty, since_id="100", checkpoint_store=store)
+        assert not store.is_complete(*api.checkpoint_key)
+        api.finish(api.write_file(), uploaded=False)
+        assert api.requested_tokens == [None]
+        assert api.newest_id is None
+
+    assert store.get("#python", "2022-12-01_since_100") is None
+
+    api = make_api(make_pages(1), checkpoint_store=store)
+    api.finish(api.write_file(), uploaded=False)
+    assert store.is_complete("#python", "2022-12-01")
+
+
+def test_field_profiles():
+    full = make_api([]).query_dict
+    assert full["expansions"].startswith("attachments.poll_ids,")
+    assert "public_metrics" in full["user.fields"]
+
+    api = make_api([], field_profile=get_field_profile("graph-minimal"))
+    minimal = api.query_dict
+    assert minimal["tweet.fields"] == (
+        "id,created_at,entities,author_id,referenced_tweets"
+    )
+    assert "expansions" not in minimal
+    assert "user.fields" not in minimal
+    assert minimal["query"] == "#python"
+
+    assert get_field_profile("GRAPH") is FieldProfiles.GRAPH.value
+    with pytest.raises(ValueError):
+        get_field_profile("everything")
+
+
+def test_tracks_newest_id_across_pages():
+    pages = make_pages(2)
+    pages[0]["meta"]["newest_id"] = "205"
+    pages[1]["meta"]["newest_id"] = "150"
+    api = make_api(pages)
+    list(api.get_responses())
+    assert api.newest_id == "205"
+
+
+def test_watermark_store_only_advances(tmp_path):
+    store = WatermarkStore(str(tmp_path / "watermarks.json"))
+    assert store.get("#python") is None
+    store.update("#python", "205")
+    store.update("#python", "150")
+    assert store.get("#python") == "205"
+    with open(tmp_path / "watermarks.json") as f:
+        assert json.load(f)["#python"]["newest_id"] == "205"
@@ -8,3 +8,6 @@ class APIEnums(Enum):
 class FileFormats(Enum):
     CSV = ".csv"
     JSONL = ".jsonl"
+    JSONL_GZ = ".jsonl.gz"
+    JSONL_ZST = ".jsonl.zst"
+    PARQUET = ".parquet"
@@ -1,2 +1,6 @@
 class ValidationException(Exception):
     "API-specific Exception when an API-specific Validation Function fails."
+
+
+class CacheMissException(Exception):
+    "Raised in offline mode when a request has no cached response."
@@ -1,19 +1,26 @@
-from typing import Callable, Union, Optional
+from typing import Callable, Iterator, Union, Optional, Tuple
 import urllib.parse
 import urllib.request
 import urllib.error
 import json
 from socket import timeout
-from time import sleep
+from time import sleep, perf_counter
+from http import HTTPStatus
 from abc import ABC, abstractmethod
 import os
 import logging
 from dataclasses import dataclass, field
 
 from util.api_enums import APIEnums
-from util.api_exceptions import ValidationException
+from util.api_exceptions import ValidationException, CacheMissException
+from util.checkpoints import Checkpoint, CheckpointStore
 from util.dates import DateFormatter
+from util.file_formats import Formatter
 from util.gcp_utils import GCPUtil
+from util.json_codec import JSONCodec, get_codec
+from util.response_cache import ResponseCache
+from util.rate_limits import RateLimiter, RequestTiming, get_rate_limiter
+from util.transport import Transport, get_transport
 
 
 @dataclass
@@ -32,16 +39,32 @@ class APIBase(ABC):
     scheme: str = field(default=APIEnums.SCHEME.value)
 
     date_formatter: DateFormatter = DateFormatter()
+    rate_limiter: RateLimiter = field(default_factory=get_rate_limiter)
+    transport: Transport = field(default_factory=get_transport)
+    checkpoint_store: Optional[CheckpointStore] = None
+    response_cache: Optional[ResponseCache] = None
+    json_codec: JSONCodec = field(default_factory=get_codec)
+    # each API sets its own default, one formatter per instance
+    file_formatter: Optional[Formatter] = None
+    request_timings: list = field(default_factory=list, init=False)
 
     @property
     @abstractmethod
-    def file_formatter(self):
-        """Abstract property for file formatter"""
+    def filename(self) -> str:
+        """Abstract method for creating file name in which to write data."""
 
     @property
     @abstractmethod
-    def filename(self) -> str:
-        """Abstract method for creating file name in which to write data."""
+    def checkpoint_key(self) -> Tuple[str, str]:
+        """Abstract property for the (query, date) key of its checkpoints"""
+
+    @property
+    def incremental(self) -> bool:
+        """
+        Whether this run only fetches what is new since the last one, so
+        finishing it says nothing about the next run with the same key.
+        """
+        return False
 
     @property
     def exceptions(self):
@@ -53,10 +76,8 @@ class APIBase(ABC):
         )
 
     @abstractmethod
-    def validation_function(
-        self, response: urllib.request.Request
-    ) -> urllib.request.Request:
-        """Abstract method for API-specific validation functions."""
+    def validation_function(self, page: dict) -> None:
+        """Abstract method for API-specific validation of a parsed page."""
 
     @staticmethod
     def _encode_payload(payload: dict = None) -> Optional[bytes]:
@@ -90,9 +111,25 @@ class APIBase(ABC):
         request = urllib.request.Request(url, headers=headers, data=data)
         return request
 
-    def _send_request(self, request: urllib.request.Request) -> str:
+    @staticmethod
+    def rate_limit_key(request: urllib.request.Request) -> str:
+        """The endpoint whose rate limit a request counts against."""
+        return f"{request.host}{urllib.parse.urlparse(request.full_url).path}"
+
+    @property
+    def limiter_wait(self) -> float:
+        """Total seconds this API's requests spent waiting on the limiter."""
+        return sum(timing.limiter_wait for timing in self.request_timings)
+
+    @property
+    def network_time(self) -> float:
+        """Total seconds this API's requests spent waiting on the network."""
+        return sum(timing.network_time for timing in self.request_timings)
+
+    def _send_request(self, request: urllib.request.Request) -> bytes:
         """
-        Attempt to open a request, with the instantiated timeout
+        Attempt to send a request over the shared transport,
+        with the instantiated timeout, once the rate limiter allows it
 
         Parameters
         ---------
@@ -101,44 +138,76 @@ class APIBase(ABC):
 
         Returns
         -------
-        data: str
-            The decoded data from the request
+        data: bytes
+            The body of the response, left undecoded so it can be
+            parsed and written without copying it to a str
         """
-        with urllib.request.urlopen(request, timeout=self.timeout) as r:
-            data = r.read().decode()
+        key = self.rate_limit_key(request)
+        limiter_wait = self.rate_limiter.acquire(key)
+        start = perf_counter()
+        try:
+            response = self.transport.send(request, timeout=self.timeout)
+            data = response.body
+            self.rate_limiter.update(key, response.headers)
+        except urllib.error.HTTPError as e:
+            self.rate_limiter.update(
+                key,
+                e.headers,
+                throttled=e.code == HTTPStatus.TOO_MANY_REQUESTS,
+            )
+            raise e
+        finally:
+            self.request_timings.append(
+                RequestTiming(
+                    url=request.full_url,
+                    limiter_wait=limiter_wait,
+                    network_time=perf_counter() - start,
+                )
+            )
         return data
 
     def _retry_request(
         self, func: Callable, url: urllib.request.Request, **kwargs
-    ) -> Union[str, None]:
+    ) -> Union[bytes, None]:
         tries = self.tries
         delay = self.delay
 
         print(url.full_url)
 
-        while tries > 1:
+        while True:
             try:
                 result = func(url, **kwargs)
                 # if self.validation_function(result) is False:
                 #     raise self.validation_exception
                 return result
-            except Exception as e:
-                if e in self.exceptions:
-                    message = f"{str(e)}. Retrying in {delay} seconds."
-                else:
+            except self.exceptions as e:
+                tries -= 1
+                if tries < 1:
                     raise e
+                # the rate limiter already knows when to wake up,
+                # so don't add backoff on top of a known reset time
+                if (
+                    isinstance(e, urllib.error.HTTPError)
+                    and e.code == HTTPStatus.TOO_MANY_REQUESTS
+                    and self.rate_limiter.is_limited(self.rate_limit_key(url))
+                ):
+                    message = f"{str(e)}. Retrying when the rate limit resets."
+                    wait = 0
+                else:
+                    message = f"{str(e)}. Retrying in {delay} seconds."
+                    wait = delay
+                    delay *= self.backoff
                 print(message)
                 if self.logger is not None:
                     self.logger.warning(message)
-                sleep(delay)
-                tries -= 1
-                delay *= self.backoff
+                sleep(wait)
 
     def pull_request_data(
         self, request: urllib.request.Request, **kwargs
-    ) -> str:
+    ) -> bytes:
         """
-        Retry _send_request with allowable exceptions
+        Retry _send_request with allowable exceptions,
+        serving from and filling the response cache when one is set
 
         Parameters
         ----------
@@ -146,22 +215,132 @@ class APIBase(ABC):
         :param request:
         :param kwargs:
         :return:
+
+        Raises
+        ------
+        CacheMissException
+            if the response cache is offline and has no entry for the request
         """
+        if self.response_cache is not None:
+            data = self.response_cache.get(request)
+            if data is not None:
+                return data
+            if self.response_cache.offline:
+                raise CacheMissException(
+                    f"No cached response for {request.full_url}"
+                )
+
         data = self._retry_request(self._send_request, request, **kwargs)
+        if self.response_cache is not None:
+            self.response_cache.put(request, data)
         return data
 
     @abstractmethod
-    def get_responses():
-        """Abstract method for getting API responses"""
+    def get_responses(
+        self, n_pages: int = 5, next_token: str = None, page_count: int = 0
+    ) -> Iterator:
+        """
+        Abstract generator of API responses, one page at a time,
+        optionally continuing after `page_count` pages from `next_token`
+        """
+
+    @staticmethod
+    @abstractmethod
+    def get_next_token(page) -> Optional[str]:
+        """Abstract method for getting the pagination token from a page"""
 
-    # this should really write to temp files
-    def write_and_upload(self, bucket: str, **kwargs) -> None:
-        try:
-            self.file_formatter.write_file(
-                data=self.data, filename=self.filename
-            )
-            self.cloud_util.upload_file_to_bucket(filename, bucket, **kwargs)
-        except Exception as e:
-            raise e
-        finally:
+    def _resume_from(self, filename: str) -> Optional[Checkpoint]:
+        """
+        Find the checkpoint to resume from, if its output file survived
+        with at least as many complete pages as were checkpointed.
+        """
+        if (
+            self.checkpoint_store is None
+            or not self.file_formatter.resumable
+            or not os.path.exists(filename)
+        ):
+            return None
+        checkpoint = self.checkpoint_store.get(*self.checkpoint_key)
+        if checkpoint is None or checkpoint.complete:
+            return None
+        if self.file_formatter.valid_length(filename) < checkpoint.file_offset:
+            return None
+        return checkpoint
+
+    def write_pages(self, filename: str, n_pages: int = 5) -> int:
+        """
+        Stream pages from get_responses into a file as they arrive,
+        checkpointing after each page when a checkpoint store is set
+
+        Parameters
+        ----------
+        filename: str
+            Filename to write
+        n_pages: int
+            The maximum number of pages to pull
+
+        Returns
+        -------
+        page_count: int
+            The number of pages in the file
+        """
+        next_token, page_count, offset = None, 0, 0
+        checkpoint = self._resume_from(filename)
+        if checkpoint is not None:
+            next_token = checkpoint.next_token
+            page_count = checkpoint.page_count
+            offset = checkpoint.file_offset
+            print(f"Resuming {filename} after {page_count} pages")
+
+        with self.file_formatter.open_writer(
+            filename, offset=offset
+        ) as writer:
+            for page in self.get_responses(
+                n_pages=n_pages, next_token=next_token, page_count=page_count
+            ):
+                writer.write_page(page)
+                page_count += 1
+                if self.checkpoint_store is not None:
+                    self.checkpoint_store.save(
+                        Checkpoint(
+                            *self.checkpoint_key,
+                            next_token=self.get_next_token(page),
+                            page_count=page_count,
+                            file_offset=writer.tell(),
+                        )
+                    )
+        return page_count
+
+    def write_file(self, n_pages: int = 5) -> str:
+        """Write every page to this API's file, returning its name."""
+        filename = self.filename
+        self.write_pages(filename, n_pages=n_pages)
+        return filename
+
+    def finish(self, filename: str, uploaded: bool) -> None:
+        """
+        Mark a written file's run complete, or for incremental runs forget
+        its checkpoint, and remove the file if it was uploaded.
+        Call only once the file is wherever it is meant to be.
+        """
+        if self.checkpoint_store is not None:
+            if self.incremental:
+                self.checkpoint_store.delete(*self.checkpoint_key)
+            else:
+                self.checkpoint_store.mark_complete(*self.checkpoint_key)
+        if uploaded:
+            # only clean up once uploaded,
+            # so a failed run leaves its completed pages
             os.remove(filename)
+
+    def write_and_upload(
+        self, bucket: Optional[str] = None, n_pages: int = 5, **kwargs
+    ) -> None:
+        """
+        Write every page to a file and upload it, or with no bucket,
+        keep the file locally.
+        """
+        filename = self.write_file(n_pages=n_pages)
+        if bucket is not None:
+            self.cloud_util.upload_file_to_bucket(filename, bucket, **kwargs)
+        self.finish(filename, uploaded=bucket is not None)
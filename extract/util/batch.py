@@ -0,0 +1,159 @@
+from typing import Any, Callable, Iterable, List, Optional
+import json
+from time import perf_counter
+from dataclasses import dataclass, field
+
+from util.dates import DateFormatter
+
+
+@dataclass(frozen=True)
+class ExtractJob:
+    """
+    A single (api, query, date) unit of extraction work.
+    """
+
+    api: str
+    query: str
+    date: str
+    n_pages: int = 5
+
+    @property
+    def name(self) -> str:
+        return f"{self.api}:{self.query}:{self.date}"
+
+
+@dataclass
+class JobResult:
+    """
+    Outcome of running a single ExtractJob.
+    """
+
+    job: ExtractJob
+    elapsed: float
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+def read_manifest(manifest_file: str, n_pages: int = 5) -> List[ExtractJob]:
+    """
+    Read a JSONL manifest of extraction jobs.
+
+    Each line is a JSON object with `api`, `query` and `date` keys,
+    and an optional `n_pages` key.
+
+    Parameters
+    ----------
+    manifest_file: str
+        Path to the JSONL manifest
+    n_pages: int
+        Number of pages to pull for jobs that do not specify `n_pages`
+
+    Returns
+    -------
+    jobs: List[ExtractJob]
+        The jobs in manifest order
+
+    Raises
+    ------
+    ValueError
+        if a line is missing a required key or has an invalid date
+    """
+    date_formatter = DateFormatter()
+    jobs = []
+    with open(manifest_file, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            missing = {"api", "query", "date"} - entry.keys()
+            if missing:
+                raise ValueError(
+                    f"Line {line_number} of {manifest_file} is missing "
+                    + f"{', '.join(sorted(missing))}"
+                )
+            jobs.append(
+                ExtractJob(
+                    api=entry["api"],
+                    query=entry["query"],
+                    date=date_formatter.check_iso_8601(entry["date"]),
+                    n_pages=int(entry.get("n_pages", n_pages)),
+                )
+            )
+    return jobs
+
+
+@dataclass
+class BatchRunner:
+    """
+    Run independent extraction jobs concurrently on a bounded thread pool.
+
+    Each job runs `job_function` to completion on one worker, so pagination
+    within a job stays sequential while separate jobs overlap.
+    """
+
+    job_function: Callable[[ExtractJob], Any]
+    max_workers: int = 4
+    results: List[JobResult] = field(default_factory=list, init=False)
+
+    def _run_job(self, job: ExtractJob) -> JobResult:
+        start = perf_counter()
+        try:
+            result = self.job_function(job)
+        except Exception as e:
+            return JobResult(job=job, elapsed=perf_counter() - start, error=e)
+        return JobResult(
+            job=job, elapsed=perf_counter() - start, result=result
+        )
+
+    def run(self, jobs: Iterable[ExtractJob]) -> List[JobResult]:
+        """
+        Run every job, never letting one job's failure stop the others.
+
+        Parameters
+        ----------
+        jobs: Iterable[ExtractJob]
+            The jobs to run
+
+        Returns
+        -------
+        results: List[JobResult]
+            One result per job, in the order the jobs were given
+        """
+        # imported here, as it pulls in logging, to keep CLI startup fast
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        jobs = list(jobs)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._run_job, job): index
+                for index, job in enumerate(jobs)
+            }
+            results = [None] * len(jobs)
+            for future in as_completed(futures):
+                job_result = future.result()
+                status = "done" if job_result.succeeded else "failed"
+                print(
+                    f"{job_result.job.name} {status} "
+                    + f"in {job_result.elapsed:.2f}s"
+                )
+                results[futures[future]] = job_result
+        self.results = results
+        return results
+
+    @staticmethod
+    def report(results: List[JobResult]) -> str:
+        """Summarise a batch run, listing every failure."""
+        failures = [result for result in results if not result.succeeded]
+        lines = [
+            f"{len(results) - len(failures)} of {len(results)} jobs succeeded."
+        ]
+        for failure in failures:
+            lines.append(
+                f"  {failure.job.name}: {type(failure.error).__name__}: "
+                + f"{failure.error}"
+            )
+        return "\n".join(lines)
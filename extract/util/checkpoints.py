@@ -0,0 +1,101 @@
+from typing import Optional
+import sqlite3
+import threading
+from contextlib import closing
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    """
+    Progress of paginating one (query, date) pair.
+
+    `next_token` is the token for the next page to fetch, and `file_offset`
+    is the length of the output file once the last page was written.
+    """
+
+    query: str
+    date: str
+    next_token: Optional[str]
+    page_count: int
+    file_offset: int
+    complete: bool = False
+
+
+@dataclass(eq=False)
+class CheckpointStore:
+    """
+    SQLite-backed store of pagination checkpoints, keyed by (query, date).
+    """
+
+    path: str = "checkpoints.db"
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+
+    def __post_init__(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                create table if not exists checkpoints (
+                    query text not null,
+                    date text not null,
+                    next_token text,
+                    page_count integer not null,
+                    file_offset integer not null,
+                    complete integer not null default 0,
+                    updated_at text not null default current_timestamp,
+                    primary key (query, date)
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, query: str, date: str) -> Optional[Checkpoint]:
+        with self._lock, closing(self._connect()) as conn:
+            row = conn.execute(
+                "select query, date, next_token, page_count, file_offset, "
+                + "complete from checkpoints where query = ? and date = ?",
+                (query, str(date)),
+            ).fetchone()
+        if row is None:
+            return None
+        return Checkpoint(*row[:-1], complete=bool(row[-1]))
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "insert or replace into checkpoints "
+                + "(query, date, next_token, page_count, file_offset, "
+                + "complete) values (?, ?, ?, ?, ?, ?)",
+                (
+                    checkpoint.query,
+                    str(checkpoint.date),
+                    checkpoint.next_token,
+                    checkpoint.page_count,
+                    checkpoint.file_offset,
+                    int(checkpoint.complete),
+                ),
+            )
+
+    def mark_complete(self, query: str, date: str) -> None:
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "insert into checkpoints "
+                + "(query, date, page_count, file_offset, complete) "
+                + "values (?, ?, 0, 0, 1) "
+                + "on conflict (query, date) do update "
+                + "set complete = 1, updated_at = current_timestamp",
+                (query, str(date)),
+            )
+
+    def delete(self, query: str, date: str) -> None:
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "delete from checkpoints where query = ? and date = ?",
+                (query, str(date)),
+            )
+
+    def is_complete(self, query: str, date: str) -> bool:
+        checkpoint = self.get(query, date)
+        return checkpoint is not None and checkpoint.complete
@@ -8,7 +8,7 @@ class DateFormatter:
 
     @property
     def iso_8601(self):
-        return "%Y-%M-%d"
+        return "%Y-%m-%d"
 
     @staticmethod
     def get_yesterday() -> date:
@@ -1,20 +1,187 @@
-import json
+from typing import IO, Any, Callable, Iterable, Optional, Union
+import os
+import io
 import csv
-from pathlib import Path
+import gzip
+from enum import Enum
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 
 from util.api_enums import FileFormats
+from util.json_codec import JSONCodec, get_codec
+from util.records import Tweet, page_tweets
+
+TWEET_COLUMNS = tuple(f.name for f in fields(Tweet))
 
 
 @dataclass
+class PageWriter(ABC):
+    """
+    Abstract class for writing pages of results to an open file,
+    one page at a time, so that only one page is held in memory.
+    """
+
+    file: IO
+
+    @abstractmethod
+    def write_page(self, page: Any) -> None:
+        """Abstract method for writing and flushing a single page"""
+
+    def tell(self) -> int:
+        """The file offset just past the last page written"""
+        return self.file.tell()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+@dataclass
+class JSONLWriter(PageWriter):
+    """
+    Writes each page as one JSON line.
+
+    Pages that still hold the bytes they were parsed from are copied
+    out as they are, rather than serialized again.
+    """
+
+    codec: JSONCodec = field(default_factory=get_codec)
+
+    def encode_page(self, page: Any) -> bytes:
+        raw = getattr(page, "raw", None)
+        # pretty-printed responses would span several lines
+        if raw is not None and b"\n" not in raw:
+            return raw + b"\n"
+        return self.codec.dumps(page) + b"\n"
+
+    def write_page(self, page: Any) -> None:
+        # a single write per page, so a crash leaves at most one partial line
+        self.file.write(self.encode_page(page))
+        self.file.flush()
+
+
+@dataclass
+class CompressedJSONLWriter(JSONLWriter):
+    """
+    Writes each page as one JSON line, compressed into its own frame.
+
+    Concatenated gzip members and zstd frames decompress as one stream,
+    so the file stays valid after every page and can be continued.
+    """
+
+    compress: Callable[[bytes], bytes] = None
+
+    def encode_page(self, page: Any) -> bytes:
+        return self.compress(super().encode_page(page))
+
+
+@dataclass
+class CSVWriter(PageWriter):
+    """
+    Writes each page as a block of CSV rows.
+
+    Pages of API results are flattened into one row per Tweet, under a
+    header row written at the start of the file. Multi-valued fields are
+    joined with spaces.
+    """
+
+    def encode_row(self, tweet: Tweet) -> list:
+        return [
+            " ".join(map(str, value)) if isinstance(value, tuple) else value
+            for value in (getattr(tweet, column) for column in TWEET_COLUMNS)
+        ]
+
+    def encode_page(self, page: Union[dict, Iterable[Iterable]]) -> bytes:
+        text = io.StringIO(newline="")
+        writer = csv.writer(text)
+        if isinstance(page, dict):
+            if self.file.tell() == 0:
+                writer.writerow(TWEET_COLUMNS)
+            page = map(self.encode_row, page_tweets(page))
+        writer.writerows(page)
+        return text.getvalue().encode("utf-8")
+
+    def write_page(self, page: Union[dict, Iterable[Iterable]]) -> None:
+        # a single write per page, as with JSONL
+        self.file.write(self.encode_page(page))
+        self.file.flush()
+
+
+@dataclass
+class ParquetPageWriter(PageWriter):
+    """
+    Writes each page of Tweets as one Parquet row group
+    """
+
+    flatten_page: Callable[[dict], dict] = None
+
+    def __post_init__(self):
+        import pyarrow.parquet as pq
+
+        self.schema = ParquetFormatter.schema()
+        self.writer = pq.ParquetWriter(self.file, self.schema)
+
+    def write_page(self, page: dict) -> None:
+        import pyarrow as pa
+
+        columns = self.flatten_page(page)
+        if columns["id"]:
+            self.writer.write_batch(
+                pa.RecordBatch.from_pydict(columns, schema=self.schema)
+            )
+
+    def close(self) -> None:
+        self.writer.close()
+        self.file.close()
+
+
+@dataclass(frozen=True)
 class Formatter(ABC):
     file_format: str
+    resumable: bool = field(default=True, init=False)
 
-    @staticmethod
     @abstractmethod
-    def write_file(data: list, filename: str) -> None:
-        """Abstract method for writing a file"""
+    def open_writer(self, filename: str, offset: int = 0) -> PageWriter:
+        """Abstract method for opening a file for writing pages"""
+
+    @staticmethod
+    def _open_at(filename: str, offset: int = 0) -> IO:
+        """
+        Open a file for binary writing, keeping the first `offset` bytes
+        of any existing file and discarding the rest.
+        """
+        if offset and os.path.exists(filename):
+            f = open(filename, "r+b")
+            f.truncate(offset)
+            f.seek(offset)
+            return f
+        return open(filename, "wb")
+
+    def valid_length(self, filename: str) -> int:
+        """
+        The number of bytes at the start of a file that hold complete pages.
+        """
+        return os.path.getsize(filename)
+
+    def write_file(self, data: Iterable, filename: str) -> None:
+        """
+        Write every page of data to a file
+
+        Parameters
+        ---------
+        data: Iterable
+            Pages to write, e.g. a generator of API responses
+        filename: str
+            Filename to write
+        """
+        with self.open_writer(filename) as writer:
+            for page in data:
+                writer.write_page(page)
 
     def check_file(self, filename: str):
         """
@@ -31,38 +198,50 @@ class Formatter(ABC):
         TypeError
             if the file does not have the appropriate extension
         """
-        file_suffix = Path(filename).suffix
-        if file_suffix != self.file_format:
+        if not filename.endswith(self.file_format):
             raise TypeError(f"Please use {self.file_format} file extension.")
 
 
-@dataclass
+@dataclass(frozen=True)
 class JSONLFormatter(Formatter):
     """
     Formatter for checking and writing JSONL files
     """
 
     file_format: str = field(default=FileFormats.JSONL.value, init=False)
+    codec: JSONCodec = field(default_factory=get_codec)
 
-    @staticmethod
-    def write_file(data: list, filename: str) -> None:
+    def open_writer(self, filename: str, offset: int = 0) -> JSONLWriter:
         """
-        Write data to a .jsonl file
+        Open a .jsonl file for writing one page per line
 
         Parameters
         ---------
-        data: list
-            List of JSONL data to write
         filename: str
             Filename to write
+        offset: int
+            Byte offset at which to continue an existing file
         """
-        with open(filename, "w+") as f:
-            for line in data:
-                json.dump(line, f)
-                f.write("\n")
+        return JSONLWriter(self._open_at(filename, offset), codec=self.codec)
 
+    def valid_length(self, filename: str, chunk_size: int = 1 << 16) -> int:
+        """
+        The number of bytes up to and including the last newline,
+        i.e. excluding any partially written final page.
+        """
+        with open(filename, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(end - chunk_size, 0)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline != -1:
+                    return start + newline + 1
+                end = start
+        return 0
 
-@dataclass
+
+@dataclass(frozen=True)
 class CSVFormatter(Formatter):
     """
     Formatter for checking and writing CSV files
@@ -70,8 +249,20 @@ class CSVFormatter(Formatter):
 
     file_format: str = field(default=FileFormats.CSV.value, init=False)
 
-    @staticmethod
-    def write_file(data: list, filename: str) -> None:
+    def open_writer(self, filename: str, offset: int = 0) -> CSVWriter:
+        """
+        Open a .csv file for writing pages of Tweets, or of rows
+
+        Parameters
+        ---------
+        filename: str
+            Filename to write
+        offset: int
+            Byte offset at which to continue an existing file
+        """
+        return CSVWriter(self._open_at(filename, offset))
+
+    def write_file(self, data: list, filename: str) -> None:
         """
         Write data to a .csv file
 
@@ -82,6 +273,203 @@ class CSVFormatter(Formatter):
         filename: str
             Filename to write
         """
-        with open(filename, "w+") as f:
-            writer = csv.writer(f)
-            writer.writerows(data)
+        with self.open_writer(filename) as writer:
+            writer.write_page(data)
+
+
+@dataclass(frozen=True)
+class GzipJSONLFormatter(JSONLFormatter):
+    """
+    Formatter for checking and writing gzip-compressed JSONL files
+    """
+
+    file_format: str = field(default=FileFormats.JSONL_GZ.value, init=False)
+    compresslevel: int = 6
+
+    def open_writer(
+        self, filename: str, offset: int = 0
+    ) -> CompressedJSONLWriter:
+        """
+        Open a .jsonl.gz file for writing one gzip member per page
+
+        Parameters
+        ---------
+        filename: str
+            Filename to write
+        offset: int
+            Byte offset at which to continue an existing file
+        """
+        return CompressedJSONLWriter(
+            self._open_at(filename, offset),
+            codec=self.codec,
+            compress=lambda data: gzip.compress(
+                data, compresslevel=self.compresslevel, mtime=0
+            ),
+        )
+
+    def valid_length(self, filename: str) -> int:
+        return Formatter.valid_length(self, filename)
+
+
+@dataclass(frozen=True)
+class ZstdJSONLFormatter(JSONLFormatter):
+    """
+    Formatter for checking and writing zstd-compressed JSONL files.
+
+    Requires the optional `zstandard` package.
+    """
+
+    file_format: str = field(default=FileFormats.JSONL_ZST.value, init=False)
+    level: int = 3
+
+    def open_writer(
+        self, filename: str, offset: int = 0
+    ) -> CompressedJSONLWriter:
+        """
+        Open a .jsonl.zst file for writing one zstd frame per page
+
+        Parameters
+        ---------
+        filename: str
+            Filename to write
+        offset: int
+            Byte offset at which to continue an existing file
+        """
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(
+                "Install `zstandard` to write .jsonl.zst files."
+            ) from e
+        compressor = zstandard.ZstdCompressor(level=self.level)
+        return CompressedJSONLWriter(
+            self._open_at(filename, offset),
+            codec=self.codec,
+            compress=compressor.compress,
+        )
+
+    def valid_length(self, filename: str) -> int:
+        return Formatter.valid_length(self, filename)
+
+
+@dataclass(frozen=True)
+class ParquetFormatter(Formatter):
+    """
+    Formatter for writing Tweets as typed Parquet columns,
+    one row group per page.
+
+    Requires the optional `pyarrow` package. Parquet files are only
+    valid once closed, so an interrupted file is rewritten from scratch.
+    """
+
+    file_format: str = field(default=FileFormats.PARQUET.value, init=False)
+    resumable: bool = field(default=False, init=False)
+
+    @staticmethod
+    def schema():
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError(
+                "Install `pyarrow` to write .parquet files."
+            ) from e
+        return pa.schema(
+            [
+                ("id", pa.int64()),
+                ("author_id", pa.int64()),
+                ("created_at", pa.timestamp("ms", tz="UTC")),
+                ("lang", pa.string()),
+                ("text", pa.string()),
+                ("hashtags", pa.list_(pa.string())),
+                ("referenced_tweet_ids", pa.list_(pa.int64())),
+            ]
+        )
+
+    @classmethod
+    def flatten_page(cls, page: dict) -> dict:
+        """
+        Flatten a page of Tweets into columns
+
+        Parameters
+        ---------
+        page: dict
+            A page of API results, with Tweets under `data`
+
+        Returns
+        -------
+        columns: dict
+            Column name to list of values, one per Tweet
+        """
+        tweets = page_tweets(page)
+        return {
+            "id": [tweet.id for tweet in tweets],
+            "author_id": [tweet.author_id for tweet in tweets],
+            "created_at": [tweet.created_at for tweet in tweets],
+            "lang": [tweet.lang for tweet in tweets],
+            "text": [tweet.text for tweet in tweets],
+            "hashtags": [list(tweet.hashtags) for tweet in tweets],
+            "referenced_tweet_ids": [
+                list(tweet.referenced_tweet_ids) for tweet in tweets
+            ],
+        }
+
+    def open_writer(self, filename: str, offset: int = 0) -> ParquetPageWriter:
+        """
+        Open a .parquet file for writing one row group per page
+
+        Parameters
+        ---------
+        filename: str
+            Filename to write
+        offset: int
+            Ignored; Parquet files cannot be continued
+        """
+        return ParquetPageWriter(
+            self._open_at(filename), flatten_page=self.flatten_page
+        )
+
+
+class Formatters(Enum):
+    CSV = CSVFormatter
+    JSONL = JSONLFormatter
+    JSONL_GZ = GzipJSONLFormatter
+    JSONL_ZST = ZstdJSONLFormatter
+    PARQUET = ParquetFormatter
+
+
+def get_formatter(name: str) -> Formatter:
+    try:
+        return Formatters[name.upper()].value()
+    except KeyError:
+        raise ValueError(f"Invalid file format: {name}")
+
+
+def open_jsonl(filename: str) -> IO[bytes]:
+    """
+    Open a plain, gzip- or zstd-compressed JSONL file for binary reading
+    """
+    if filename.endswith(FileFormats.JSONL_GZ.value):
+        return gzip.open(filename, "rb")
+    if filename.endswith(FileFormats.JSONL_ZST.value):
+        import zstandard
+
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(
+                open(filename, "rb"), read_across_frames=True, closefd=True
+            )
+        )
+    return open(filename, "rb")
+
+
+def iter_pages(
+    filename: str, codec: Optional[JSONCodec] = None
+) -> Iterable[dict]:
+    """
+    Lazily read pages back from a JSONL file written by a formatter,
+    skipping a partially written final page
+    """
+    loads = (codec or get_codec()).loads
+    with open_jsonl(filename) as f:
+        for line in f:
+            if line.endswith(b"\n"):
+                yield loads(line)
@@ -1,14 +1,82 @@
-from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+import os
+from functools import lru_cache
+from dataclasses import dataclass
 
-from google.cloud.storage import Client
+if TYPE_CHECKING:
+    from google.cloud.storage import Client
 
 
-@dataclass(init=False, frozen=True)
+@lru_cache(maxsize=None)
+def get_gcs_client() -> "Client":
+    """
+    Build the process-wide GCS client on first use.
+
+    Importing google.cloud.storage and discovering credentials is slow,
+    so it is deferred until something is actually uploaded.
+    """
+    from google.cloud.storage import Client
+
+    return Client()
+
+
+@dataclass(frozen=True)
 class GCPUtil:
-    gcs_client: Client = Client()
+    client: Optional["Client"] = None
+    # files above this size are sent as resumable uploads, chunk by chunk,
+    # so a transient error only re-sends the chunk in flight
+    chunk_size: int = 8 * 1024 * 1024
+    max_workers: int = 8
+
+    @property
+    def gcs_client(self) -> "Client":
+        return self.client if self.client is not None else get_gcs_client()
 
     def upload_file_to_bucket(self, filename, bucket, **kwargs):
-        bucket = self.gcs_client.get_bucket(bucket)
-        blob = bucket.blob(filename)
+        # `bucket()` builds a reference locally, unlike `get_bucket()`,
+        # which makes a metadata request before every upload
+        bucket = self.gcs_client.bucket(bucket)
+        chunk_size = (
+            self.chunk_size
+            if os.path.getsize(filename) > self.chunk_size
+            else None
+        )
+        blob = bucket.blob(filename, chunk_size=chunk_size)
+        if "retry" not in kwargs:
+            from google.cloud.storage.retry import DEFAULT_RETRY
+
+            kwargs["retry"] = DEFAULT_RETRY
         blob.upload_from_filename(filename, **kwargs)
-        print(f"Uploaded {filename} to {bucket}")
+        print(f"Uploaded {filename} to {bucket.name}")
+
+    def upload_files_to_bucket(
+        self, filenames: Iterable[str], bucket: str, **kwargs
+    ) -> List[Tuple[str, Optional[Exception]]]:
+        """
+        Upload many files concurrently through the shared client
+
+        Parameters
+        ----------
+        filenames: Iterable[str]
+            The files to upload, each to a blob of the same name
+        bucket: str
+            The GCS Bucket in which to upload them
+
+        Returns
+        -------
+        results: List[Tuple[str, Optional[Exception]]]
+            Each filename with the exception that stopped its upload,
+            or None if it was uploaded
+        """
+
+        def upload(filename: str) -> Tuple[str, Optional[Exception]]:
+            try:
+                self.upload_file_to_bucket(filename, bucket, **kwargs)
+            except Exception as e:
+                return filename, e
+            return filename, None
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(upload, filenames))
@@ -0,0 +1,143 @@
+from typing import Any, Optional, Union
+import json
+from enum import Enum
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+
+class Page(dict):
+    """
+    A parsed API response that remembers the bytes it was parsed from,
+    so writers can copy them out again instead of re-serializing.
+
+    Treat a Page as read-only: `raw` is not updated if it is changed.
+    """
+
+    __slots__ = ("raw",)
+
+    def __init__(self, parsed: dict, raw: Optional[bytes] = None):
+        super().__init__(parsed)
+        self.raw = raw
+
+
+@dataclass(frozen=True)
+class JSONCodec(ABC):
+    """
+    Abstract class for parsing and serializing JSON
+    """
+
+    @abstractmethod
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """Abstract method for parsing JSON"""
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        """Abstract method for serializing compact UTF-8 JSON"""
+
+    def load_page(self, data: Union[bytes, str]) -> Any:
+        """
+        Parse a response once, keeping its bytes for the writer
+        when it is a JSON object
+        """
+        parsed = self.loads(data)
+        if not isinstance(parsed, dict):
+            return parsed
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return Page(parsed, raw=data)
+
+
+@dataclass(frozen=True)
+class StdlibCodec(JSONCodec):
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+
+@dataclass(frozen=True)
+class OrjsonCodec(JSONCodec):
+    """
+    Codec backed by the optional `orjson` package.
+    """
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        import orjson
+
+        return orjson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        import orjson
+
+        return orjson.dumps(obj)
+
+
+@dataclass(frozen=True)
+class MsgspecCodec(JSONCodec):
+    """
+    Codec backed by the optional `msgspec` package.
+    """
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        import msgspec
+
+        return msgspec.json.decode(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        import msgspec
+
+        return msgspec.json.encode(obj)
+
+
+class Codecs(Enum):
+    # in order of preference
+    ORJSON = ("orjson", OrjsonCodec)
+    MSGSPEC = ("msgspec", MsgspecCodec)
+    STDLIB = ("json", StdlibCodec)
+
+    @property
+    def module(self) -> str:
+        return self.value[0]
+
+    @property
+    def codec(self) -> type:
+        return self.value[1]
+
+    @property
+    def available(self) -> bool:
+        from importlib.util import find_spec
+
+        return find_spec(self.module) is not None
+
+
+_codec: Optional[JSONCodec] = None
+
+
+def get_codec(name: Optional[str] = None) -> JSONCodec:
+    """
+    A JSON codec by name, or without a name, the fastest one installed
+
+    Raises
+    ------
+    ValueError
+        if the name is not a codec
+    ImportError
+        if the named codec's package is not installed
+    """
+    global _codec
+    if name is None:
+        if _codec is None:
+            _codec = next(
+                codecs.codec() for codecs in Codecs if codecs.available
+            )
+        return _codec
+    try:
+        codecs = Codecs[name.upper()]
+    except KeyError:
+        raise ValueError(f"Invalid JSON codec: {name}")
+    if not codecs.available:
+        raise ImportError(
+            f"Install `{codecs.module}` to use the {name} codec."
+        )
+    return codecs.codec()
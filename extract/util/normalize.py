@@ -0,0 +1,269 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+import hashlib
+import json
+import os
+from enum import Enum
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from util.api_enums import FileFormats
+from util.file_formats import Formatter, JSONLFormatter, iter_pages
+
+
+class Entities(Enum):
+    """
+    Where each kind of entity appears in a page, and the field keying it
+    """
+
+    TWEETS = ("id", ("data", "includes.tweets"))
+    USERS = ("id", ("includes.users",))
+    MEDIA = ("media_key", ("includes.media",))
+    PLACES = ("id", ("includes.places",))
+
+    @property
+    def key(self) -> str:
+        return self.value[0]
+
+    @property
+    def paths(self) -> Sequence[str]:
+        return self.value[1]
+
+    def find(self, page: dict) -> Iterable[dict]:
+        """Every entity of this kind in a page, duplicates included"""
+        for path in self.paths:
+            found = page
+            for part in path.split("."):
+                found = (found or {}).get(part)
+            yield from found or []
+
+
+def entity_id(key: str) -> int:
+    """
+    An int64 for an entity's key: numeric ids are used as they are,
+    other keys (e.g. media keys or hex place ids) are hashed
+    """
+    if key.isdigit() and int(key) < 1 << 63:
+        return int(key)
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+@dataclass
+class SeenIds:
+    """
+    The set of ids seen so far, as a sorted int64 array.
+
+    New ids collect in a small set and are merged into the sorted array
+    once `buffer_size` of them have built up, so memory stays close to
+    8 bytes per id and lookups are a binary search.
+    """
+
+    buffer_size: int = 1 << 16
+    ids: np.ndarray = field(default_factory=lambda: np.empty(0, np.int64))
+    _pending: set = field(default_factory=set, init=False)
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self._pending)
+
+    def add(self, ids: Sequence[int]) -> List[bool]:
+        """
+        Record a batch of ids
+
+        Returns
+        -------
+        new: List[bool]
+            For each id, whether it was seen for the first time,
+            so a repeated id within the batch is only new once
+        """
+        batch = np.fromiter(ids, dtype=np.int64, count=len(ids))
+        positions = np.searchsorted(self.ids, batch)
+        stored = np.zeros(len(batch), dtype=bool)
+        if len(self.ids):
+            found = positions < len(self.ids)
+            stored[found] = self.ids[positions[found]] == batch[found]
+        new = []
+        for id_, seen in zip(batch.tolist(), stored.tolist()):
+            is_new = not seen and id_ not in self._pending
+            if is_new:
+                self._pending.add(id_)
+            new.append(is_new)
+        if len(self._pending) >= self.buffer_size:
+            self.flush()
+        return new
+
+    def flush(self) -> None:
+        """Merge pending ids into the sorted array"""
+        if not self._pending:
+            return
+        pending = np.fromiter(self._pending, np.int64, len(self._pending))
+        self.ids = np.union1d(self.ids, pending)
+        self._pending = set()
+
+
+def output_stem(filename: str) -> str:
+    """A file's base name without any extract/main.py file extension"""
+    basename = os.path.basename(filename)
+    for file_format in sorted(
+        (file_format.value for file_format in FileFormats), key=len
+    )[::-1]:
+        if basename.endswith(file_format):
+            return basename[: -len(file_format)]
+    return os.path.splitext(basename)[0]
+
+
+@dataclass
+class Normalizer:
+    """
+    Splits pages into one file per entity kind, writing every Tweet,
+    User, media item and Place once across all the files it is given.
+
+    Each input file gets an output file of the same name per kind, e.g.
+    `tweets/#python_2022-12-01.jsonl`, holding pages shaped like the
+    input, `{"data": [...]}`, with only the entities not seen before.
+    The seen ids and the length of every output are saved in
+    `index.npz` once a batch of files is done, so a later batch skips
+    entities written by earlier ones, and an interrupted batch is
+    rolled back and redone.
+    """
+
+    directory: str
+    file_formatter: Formatter = field(default=JSONLFormatter())
+    buffer_size: int = 1 << 16
+    seen: Dict[Entities, SeenIds] = field(init=False)
+    sources: Dict[str, str] = field(init=False)
+    lengths: Dict[str, int] = field(init=False)
+
+    def __post_init__(self):
+        if not self.file_formatter.resumable:
+            raise ValueError(
+                f"Cannot append to {self.file_formatter.file_format} files."
+            )
+        self.seen = {
+            entities: SeenIds(buffer_size=self.buffer_size)
+            for entities in Entities
+        }
+        self.sources = {}
+        self.lengths = {}
+        if os.path.exists(self.index_path):
+            self._load()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, "index.npz")
+
+    def _load(self) -> None:
+        with np.load(self.index_path) as data:
+            for entities in Entities:
+                self.seen[entities].ids = data[entities.name.lower()]
+            state = json.loads(data["state"].tobytes().decode("utf-8"))
+        self.sources = state["sources"]
+        self.lengths = state["lengths"]
+
+    def _save(self) -> None:
+        state = json.dumps({"sources": self.sources, "lengths": self.lengths})
+        arrays = {}
+        for entities, seen in self.seen.items():
+            seen.flush()
+            arrays[entities.name.lower()] = seen.ids
+        path = f"{self.index_path}.tmp.npz"
+        np.savez(
+            path,
+            state=np.frombuffer(state.encode("utf-8"), np.uint8),
+            **arrays,
+        )
+        # the index is the commit point for every output written before it
+        os.replace(path, self.index_path)
+
+    def output_path(self, entities: Entities, filename: str) -> str:
+        return os.path.join(
+            self.directory,
+            entities.name.lower(),
+            output_stem(filename) + self.file_formatter.file_format,
+        )
+
+    @staticmethod
+    def _version(filename: str) -> str:
+        stat = os.stat(filename)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def new_entities(self, entities: Entities, page: dict) -> List[dict]:
+        """The entities of one kind in a page that were not seen before"""
+        found = list(entities.find(page))
+        new = self.seen[entities].add(
+            [entity_id(entity[entities.key]) for entity in found]
+        )
+        return [entity for entity, is_new in zip(found, new) if is_new]
+
+    def normalize_file(self, filename: str) -> Dict[Entities, int]:
+        """
+        Write the new entities in one file
+
+        Returns
+        -------
+        counts: Dict[Entities, int]
+            The number of new entities written of each kind
+        """
+        writers = {}
+        for entities in Entities:
+            path = self.output_path(entities, filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            writers[entities] = self.file_formatter.open_writer(
+                path, self.lengths.get(path, 0)
+            )
+        counts = dict.fromkeys(Entities, 0)
+        try:
+            for page in iter_pages(filename):
+                for entities, writer in writers.items():
+                    new = self.new_entities(entities, page)
+                    if new:
+                        writer.write_page({"data": new})
+                        counts[entities] += len(new)
+        finally:
+            for entities, writer in writers.items():
+                self.lengths[
+                    self.output_path(entities, filename)
+                ] = writer.tell()
+                writer.close()
+        return counts
+
+    def normalize(self, filenames: Iterable[str]) -> Dict[Entities, int]:
+        """
+        Write the new entities in every new or changed file
+
+        Parameters
+        ----------
+        filenames: Iterable[str]
+            JSONL files of pages, as written by extract/main.py
+
+        Returns
+        -------
+        counts: Dict[Entities, int]
+            The number of new entities written of each kind
+        """
+        totals = dict.fromkeys(Entities, 0)
+        for filename in filenames:
+            version = self._version(filename)
+            if self.sources.get(os.path.basename(filename)) == version:
+                continue
+            for entities, count in self.normalize_file(filename).items():
+                totals[entities] += count
+            self.sources[os.path.basename(filename)] = version
+        self._save()
+        return totals
+
+
+def normalize_files(
+    filenames: Iterable[str],
+    directory: str,
+    file_formatter: Optional[Formatter] = None,
+) -> Dict[Entities, int]:
+    """
+    Dedupe and split the entities in some JSONL files into `directory`
+    """
+    normalizer = (
+        Normalizer(directory)
+        if file_formatter is None
+        else Normalizer(directory, file_formatter=file_formatter)
+    )
+    return normalizer.normalize(filenames)
@@ -0,0 +1,175 @@
+from typing import Callable, Dict, Mapping, Optional
+import threading
+import time
+from enum import Enum
+from dataclasses import dataclass, field
+
+
+class RateLimitHeaders(Enum):
+    LIMIT = "x-rate-limit-limit"
+    REMAINING = "x-rate-limit-remaining"
+    RESET = "x-rate-limit-reset"
+    RETRY_AFTER = "retry-after"
+
+
+@dataclass
+class TokenBucket:
+    """
+    Request quota for one endpoint, as last reported by the API.
+    """
+
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset_at: Optional[float] = None
+    next_request_at: float = 0.0
+
+
+@dataclass(frozen=True)
+class RequestTiming:
+    """
+    Time a single request spent waiting on the rate limiter
+    versus waiting on the network.
+    """
+
+    url: str
+    limiter_wait: float
+    network_time: float
+
+
+@dataclass(eq=False)
+class RateLimiter:
+    """
+    Thread-safe token-bucket scheduler keyed by endpoint.
+
+    Buckets are refilled from the API's rate limit response headers.
+    Requests are spaced evenly over whatever is left of the current window,
+    holding back `headroom` requests, and once a bucket is spent callers
+    sleep until its reset time.
+    """
+
+    headroom: int = 1
+    clock: Callable[[], float] = time.time
+    sleep: Callable[[float], None] = time.sleep
+    buckets: Dict[str, TokenBucket] = field(default_factory=dict, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+
+    def _reserve(self, key: str) -> float:
+        """
+        Take a token for `key` if one is available.
+
+        Returns
+        -------
+        delay: float
+            0 if a token was taken, otherwise the number of seconds
+            to wait before asking again
+        """
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            return 0.0
+        now = self.clock()
+
+        if bucket.reset_at is not None and now >= bucket.reset_at:
+            bucket.remaining = bucket.limit
+            bucket.reset_at = None
+            bucket.next_request_at = 0.0
+        if bucket.next_request_at > now:
+            return bucket.next_request_at - now
+        if bucket.remaining is None or bucket.reset_at is None:
+            return 0.0
+        if bucket.remaining <= self.headroom:
+            return bucket.reset_at - now
+
+        bucket.remaining -= 1
+        spare = bucket.remaining - self.headroom
+        if spare > 0:
+            bucket.next_request_at = now + (bucket.reset_at - now) / (
+                spare + 1
+            )
+        return 0.0
+
+    def acquire(self, key: str) -> float:
+        """
+        Block until a request to `key` is allowed.
+
+        Parameters
+        ----------
+        key: str
+            The endpoint being requested
+
+        Returns
+        -------
+        waited: float
+            The number of seconds spent waiting on the limiter
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                delay = self._reserve(key)
+            if delay <= 0:
+                return waited
+            self.sleep(delay)
+            waited += delay
+
+    @staticmethod
+    def _parse_header(headers: Mapping, header: RateLimitHeaders):
+        value = headers.get(header.value)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            return None
+
+    def update(
+        self, key: str, headers: Mapping, throttled: bool = False
+    ) -> None:
+        """
+        Record the quota reported by an API response.
+
+        Parameters
+        ----------
+        key: str
+            The endpoint that was requested
+        headers: Mapping
+            The response headers
+        throttled: bool
+            Whether the request was rejected for exceeding the rate limit,
+            in which case the bucket is emptied until it resets
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+        limit = self._parse_header(headers, RateLimitHeaders.LIMIT)
+        remaining = self._parse_header(headers, RateLimitHeaders.REMAINING)
+        reset = self._parse_header(headers, RateLimitHeaders.RESET)
+        retry_after = self._parse_header(headers, RateLimitHeaders.RETRY_AFTER)
+
+        with self._lock:
+            bucket = self.buckets.setdefault(key, TokenBucket())
+            if limit is not None:
+                bucket.limit = limit
+            if remaining is not None:
+                bucket.remaining = remaining
+            if reset is not None:
+                bucket.reset_at = float(reset)
+            if throttled:
+                bucket.remaining = 0
+                if retry_after is not None:
+                    bucket.reset_at = self.clock() + retry_after
+
+    def is_limited(self, key: str) -> bool:
+        """Whether requests to `key` are held until a known reset time."""
+        with self._lock:
+            bucket = self.buckets.get(key)
+            return (
+                bucket is not None
+                and bucket.reset_at is not None
+                and bucket.remaining is not None
+                and bucket.remaining <= self.headroom
+            )
+
+
+_rate_limiter = RateLimiter()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """The RateLimiter shared by every API in this process."""
+    return _rate_limiter
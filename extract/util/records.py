@@ -0,0 +1,65 @@
+from typing import Optional, Tuple
+from datetime import datetime
+from dataclasses import dataclass
+
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value is not None else None
+
+
+def _timestamp(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+@dataclass(frozen=True, slots=True)
+class Tweet:
+    """
+    The fields of a Tweet that the pipeline uses, without a per-record
+    __dict__, and with ids as ints rather than strings.
+    """
+
+    id: int
+    author_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    lang: Optional[str] = None
+    text: Optional[str] = None
+    hashtags: Tuple[str, ...] = ()
+    referenced_tweet_ids: Tuple[int, ...] = ()
+
+    @classmethod
+    def from_dict(cls, tweet: dict) -> "Tweet":
+        return cls(
+            id=int(tweet["id"]),
+            author_id=_optional_int(tweet.get("author_id")),
+            created_at=_timestamp(tweet.get("created_at")),
+            lang=tweet.get("lang"),
+            text=tweet.get("text"),
+            hashtags=tuple(
+                hashtag["tag"]
+                for hashtag in (tweet.get("entities") or {}).get(
+                    "hashtags", ()
+                )
+            ),
+            referenced_tweet_ids=tuple(
+                int(referenced["id"])
+                for referenced in tweet.get("referenced_tweets", ())
+            ),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class HashtagEdge:
+    """
+    Two hashtags that appeared in the same Tweets, `weight` times
+    """
+
+    source: str
+    target: str
+    weight: int = 1
+
+
+def page_tweets(page: dict) -> Tuple[Tweet, ...]:
+    """The Tweets under `data` in a page, as records"""
+    return tuple(Tweet.from_dict(tweet) for tweet in page.get("data") or ())
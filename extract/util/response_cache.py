@@ -0,0 +1,103 @@
+from typing import Optional
+import gzip
+import hashlib
+import os
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass, field
+
+
+@dataclass(eq=False)
+class ResponseCache:
+    """
+    Content-addressed, on-disk cache of raw response bodies.
+
+    Entries are keyed on the request method, URL and payload, never the
+    headers, so credentials do not affect or leak into the cache. Bodies are
+    stored gzip-compressed; each file's mtime is when it was cached and its
+    atime when it was last read, for TTL expiry and LRU eviction.
+    """
+
+    directory: str = ".response_cache"
+    ttl: Optional[float] = 24 * 60 * 60
+    max_bytes: int = 1 << 30
+    offline: bool = False
+    _size: Optional[int] = field(default=None, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+
+    @staticmethod
+    def cache_key(request: urllib.request.Request) -> str:
+        digest = hashlib.sha256()
+        digest.update(request.get_method().encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(request.full_url.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(request.data or b"")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.gz")
+
+    def _entries(self) -> list:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".gz"):
+                    path = os.path.join(root, name)
+                    entries.append((path, os.stat(path)))
+        return entries
+
+    def get(self, request: urllib.request.Request) -> Optional[bytes]:
+        """
+        Return the cached body for a request, if present and not expired.
+
+        In offline mode entries never expire, as they are all there is.
+        """
+        path = self._path(self.cache_key(request))
+        with self._lock:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return None
+            now = time.time()
+            expired = self.ttl is not None and now - stat.st_mtime > self.ttl
+            if expired and not self.offline:
+                os.remove(path)
+                if self._size is not None:
+                    self._size -= stat.st_size
+                return None
+            # mark as recently used, keeping the time it was cached
+            os.utime(path, (now, stat.st_mtime))
+            with open(path, "rb") as f:
+                body = f.read()
+        return gzip.decompress(body)
+
+    def put(self, request: urllib.request.Request, data: bytes) -> None:
+        """
+        Cache the body for a request, evicting the least recently used
+        entries if the cache grows past `max_bytes`.
+        """
+        path = self._path(self.cache_key(request))
+        body = gzip.compress(data)
+        with self._lock:
+            if self._size is None:
+                self._size = sum(stat.st_size for _, stat in self._entries())
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                self._size -= os.path.getsize(path)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(body)
+            os.replace(temp_path, path)
+            self._size += len(body)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_atime)
+        for path, stat in entries:
+            if self._size <= self.max_bytes:
+                break
+            os.remove(path)
+            self._size -= stat.st_size
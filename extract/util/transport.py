@@ -0,0 +1,176 @@
+from typing import Dict, Mapping, Tuple
+import gzip
+import http.client
+import io
+import queue
+import socket
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class Response:
+    """
+    A fully read HTTP response.
+    """
+
+    status: int
+    headers: Mapping
+    body: bytes
+
+
+class Transport(ABC):
+    """
+    Abstract class for sending urllib requests.
+    """
+
+    @abstractmethod
+    def send(
+        self, request: urllib.request.Request, timeout: float
+    ) -> Response:
+        """
+        Send a request and read its response.
+
+        Raises
+        ------
+        urllib.error.HTTPError
+            if the response has an error status
+        urllib.error.URLError
+            if the connection fails
+        """
+
+
+@dataclass(eq=False)
+class PooledTransport(Transport):
+    """
+    Transport that keeps HTTP/1.1 connections alive and reuses them
+    for later requests to the same host, from any thread.
+
+    Responses are requested gzip-encoded and decoded transparently.
+    """
+
+    max_idle_per_host: int = 10
+    accept_encoding: str = "gzip"
+    _pools: Dict[Tuple[str, str], queue.LifoQueue] = field(
+        default_factory=dict, init=False
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+
+    @staticmethod
+    def _new_connection(
+        scheme: str, netloc: str, timeout: float
+    ) -> http.client.HTTPConnection:
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=timeout)
+        return http.client.HTTPConnection(netloc, timeout=timeout)
+
+    def _pool(self, scheme: str, netloc: str) -> queue.LifoQueue:
+        with self._lock:
+            return self._pools.setdefault(
+                (scheme, netloc),
+                queue.LifoQueue(maxsize=self.max_idle_per_host),
+            )
+
+    def _checkout(
+        self, scheme: str, netloc: str, timeout: float
+    ) -> Tuple[http.client.HTTPConnection, bool]:
+        """Borrow an idle connection, or open a new one if none are idle."""
+        try:
+            conn = self._pool(scheme, netloc).get_nowait()
+        except queue.Empty:
+            return self._new_connection(scheme, netloc, timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _checkin(self, scheme: str, netloc: str, conn) -> None:
+        try:
+            self._pool(scheme, netloc).put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            while not pool.empty():
+                pool.get_nowait().close()
+
+    def _request_headers(self, request: urllib.request.Request) -> dict:
+        headers = dict(request.header_items())
+        headers.setdefault("Accept-Encoding", self.accept_encoding)
+        headers.setdefault("Connection", "keep-alive")
+        return headers
+
+    @staticmethod
+    def _decode(response: http.client.HTTPResponse, body: bytes) -> bytes:
+        encoding = response.headers.get("Content-Encoding", "").lower()
+        if encoding == "gzip":
+            return gzip.decompress(body)
+        return body
+
+    def send(
+        self, request: urllib.request.Request, timeout: float
+    ) -> Response:
+        url = urllib.parse.urlsplit(request.full_url)
+        selector = urllib.parse.urlunsplit(
+            ("", "", url.path or "/", url.query, "")
+        )
+        headers = self._request_headers(request)
+
+        conn, reused = self._checkout(url.scheme, url.netloc, timeout)
+        try:
+            try:
+                conn.request(
+                    request.get_method(), selector, request.data, headers
+                )
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionError):
+                # the server may have closed an idle connection,
+                # so retry once on a fresh one
+                conn.close()
+                if not reused:
+                    raise
+                conn = self._new_connection(url.scheme, url.netloc, timeout)
+                conn.request(
+                    request.get_method(), selector, request.data, headers
+                )
+                response = conn.getresponse()
+            body = self._decode(response, response.read())
+        except socket.timeout:
+            conn.close()
+            raise
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise urllib.error.URLError(e)
+
+        if response.will_close:
+            conn.close()
+        else:
+            self._checkin(url.scheme, url.netloc, conn)
+
+        if response.status >= 400:
+            raise urllib.error.HTTPError(
+                request.full_url,
+                response.status,
+                response.reason,
+                response.headers,
+                io.BytesIO(body),
+            )
+        return Response(
+            status=response.status, headers=response.headers, body=body
+        )
+
+
+_transport = PooledTransport()
+
+
+def get_transport() -> Transport:
+    """The Transport shared by every API in this process."""
+    return _transport
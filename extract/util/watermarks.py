@@ -0,0 +1,55 @@
+from typing import Optional
+import json
+import os
+import threading
+from datetime import datetime
+from dataclasses import dataclass, field
+
+
+@dataclass(eq=False)
+class WatermarkStore:
+    """
+    JSON file recording the newest id extracted for each query,
+    so that later runs only ask for newer results.
+
+    The file maps each query to its `newest_id` and the UTC time it was
+    last advanced, and is rewritten atomically on every update.
+    """
+
+    path: str = "watermarks.json"
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+
+    def _read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def get(self, query: str) -> Optional[str]:
+        with self._lock:
+            return self._read().get(query, {}).get("newest_id")
+
+    def update(self, query: str, newest_id: str) -> None:
+        """
+        Advance the watermark for a query; older ids are ignored.
+
+        Parameters
+        ----------
+        query: str
+            The search term
+        newest_id: str
+            The newest id returned by the latest run
+        """
+        with self._lock:
+            watermarks = self._read()
+            current = watermarks.get(query, {}).get("newest_id")
+            if current is not None and int(current) >= int(newest_id):
+                return
+            watermarks[query] = {
+                "newest_id": str(newest_id),
+                "updated_at": datetime.utcnow().isoformat(timespec="seconds"),
+            }
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(watermarks, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
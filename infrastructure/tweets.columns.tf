@@ -22,3 +22,52 @@ locals {
     },
   ]
 }
+
+locals {
+  typed_tweet_columns = [
+    {
+      "name" : "tweet_id",
+      "type" : "INT64",
+      "mode" : "REQUIRED",
+      "description" : "The Tweet's id, which rows are merged on."
+    },
+    {
+      "name" : "query",
+      "type" : "STRING",
+      "description" : "The search query whose results file the Tweet was last loaded from."
+    },
+    {
+      "name" : "lang",
+      "type" : "STRING",
+      "description" : "The Tweet's language, as detected by Twitter."
+    },
+    {
+      "name" : "created_at",
+      "type" : "TIMESTAMP",
+      "mode" : "REQUIRED",
+      "description" : "When the Tweet was posted, which rows are partitioned by."
+    },
+    {
+      "name" : "author_id",
+      "type" : "INT64",
+      "description" : "The id of the Tweet's author."
+    },
+    {
+      "name" : "text",
+      "type" : "STRING",
+      "description" : "The Tweet's text."
+    },
+    {
+      "name" : "hashtags",
+      "type" : "STRING",
+      "mode" : "REPEATED",
+      "description" : "The Tweet's hashtags, without the #."
+    },
+    {
+      "name" : "referenced_tweet_ids",
+      "type" : "INT64",
+      "mode" : "REPEATED",
+      "description" : "The ids of Tweets this Tweet quotes, replies to or retweets."
+    },
+  ]
+}
@@ -33,3 +33,33 @@ resource "google_bigquery_table" "tweets" {
   )
 
 }
+
+resource "google_bigquery_table" "typed_tweets" {
+  dataset_id          = google_bigquery_dataset.tweet-graphs.dataset_id
+  table_id            = "typed_tweets"
+  deletion_protection = var.deletion_protection
+
+  time_partitioning {
+    type  = "DAY"
+    field = "created_at"
+  }
+  clustering = ["query", "lang"]
+
+  schema = jsonencode(
+    concat(
+      local.meta_columns,
+      local.typed_tweet_columns
+    )
+  )
+
+}
+
+# one row per file merged into typed_tweets, written by the same script
+resource "google_bigquery_table" "typed_tweets_files" {
+  dataset_id          = google_bigquery_dataset.tweet-graphs.dataset_id
+  table_id            = "typed_tweets_files"
+  deletion_protection = var.deletion_protection
+
+  schema = jsonencode(local.meta_columns)
+
+}
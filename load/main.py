@@ -5,9 +5,12 @@ using a user-provided .sql or .py file.
 
 import argparse
 import json
+import sys
 from enum import Enum
 from util.sql_base import SQLBase
 from util.filter_args import filter_args
+from util.batch import QueryRunner, read_jobs
+from util.sql_enums import Synchronous
 from src.bigquery import SQLBigquery
 from src.sqlite import SQLSqlite
 
@@ -27,8 +30,21 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "query_file",
         type=str,
+        nargs="?",
         help="The query file to run.",
     )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        help="A directory of query files, or a JSONL manifest of "
+        + "{query_file, params, depends_on} jobs, to run in one process.",
+    )
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        default=4,
+        help="The maximum number of independent batch queries to run at once.",
+    )
     parser.add_argument(
         "--params",
         type=json.loads,
@@ -53,14 +69,129 @@ def parse_args() -> argparse.Namespace:
         type=json.loads,
         help="Credentials to use for the database connection.",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--pool_size",
+        type=int,
+        help="The number of connections to keep open in the pool. Ignored where "
+        + "connections are not pooled, as for SQLite database files.",
+    )
+    parser.add_argument(
+        "--pool_recycle",
+        type=int,
+        help="Seconds after which pooled connections are replaced.",
+    )
+    parser.add_argument(
+        "--no_pre_ping",
+        dest="pool_pre_ping",
+        action="store_false",
+        help="Skip checking that pooled connections are alive before use.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="A .jsonl, .csv or .parquet file in which to stream the results "
+        + "of query_file, rather than printing them.",
+    )
+    parser.add_argument(
+        "--arrow",
+        action="store_true",
+        help="Export the results of query_file as Arrow record batches into an "
+        + "--output .arrow, .feather or .parquet file, with the connector's "
+        + "fastest reader (the Storage Read API for BigQuery).",
+    )
+    parser.add_argument(
+        "--max_streams",
+        type=int,
+        default=4,
+        help="The most result streams to read in parallel with --arrow, "
+        + "where the database supports it.",
+    )
+    parser.add_argument(
+        "--fetch_size",
+        type=int,
+        default=10_000,
+        help="The number of result rows to fetch and hold at a time.",
+    )
+    parser.add_argument(
+        "--load_files",
+        type=str,
+        nargs="+",
+        help="JSONL or Parquet files to bulk load into --table.",
+    )
+    parser.add_argument(
+        "--merge_tweets",
+        type=str,
+        help="BigQuery only: a gs://bucket[/prefix] whose new .jsonl files to "
+        + "merge into the dataset.table --table, keyed on Tweet id.",
+    )
+    parser.add_argument(
+        "--raw_table",
+        type=str,
+        default="tweets.raw_tweets",
+        help="The dataset.table external table over the --merge_tweets files.",
+    )
+    parser.add_argument(
+        "--table",
+        type=str,
+        help="The [dataset.]table to bulk load into, defined in queries/tables.py, "
+        + "or the dataset.table to merge Tweets into.",
+    )
+    parser.add_argument(
+        "--fast_load",
+        dest="fast_bulk_load",
+        action="store_true",
+        default=None,
+        help="SQLite only: --load_files in one transaction, dropping the "
+        + "table's indexes first and rebuilding them after.",
+    )
+    parser.add_argument(
+        "--synchronous",
+        type=str.upper,
+        choices=[level.value for level in Synchronous],
+        help="SQLite only: the PRAGMA synchronous level, NORMAL by default.",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=10_000,
+        help="The number of rows to read and insert at a time.",
+    )
+    args = parser.parse_args()
+    modes = [args.query_file, args.batch, args.load_files, args.merge_tweets]
+    if sum(mode is not None for mode in modes) != 1:
+        parser.error(
+            "pass one of a query_file, --batch, --load_files or --merge_tweets"
+        )
+    if args.arrow and (args.query_file is None or args.output is None):
+        parser.error("--arrow requires a query_file and --output")
+    sqlite_options = [args.fast_bulk_load, args.synchronous]
+    if args.connector is not SQLSqlite and any(o is not None for o in sqlite_options):
+        parser.error("--fast_load and --synchronous require the sqllite connector")
+    if args.load_files is not None and args.table is None:
+        parser.error("--load_files requires --table")
+    if args.merge_tweets is not None:
+        if args.connector is not SQLBigquery:
+            parser.error("--merge_tweets requires the bigquery connector")
+        if args.table is None or "." not in args.table:
+            parser.error("--merge_tweets requires a dataset.table --table")
+    return args
 
 
 def main():
     args = parse_args()
 
     connector = args.connector
-    connector_args = filter_args(args, include_keys=["credentials"])
+    connector_args = filter_args(
+        args,
+        include_keys=[
+            "credentials",
+            "pool_size",
+            "pool_recycle",
+            "pool_pre_ping",
+            "fast_bulk_load",
+            "synchronous",
+        ],
+    )
     execute_args = filter_args(
         args,
         include_keys=[
@@ -73,9 +204,63 @@ def main():
     return_results = args.return_results
 
     sql = connector(**connector_args)
-    res = sql.execute_query_from_file(**execute_args)
-    if return_results:
-        print(res)
+
+    if args.load_files is not None:
+        from queries import tables
+
+        table = getattr(tables, args.table.split(".")[-1])
+        stats = sql.bulk_load(
+            args.load_files,
+            table,
+            batch_size=args.batch_size,
+            destination=args.table if "." in args.table else None,
+        )
+        print(stats)
+        return
+
+    if args.merge_tweets is not None:
+        files = sql.new_files(args.merge_tweets, args.table)
+        print(f"Merging {len(files)} new files into {args.table}")
+        stats = sql.merge_tweets(files, args.table, source=args.raw_table)
+        print(stats)
+        return
+
+    if args.batch is not None:
+        runner = QueryRunner(
+            sql, max_workers=args.max_workers, return_results=return_results
+        )
+        results = runner.run(read_jobs(args.batch, params=args.params))
+        if return_results:
+            for result in results:
+                if result.rows is not None:
+                    print(result.job.name, result.rows)
+        print(runner.report(results))
+        if not all(result.succeeded for result in results):
+            sys.exit(1)
+        return
+
+    if args.arrow:
+        row_count = sql.export_arrow_file(
+            args.query_file,
+            args.output,
+            args.params,
+            batch_size=args.fetch_size,
+            max_streams=args.max_streams,
+        )
+        print(f"Wrote {row_count} rows to {args.output}")
+    elif args.output is not None:
+        row_count = sql.write_query_results(
+            args.query_file, args.output, args.params, batch_size=args.fetch_size
+        )
+        print(f"Wrote {row_count} rows to {args.output}")
+    elif return_results:
+        for batch in sql.stream_query_file(
+            args.query_file, args.params, batch_size=args.fetch_size
+        ):
+            for row in batch.rows:
+                print(row)
+    else:
+        sql.execute_query_from_file(**execute_args)
 
 
 if __name__ == "__main__":
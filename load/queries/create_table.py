@@ -0,0 +1,9 @@
+import sqlalchemy as sa
+
+from queries import tables
+
+
+def query(params: dict = None, **kwargs):
+    """Create the table named by `params["table"]` in queries.tables"""
+    table = getattr(tables, params["table"])
+    return sa.schema.CreateTable(table, if_not_exists=True)
@@ -1,3 +1,65 @@
 import sqlalchemy as sa
 
 my_table = sa.Table("my_table", sa.MetaData(), sa.Column("one", sa.Integer))
+
+# written by `extract/process.py analyze`
+graph_metadata = sa.MetaData()
+
+hashtag_nodes = sa.Table(
+    "hashtag_nodes",
+    graph_metadata,
+    sa.Column("hashtag", sa.String, primary_key=True),
+    sa.Column("tweet_count", sa.Integer),
+    sa.Column("weighted_degree", sa.Integer),
+    sa.Column("pagerank", sa.Float),
+    sa.Column("community", sa.Integer),
+)
+
+hashtag_neighbours = sa.Table(
+    "hashtag_neighbours",
+    graph_metadata,
+    sa.Column("hashtag", sa.String, primary_key=True),
+    sa.Column("neighbour", sa.String, primary_key=True),
+    sa.Column("weight", sa.Integer),
+    sa.Column("rank", sa.Integer),
+)
+
+# pages written by extract/main.py, as in infrastructure/tweets.tables.tf
+tweets = sa.Table(
+    "tweets",
+    sa.MetaData(),
+    sa.Column("_id", sa.String, primary_key=True),
+    sa.Column("_created_at", sa.DateTime),
+    sa.Column("_filename", sa.String),
+    sa.Column("data", sa.JSON),
+    sa.Column("includes", sa.JSON),
+    sa.Column("errors", sa.JSON),
+    sa.Column("meta", sa.JSON),
+)
+
+# one row per Tweet, partitioned by day of created_at and clustered by
+# query and lang, as in infrastructure/tweets.tables.tf
+typed_tweets = sa.Table(
+    "typed_tweets",
+    sa.MetaData(),
+    sa.Column("_id", sa.String),
+    sa.Column("_created_at", sa.DateTime),
+    sa.Column("_filename", sa.String),
+    sa.Column("tweet_id", sa.BigInteger, primary_key=True),
+    sa.Column("query", sa.String),
+    sa.Column("lang", sa.String),
+    sa.Column("created_at", sa.TIMESTAMP, nullable=False),
+    sa.Column("author_id", sa.BigInteger),
+    sa.Column("text", sa.String),
+    sa.Column("hashtags", sa.ARRAY(sa.String)),
+    sa.Column("referenced_tweet_ids", sa.ARRAY(sa.BigInteger)),
+)
+
+# the files merged into typed_tweets, as in infrastructure/tweets.tables.tf
+typed_tweets_files = sa.Table(
+    "typed_tweets_files",
+    sa.MetaData(),
+    sa.Column("_id", sa.String),
+    sa.Column("_created_at", sa.DateTime),
+    sa.Column("_filename", sa.String, primary_key=True),
+)
@@ -1,11 +1,101 @@
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, List, Optional
 import os
+import queue
+import tempfile
+import threading
+from functools import cached_property
+from time import perf_counter
 from dataclasses import dataclass, field
 from enum import Enum
 
+import sqlalchemy as sa
+
+from util.bulk_load import LoadStats, encode_row, read_batches, table_rows
 from util.sql_base import SQLBase
 from util.sql_enums import ConnectionString
 
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# read streams' batches waiting to be yielded, per stream
+_QUEUED_BATCHES = 4
+
+# Stages the Tweets in the new @files of the {source} external table as
+# typed rows, one per Tweet id, then merges them into the {target} table
+# and records the files in the {ledger} table, in one transaction.
+# The target is only searched within the days the staged Tweets were
+# posted, so the MERGE reads those partitions rather than every one.
+MERGE_TWEETS = r"""
+DECLARE min_date, max_date DATE;
+
+CREATE TEMP TABLE staged AS
+SELECT
+    GENERATE_UUID() AS _id,
+    CURRENT_DATETIME("UTC") AS _created_at,
+    _FILE_NAME AS _filename,
+    CAST(JSON_VALUE(tweet.id) AS INT64) AS tweet_id,
+    -- files are named <query>_<date>[_since_<id>].jsonl
+    REGEXP_EXTRACT(
+        _FILE_NAME, r"([^/]*)_\d\d\d\d-\d\d-\d\d(?:_since_\d+)?\.jsonl$"
+    ) AS query,
+    JSON_VALUE(tweet.lang) AS lang,
+    TIMESTAMP(JSON_VALUE(tweet.created_at)) AS created_at,
+    SAFE_CAST(JSON_VALUE(tweet.author_id) AS INT64) AS author_id,
+    JSON_VALUE(tweet.text) AS text,
+    ARRAY(
+        SELECT JSON_VALUE(hashtag.tag)
+        FROM UNNEST(JSON_QUERY_ARRAY(tweet.entities.hashtags)) AS hashtag
+    ) AS hashtags,
+    ARRAY(
+        SELECT CAST(JSON_VALUE(referenced.id) AS INT64)
+        FROM UNNEST(JSON_QUERY_ARRAY(tweet.referenced_tweets)) AS referenced
+    ) AS referenced_tweet_ids
+FROM `{source}`, UNNEST(JSON_QUERY_ARRAY(data)) AS tweet
+WHERE
+    _FILE_NAME IN UNNEST(@files)
+    AND JSON_VALUE(tweet.id) IS NOT NULL
+    AND JSON_VALUE(tweet.created_at) IS NOT NULL
+-- a Tweet in several files is kept once, from the last file
+QUALIFY ROW_NUMBER() OVER (
+    PARTITION BY JSON_VALUE(tweet.id) ORDER BY _FILE_NAME DESC
+) = 1;
+
+SET (min_date, max_date) = (
+    SELECT AS STRUCT MIN(DATE(created_at)), MAX(DATE(created_at)) FROM staged
+);
+
+BEGIN TRANSACTION;
+
+MERGE `{target}` AS target
+USING staged
+ON
+    target.tweet_id = staged.tweet_id
+    AND DATE(target.created_at) BETWEEN min_date AND max_date
+WHEN MATCHED THEN UPDATE SET
+    _filename = staged._filename,
+    query = staged.query,
+    lang = staged.lang,
+    author_id = staged.author_id,
+    text = staged.text,
+    hashtags = staged.hashtags,
+    referenced_tweet_ids = staged.referenced_tweet_ids
+WHEN NOT MATCHED THEN INSERT (
+    _id, _created_at, _filename, tweet_id, query, lang, created_at,
+    author_id, text, hashtags, referenced_tweet_ids
+) VALUES (
+    staged._id, staged._created_at, staged._filename, staged.tweet_id,
+    staged.query, staged.lang, staged.created_at, staged.author_id,
+    staged.text, staged.hashtags, staged.referenced_tweet_ids
+);
+
+INSERT INTO `{ledger}` (_id, _created_at, _filename)
+SELECT GENERATE_UUID(), CURRENT_DATETIME("UTC"), file
+FROM UNNEST(@files) AS file
+WHERE file NOT IN (SELECT _filename FROM `{ledger}`);
+
+COMMIT TRANSACTION;
+"""
+
 
 @dataclass
 class SQLBigquery(SQLBase):
@@ -16,3 +106,342 @@ class SQLBigquery(SQLBase):
     )
 
     conn_string: ConnectionString = field(init=False, default=ConnectionString.BIGQUERY)
+
+    @cached_property
+    def bigquery_client(self):
+        """A BigQuery client, for the APIs the SQLAlchemy dialect does not expose"""
+        from google.cloud import bigquery
+
+        credentials_path = (self.credentials or {}).get("credentials_path")
+        if credentials_path is not None:
+            return bigquery.Client.from_service_account_json(credentials_path)
+        return bigquery.Client()
+
+    @cached_property
+    def storage_client(self):
+        """A Cloud Storage client, for listing the files to merge"""
+        from google.cloud import storage
+
+        return storage.Client(
+            project=self.bigquery_client.project,
+            credentials=self.bigquery_client._credentials,
+        )
+
+    @cached_property
+    def bigquery_storage(self):
+        """
+        A BigQuery Storage Read API client, for reading query results
+        as Arrow record batches.
+
+        Set this attribute to point exports at another endpoint,
+        e.g. a local stub implementing `create_read_session` and
+        `read_rows`.
+        """
+        from google.cloud import bigquery_storage
+
+        return bigquery_storage.BigQueryReadClient(
+            credentials=self.bigquery_client._credentials
+        )
+
+    def literal_query(self, query_file: str, params: Optional[dict] = None) -> str:
+        """
+        The SQL for a query file, with its parameters rendered inline,
+        for the APIs that take a query string
+        """
+        statement, bind_params = self.prepare_query_file(query_file, params)
+        if bind_params:
+            statement = statement.bindparams(**bind_params)
+        query = str(
+            statement.compile(
+                dialect=self.engine.dialect, compile_kwargs={"literal_binds": True}
+            )
+        )
+        self.log_query(query)
+        return query
+
+    def export_arrow(
+        self,
+        query_file: str,
+        params: Optional[dict] = None,
+        batch_size: int = 10_000,
+        max_streams: int = 1,
+    ) -> Iterator["pa.RecordBatch"]:
+        """
+        Run a query from its file, then read its results with the
+        BigQuery Storage Read API as Arrow record batches.
+
+        The query's results land in a (temporary) destination table, which
+        a read session splits into up to `max_streams` streams. Each stream
+        is read in its own thread, and record batches are yielded in the
+        order they arrive, so their order across streams is not fixed.
+        Batches are decoded straight from the API's Arrow IPC payloads.
+
+        Parameters
+        ----------
+        query_file: str
+            The .sql or .py file containing the query
+        params: Optional[dict]
+            Bind parameters for a .sql query, or the `params` argument
+            of a .py query's `query` function
+        batch_size: int
+            Unused, as the Read API picks the size of each batch
+        max_streams: int
+            The most streams to read in parallel. BigQuery may use fewer.
+
+        Yields
+        ------
+        batch: pa.RecordBatch
+        """
+        import pyarrow as pa
+
+        job = self.bigquery_client.query(self.literal_query(query_file, params))
+        job.result()
+        table = job.destination
+        if table is None:
+            # e.g. DDL, which has no results
+            return
+
+        session = self.bigquery_storage.create_read_session(
+            request={
+                "parent": f"projects/{self.bigquery_client.project}",
+                "read_session": {
+                    "table": f"projects/{table.project}/datasets/"
+                    + f"{table.dataset_id}/tables/{table.table_id}",
+                    "data_format": "ARROW",
+                },
+                "max_stream_count": max_streams,
+            }
+        )
+        if not session.streams:
+            # an empty table has no streams
+            return
+        schema = pa.ipc.read_schema(
+            pa.py_buffer(session.arrow_schema.serialized_schema)
+        )
+        yield from read_streams(
+            (
+                self.bigquery_storage.read_rows(stream.name)
+                for stream in session.streams
+            ),
+            schema,
+        )
+
+    def bulk_load(
+        self,
+        filenames: List[str],
+        table: sa.Table,
+        batch_size: int = 10_000,
+        destination: Optional[str] = None,
+    ) -> LoadStats:
+        """
+        Load JSONL or Parquet files into a table with one load job per file.
+
+        Rows are shaped for the table `batch_size` at a time and spooled to
+        a temporary newline-delimited JSON file, which is then sent as a
+        single load job, as load jobs are free but limited per table per day.
+
+        Parameters
+        ----------
+        filenames: List[str]
+            .jsonl(.gz/.zst) or .parquet files, one row per line or record
+        table: sa.Table
+            The table whose columns to load
+        batch_size: int
+            The number of rows to read at a time
+        destination: Optional[str]
+            The `[project.]dataset.table` to load into, by default the
+            table's schema and name
+
+        Returns
+        -------
+        stats: LoadStats
+        """
+        from google.cloud import bigquery
+
+        if destination is None:
+            destination = f"{table.schema}.{table.name}" if table.schema else table.name
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        stats = LoadStats()
+        start = perf_counter()
+        for filename in filenames:
+            with tempfile.TemporaryFile() as spool:
+                for batch in read_batches(filename, batch_size):
+                    spool.writelines(
+                        map(encode_row, table_rows(table, filename, batch))
+                    )
+                    stats.rows += len(batch)
+                spool.seek(0)
+                self.bigquery_client.load_table_from_file(
+                    spool, destination, job_config=job_config
+                ).result()
+            stats.files += 1
+            self.logger.info(f"Loaded {filename} into {destination}")
+        stats.elapsed = perf_counter() - start
+        return stats
+
+    def new_files(
+        self, source_uri: str, target: str, ledger: Optional[str] = None
+    ) -> List[str]:
+        """
+        The .jsonl files under a Cloud Storage prefix that have not been
+        merged into a table yet
+
+        Parameters
+        ----------
+        source_uri: str
+            A gs://bucket[/prefix] URI
+        target: str
+            The `[project.]dataset.table` the files are merged into
+        ledger: Optional[str]
+            The table of files already merged, `<target>_files` by default
+
+        Returns
+        -------
+        uris: List[str]
+            The gs:// URIs of the new files, in name order
+        """
+        bucket, _, prefix = source_uri.removeprefix("gs://").partition("/")
+        uris = {
+            f"gs://{bucket}/{blob.name}"
+            for blob in self.storage_client.list_blobs(bucket, prefix=prefix)
+            if blob.name.endswith(".jsonl")
+        }
+        merged = self.bigquery_client.query(
+            f"SELECT _filename FROM `{ledger or merge_ledger(target)}`"
+        ).result()
+        return sorted(uris - {row["_filename"] for row in merged})
+
+    def merge_tweets(
+        self,
+        files: List[str],
+        target: str,
+        source: str = "tweets.raw_tweets",
+        ledger: Optional[str] = None,
+    ) -> LoadStats:
+        """
+        Merge the Tweets in extracted .jsonl files into a native table
+        of typed columns, partitioned by day and clustered by query and
+        lang, as `typed_tweets` in infrastructure/tweets.tables.tf.
+
+        Rows are keyed on Tweet id, so merging a file again updates its
+        Tweets rather than duplicating them, and a Tweet found by several
+        queries is kept once. The files are recorded in the `ledger` table
+        that `new_files` checks, in the same transaction as the MERGE, so
+        one set of files is either merged and recorded or not at all.
+
+        Parameters
+        ----------
+        files: List[str]
+            The gs:// URIs of the files to merge, e.g. from `new_files`
+        target: str
+            The `[project.]dataset.table` to merge into
+        source: str
+            The external table over the files, whose `_FILE_NAME`
+            pseudo-column limits which files are read
+        ledger: Optional[str]
+            The table of files already merged, `<target>_files` by default
+
+        Returns
+        -------
+        stats: LoadStats
+            The files merged, and the rows inserted or updated
+        """
+        stats = LoadStats(files=len(files))
+        if not files:
+            return stats
+        from google.cloud import bigquery
+
+        start = perf_counter()
+        job = self.bigquery_client.query(
+            MERGE_TWEETS.format(
+                source=source,
+                target=target,
+                ledger=ledger or merge_ledger(target),
+            ),
+            job_config=bigquery.QueryJobConfig(
+                query_parameters=[
+                    bigquery.ArrayQueryParameter("files", "STRING", files)
+                ]
+            ),
+        )
+        job.result()
+        for child in self.bigquery_client.list_jobs(parent_job=job.job_id):
+            if child.statement_type == "MERGE":
+                stats.rows = child.num_dml_affected_rows or 0
+        stats.elapsed = perf_counter() - start
+        self.logger.info(f"Merged {len(files)} files into {target}")
+        return stats
+
+
+def merge_ledger(target: str) -> str:
+    """The table of files merged into `target`, as `<target>_files`"""
+    return f"{target}_files"
+
+
+def read_streams(
+    streams: Iterable[Iterable], schema: "pa.Schema"
+) -> Iterator["pa.RecordBatch"]:
+    """
+    Read Storage Read API streams in parallel, one thread per stream,
+    yielding their record batches as they arrive.
+
+    Each stream yields ReadRowsResponses, whose Arrow record batches are
+    serialized without their schema. At most a few batches per stream are
+    held at once, and closing the generator stops every reader.
+
+    Raises
+    ------
+    Exception
+        the first error raised while reading any stream
+    """
+    import pyarrow as pa
+
+    streams = list(streams)
+    batches: queue.Queue = queue.Queue(maxsize=_QUEUED_BATCHES * len(streams))
+    stopped = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read(stream: Iterable) -> None:
+        try:
+            for response in stream:
+                batch = pa.ipc.read_record_batch(
+                    pa.py_buffer(response.arrow_record_batch.serialized_record_batch),
+                    schema,
+                )
+                if not put(batch):
+                    return
+        except Exception as e:
+            put(e)
+        put(done)
+
+    threads = [
+        threading.Thread(target=read, args=(stream,), daemon=True) for stream in streams
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        remaining = len(threads)
+        while remaining:
+            item = batches.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stopped.set()
+        for thread in threads:
+            thread.join()
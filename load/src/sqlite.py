@@ -1,9 +1,18 @@
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Tuple, Union
 import os
+from time import perf_counter
 from dataclasses import dataclass, field
 
+import sqlalchemy as sa
+
+from util.arrow import rows_to_record_batch
+from util.bulk_load import LoadStats, read_batches, table_rows
+from util.query import compile_statement
 from util.sql_base import SQLBase
-from util.sql_enums import ConnectionString
+from util.sql_enums import ConnectionString, Synchronous
+
+if TYPE_CHECKING:
+    import pyarrow as pa
 
 
 @dataclass
@@ -13,3 +22,124 @@ class SQLSqlite(SQLBase):
     )
 
     conn_string: ConnectionString = field(init=False, default=ConnectionString.SQLITE)
+
+    # applied to every new connection, see `connect_statements`
+    journal_mode: str = "WAL"
+    synchronous: Union[Synchronous, str] = Synchronous.NORMAL
+    mmap_size: int = 256 * 1024**2
+    # negative sizes are in KiB, rather than pages
+    cache_size: int = -64 * 1024
+    busy_timeout: int = 5000
+    # load with one transaction, dropping indexes and rebuilding them after
+    fast_bulk_load: bool = False
+
+    @property
+    def connect_statements(self) -> Tuple[str, ...]:
+        """
+        The PRAGMAs of the connection profile.
+
+        In WAL mode readers do not block the writer, nor the writer
+        readers, and with synchronous=NORMAL commits do not wait on an
+        fsync. A memory-mapped file and a larger page cache make reads
+        cheaper, temporary tables and indexes are kept in memory, and
+        a writer waits up to `busy_timeout` ms for a lock before failing.
+        """
+        return (
+            f"PRAGMA journal_mode={self.journal_mode}",
+            f"PRAGMA synchronous={Synchronous(self.synchronous).value}",
+            f"PRAGMA mmap_size={int(self.mmap_size)}",
+            f"PRAGMA cache_size={int(self.cache_size)}",
+            "PRAGMA temp_store=MEMORY",
+            f"PRAGMA busy_timeout={int(self.busy_timeout)}",
+        )
+
+    def bulk_load(
+        self,
+        filenames: List[str],
+        table: sa.Table,
+        batch_size: int = 10_000,
+        destination: Optional[str] = None,
+    ) -> LoadStats:
+        """
+        Stream JSONL or Parquet files into a table.
+
+        With `fast_bulk_load` set, every file is loaded in one transaction,
+        with the table's indexes dropped first and rebuilt once at the end,
+        rather than updated on every insert. Readers see none of the rows
+        until the load commits, and a failed load rolls back the dropped
+        indexes along with its rows. Otherwise each file is its own transaction,
+        as in `SQLBase.bulk_load`.
+        """
+        if not self.fast_bulk_load:
+            return super().bulk_load(filenames, table, batch_size, destination)
+
+        stats = LoadStats()
+        start = perf_counter()
+        table.create(self.engine, checkfirst=True)
+        insert = sa.insert(table)
+        with self.engine.begin() as conn:
+            # pysqlite only opens a transaction before DML, so without this
+            # the DROP INDEXes would commit alone, and outlive a failed load
+            conn.exec_driver_sql("BEGIN")
+            # only explicit indexes; those behind PRIMARY KEY and UNIQUE
+            # constraints have no sql and cannot be dropped
+            indexes = conn.execute(
+                sa.text(
+                    "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                    + "AND tbl_name = :table AND sql IS NOT NULL"
+                ),
+                {"table": table.name},
+            ).fetchall()
+            for name, _ in indexes:
+                conn.exec_driver_sql(f'DROP INDEX "{name}"')
+            for filename in filenames:
+                for batch in read_batches(filename, batch_size):
+                    conn.execute(insert, table_rows(table, filename, batch))
+                    stats.rows += len(batch)
+                stats.files += 1
+                self.logger.info(f"Loaded {filename}")
+            for _, sql in indexes:
+                conn.exec_driver_sql(sql)
+            self.logger.info(f"Rebuilt {len(indexes)} indexes on {table.name}")
+        stats.elapsed = perf_counter() - start
+        return stats
+
+    def export_arrow(
+        self,
+        query_file: str,
+        params: Optional[dict] = None,
+        batch_size: int = 10_000,
+        max_streams: int = 1,
+    ) -> Iterator["pa.RecordBatch"]:
+        """
+        Execute a query from its file on a raw sqlite3 cursor, yielding
+        its results as Arrow record batches.
+
+        The statement is compiled once by SQLAlchemy, then executed by the
+        driver itself, so each `fetchmany` returns plain tuples that are
+        transposed straight into Arrow columns, skipping SQLAlchemy's
+        per-row result processing. SQLite has one result stream, so
+        `max_streams` is unused.
+        """
+        statement, bind_params = self.prepare_query_file(query_file, params)
+        compiled = compile_statement(statement, self.engine.dialect)
+        values = compiled.construct_params(bind_params)
+        # sqlite3 uses positional "?" parameters
+        positional = [values[name] for name in compiled.positiontup or ()]
+        self.log_query(str(compiled), **(params or {}))
+
+        with self.engine.connect() as conn:
+            cursor = conn.connection.cursor()
+            try:
+                cursor.arraysize = batch_size
+                cursor.execute(str(compiled), positional)
+                if cursor.description is None:
+                    return
+                columns = [column[0] for column in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows_to_record_batch(columns, rows)
+            finally:
+                cursor.close()
@@ -0,0 +1,51 @@
+import sqlite3
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.sqlite import SQLSqlite
+from util.arrow import RecordBatchFileWriter, rows_to_record_batch
+
+
+@pytest.fixture
+def null_first(tmp_path):
+    """A database whose first 5 rows have no `a`, and a query over them"""
+    database = str(tmp_path / "null_first.db")
+    with sqlite3.connect(database) as conn:
+        conn.execute("CREATE TABLE t (a INTEGER, b TEXT)")
+        conn.executemany(
+            "INSERT INTO t VALUES (?, ?)",
+            [(None, "x")] * 5 + [(i, "y") for i in range(5)],
+        )
+    query_file = tmp_path / "query.sql"
+    query_file.write_text("SELECT a, b FROM t ORDER BY rowid")
+    return SQLSqlite(credentials={"database": database}), str(query_file)
+
+
+@pytest.mark.parametrize("extension", [".arrow", ".parquet"])
+def test_null_first_batch_takes_later_type(null_first, tmp_path, extension):
+    sql, query_file = null_first
+    output = str(tmp_path / f"out{extension}")
+    assert sql.export_arrow_file(query_file, output, batch_size=5) == 10
+    if extension == ".parquet":
+        table = pq.read_table(output)
+    else:
+        table = pa.ipc.open_file(output).read_all()
+    assert table.schema.field("a").type == pa.int64()
+    assert table.column("a").to_pylist() == [None] * 5 + list(range(5))
+
+
+def test_column_without_values_is_written_as_strings(tmp_path):
+    output = str(tmp_path / "out.arrow")
+    with RecordBatchFileWriter(output, max_buffered_rows=2) as writer:
+        writer.write_batch(rows_to_record_batch(["a"], [(None,), (None,)]))
+        writer.write_batch(rows_to_record_batch(["a"], [(1,)]))
+    table = pa.ipc.open_file(output).read_all()
+    assert table.schema.field("a").type == pa.string()
+    assert table.column("a").to_pylist() == [None, None, "1"]
+
+
+def test_unsupported_extension_raises(tmp_path):
+    with pytest.raises(NotImplementedError):
+        RecordBatchFileWriter(str(tmp_path / "out.csv"))
@@ -0,0 +1,84 @@
+import json
+import logging
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from util.batch import QueryJob, QueryRunner, SkippedException, read_jobs
+
+
+class FakeSQL:
+    """Runs query files by name, failing those listed in `fail`"""
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.finished = []
+        self._lock = threading.Lock()
+
+    def run_query_file(self, query_file, params, return_results=False):
+        if query_file in self.fail:
+            raise RuntimeError(f"{query_file} broke")
+        with self._lock:
+            self.finished.append(query_file)
+        return SimpleNamespace(row_count=1, rows=None)
+
+
+def job(name, *depends_on):
+    return QueryJob(name=name, query_file=name, depends_on=depends_on)
+
+
+def test_jobs_run_after_their_dependencies():
+    jobs = [
+        job("report.sql", "staging.sql", "lookup.sql"),
+        job("staging.sql", "create.sql"),
+        job("lookup.sql", "create.sql"),
+        job("create.sql"),
+    ]
+    sql = FakeSQL()
+    results = QueryRunner(sql, max_workers=4).run(jobs)
+    assert [result.job.name for result in results] == [j.name for j in jobs]
+    assert all(result.succeeded for result in results)
+    for j in jobs:
+        for dependency in j.depends_on:
+            assert sql.finished.index(dependency) < sql.finished.index(j.name)
+
+
+def test_dependents_of_a_failed_job_are_skipped():
+    jobs = [
+        job("create.sql"),
+        job("staging.sql", "create.sql"),
+        job("report.sql", "staging.sql"),
+        job("other.sql"),
+    ]
+    sql = FakeSQL(fail={"create.sql"})
+    results = {r.job.name: r for r in QueryRunner(sql).run(jobs)}
+    assert isinstance(results["create.sql"].error, RuntimeError)
+    assert isinstance(results["staging.sql"].error, SkippedException)
+    assert isinstance(results["report.sql"].error, SkippedException)
+    assert results["other.sql"].succeeded
+    assert sql.finished == ["other.sql"]
+
+
+def test_dependency_cycle_is_rejected():
+    jobs = [job("a.sql", "c.sql"), job("b.sql", "a.sql"), job("c.sql", "b.sql")]
+    sql = FakeSQL()
+    with pytest.raises(ValueError, match="cycle between: a.sql, b.sql, c.sql"):
+        QueryRunner(sql).run(jobs)
+    assert sql.finished == []
+
+
+def test_manifest_jobs_get_cli_params(tmp_path):
+    manifest = tmp_path / "jobs.jsonl"
+    manifest.write_text(
+        json.dumps({"query_file": "a.sql"})
+        + "\n"
+        + json.dumps({"query_file": "b.sql", "params": {"day": "2022-12-02"}})
+        + "\n"
+    )
+    a, b = read_jobs(str(manifest), params={"day": "2022-12-01", "n": 5})
+    assert a.params == {"day": "2022-12-01", "n": 5}
+    assert b.params == {"day": "2022-12-02", "n": 5}
+    assert b.query_file == str(tmp_path / "b.sql")
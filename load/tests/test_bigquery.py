@@ -0,0 +1,171 @@
+from types import SimpleNamespace
+
+import pyarrow as pa
+import pytest
+
+from src.bigquery import SQLBigquery, read_streams
+
+SCHEMA = pa.schema([("tweet_id", pa.int64())])
+
+
+def response(*ids):
+    """A ReadRowsResponse carrying one serialized record batch"""
+    batch = pa.record_batch([pa.array(ids, pa.int64())], schema=SCHEMA)
+    return SimpleNamespace(
+        arrow_record_batch=SimpleNamespace(
+            serialized_record_batch=batch.serialize().to_pybytes()
+        )
+    )
+
+
+class StubQueryClient:
+    project = "project"
+
+    def __init__(self, destination=True):
+        self.destination = destination
+
+    def query(self, sql):
+        table = SimpleNamespace(project="project", dataset_id="_temp", table_id="t")
+        return SimpleNamespace(
+            result=lambda: None, destination=table if self.destination else None
+        )
+
+
+class StubReadClient:
+    """Serves each stream's responses, as the Storage Read API would"""
+
+    def __init__(self, streams):
+        self.streams = streams
+        self.requests = []
+
+    def create_read_session(self, request):
+        self.requests.append(request)
+        names = list(self.streams)[: request["max_stream_count"]]
+        return SimpleNamespace(
+            streams=[SimpleNamespace(name=name) for name in names],
+            arrow_schema=SimpleNamespace(
+                serialized_schema=SCHEMA.serialize().to_pybytes()
+            ),
+        )
+
+    def read_rows(self, name):
+        return iter(self.streams[name])
+
+
+def stub_bigquery(monkeypatch, streams, destination=True):
+    sql = SQLBigquery(credentials={})
+    sql.bigquery_client = StubQueryClient(destination)
+    sql.bigquery_storage = StubReadClient(streams)
+    monkeypatch.setattr(sql, "literal_query", lambda query_file, params=None: "")
+    return sql
+
+
+def read_ids(batches):
+    return sorted(pa.Table.from_batches(batches, SCHEMA)["tweet_id"].to_pylist())
+
+
+def test_export_reads_every_stream(monkeypatch):
+    streams = {
+        f"stream{i}": [response(i * 10 + j, i * 10 + j + 5) for j in range(3)]
+        for i in range(3)
+    }
+    sql = stub_bigquery(monkeypatch, streams)
+    batches = list(sql.export_arrow("query.sql", max_streams=3))
+    assert len(batches) == 9
+    assert read_ids(batches) == sorted(
+        id_ for i in range(3) for j in range(3) for id_ in (i * 10 + j, i * 10 + j + 5)
+    )
+    (request,) = sql.bigquery_storage.requests
+    assert request["max_stream_count"] == 3
+    assert request["read_session"]["table"] == (
+        "projects/project/datasets/_temp/tables/t"
+    )
+
+
+def test_export_of_empty_session_yields_nothing(monkeypatch):
+    assert list(stub_bigquery(monkeypatch, {}).export_arrow("query.sql")) == []
+
+
+def test_export_without_destination_yields_nothing(monkeypatch):
+    sql = stub_bigquery(monkeypatch, {"stream0": [response(1)]}, destination=False)
+    assert list(sql.export_arrow("query.sql")) == []
+    assert sql.bigquery_storage.requests == []
+
+
+def test_error_in_one_stream_is_raised():
+    def failing():
+        yield response(1)
+        raise ConnectionResetError("stream reset")
+
+    streams = [[response(2), response(3)], failing()]
+    with pytest.raises(ConnectionResetError):
+        list(read_streams(streams, SCHEMA))
+
+
+def test_closing_stops_every_reader():
+    streams = [(response(i) for i in range(1000)) for _ in range(2)]
+    batches = read_streams(streams, SCHEMA)
+    next(batches)
+    batches.close()
+    assert all(next(stream, None) is not None for stream in streams)
+
+
+class StubLedgerClient:
+    """Keeps the merge ledger that the MERGE script would write"""
+
+    def __init__(self, *merged):
+        self.merged = set(merged)
+        self.queries = []
+
+    def query(self, sql, job_config=None):
+        self.queries.append(sql)
+        if job_config is None:
+            rows = [{"_filename": name} for name in sorted(self.merged)]
+            return SimpleNamespace(result=lambda: rows)
+        (files,) = job_config.query_parameters
+        self.merged.update(files.values)
+        return SimpleNamespace(result=lambda: None, job_id="script")
+
+    def list_jobs(self, parent_job):
+        return [SimpleNamespace(statement_type="MERGE", num_dml_affected_rows=2)]
+
+
+def stub_merge(*merged, blobs=("a.jsonl", "b.jsonl", "notes.txt")):
+    sql = SQLBigquery(credentials={})
+    sql.bigquery_client = StubLedgerClient(*merged)
+    sql.storage_client = SimpleNamespace(
+        list_blobs=lambda bucket, prefix: [SimpleNamespace(name=b) for b in blobs]
+    )
+    return sql
+
+
+def test_new_files_skips_files_in_the_ledger():
+    sql = stub_merge("gs://raw/a.jsonl")
+    assert sql.new_files("gs://raw", "tweets.typed_tweets") == ["gs://raw/b.jsonl"]
+    (query,) = sql.bigquery_client.queries
+    assert query == "SELECT _filename FROM `tweets.typed_tweets_files`"
+
+
+def test_merge_records_files_so_a_rerun_merges_nothing():
+    pytest.importorskip("google.cloud.bigquery")
+    sql = stub_merge()
+    files = sql.new_files("gs://raw", "tweets.typed_tweets")
+    stats = sql.merge_tweets(files, "tweets.typed_tweets")
+    assert (stats.files, stats.rows) == (2, 2)
+    script = sql.bigquery_client.queries[-1]
+    assert "INSERT INTO `tweets.typed_tweets_files`" in script
+
+    files = sql.new_files("gs://raw", "tweets.typed_tweets")
+    assert files == []
+    assert sql.merge_tweets(files, "tweets.typed_tweets").files == 0
+    assert len(sql.bigquery_client.queries) == 3
+
+
+def test_rerun_after_merge_merges_nothing():
+    sql = stub_merge("gs://raw/a.jsonl", "gs://raw/b.jsonl")
+    files = sql.new_files("gs://raw", "tweets.typed_tweets")
+    assert files == []
+    stats = sql.merge_tweets(files, "tweets.typed_tweets")
+    assert (stats.files, stats.rows) == (0, 0)
+    # only the ledger was read
+    assert len(sql.bigquery_client.queries) == 1
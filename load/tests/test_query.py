@@ -0,0 +1,102 @@
+import os
+import sys
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from util.query import (
+    PyQuery,
+    SQLQuery,
+    clear_query_caches,
+    compile_statement,
+    load_module,
+    module_name,
+)
+
+QUERY_MODULE = """
+import sqlalchemy as sa
+
+CALLS = []
+
+
+def query(params):
+    CALLS.append(params)
+    return sa.select(sa.literal(params.get("n", 0)).label("n"))
+"""
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    clear_query_caches()
+    yield
+    clear_query_caches()
+
+
+def write(path, text, mtime_ns=None):
+    path.write_text(text)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def test_module_is_loaded_once_per_mtime(tmp_path):
+    path = write(tmp_path / "count.py", QUERY_MODULE + "VERSION = 1\n", 10**18)
+    module = load_module(path)
+    assert load_module(path) is module
+    assert sys.modules[module_name(path)] is module
+
+    write(tmp_path / "count.py", QUERY_MODULE + "VERSION = 2\n", 2 * 10**18)
+    edited = load_module(path)
+    assert edited is not module
+    assert edited.VERSION == 2
+    assert sys.modules[module_name(path)] is edited
+
+
+def test_same_file_names_get_their_own_modules(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    first = write(tmp_path / "a" / "query.py", "NAME = 'a'\n")
+    second = write(tmp_path / "b" / "query.py", "NAME = 'b'\n")
+    assert module_name(first) != module_name(second)
+    assert module_name(first).startswith("_query_query_py_")
+    assert (load_module(first).NAME, load_module(second).NAME) == ("a", "b")
+
+
+def test_sql_query_file_is_read_once_per_mtime(tmp_path):
+    path = write(tmp_path / "q.sql", "select 1", 10**18)
+    query = SQLQuery.find_query(path)
+    assert SQLQuery.find_query(path) is query
+
+    write(tmp_path / "q.sql", "select 2", 2 * 10**18)
+    assert str(SQLQuery.find_query(path)) == "select 2"
+
+
+def test_statement_is_built_once_per_params(tmp_path):
+    path = write(tmp_path / "count.py", QUERY_MODULE)
+    query = PyQuery.find_query(path)
+    one, _ = PyQuery.statement(query, {"n": 1})
+    assert PyQuery.statement(query, {"n": 1})[0] is one
+    two, _ = PyQuery.statement(query, {"n": 2})
+    assert two is not one
+    assert load_module(path).CALLS == [{"n": 1}, {"n": 2}]
+
+
+def test_statements_are_not_cached_when_opted_out(tmp_path):
+    path = write(tmp_path / "count.py", QUERY_MODULE + "CACHE_STATEMENTS = False\n")
+    query = PyQuery.find_query(path)
+    first, _ = PyQuery.statement(query, {"n": 1})
+    assert PyQuery.statement(query, {"n": 1})[0] is not first
+    assert load_module(path).CALLS == [{"n": 1}, {"n": 1}]
+
+
+def test_statement_is_compiled_once_per_dialect():
+    statement = sa.select(sa.literal(1))
+    sqlite = sa.create_engine("sqlite://").dialect
+    compiled = compile_statement(statement, sqlite)
+    assert compile_statement(statement, sqlite) is compiled
+    assert compile_statement(statement, sa.create_engine("sqlite://").dialect) is (
+        compiled
+    )
+    postgres = postgresql.dialect()
+    assert compile_statement(statement, postgres) is not compiled
@@ -0,0 +1,14 @@
+import pyarrow.parquet as pq
+
+from util.results import ResultBatch, get_result_writer
+
+
+def test_parquet_null_first_batch_takes_later_type(tmp_path):
+    output = str(tmp_path / "out.parquet")
+    with get_result_writer(output) as writer:
+        writer.write_batch(ResultBatch(["a", "b"], [(None, "x")] * 5))
+        writer.write_batch(ResultBatch(["a", "b"], [(i, "y") for i in range(5)]))
+    table = pq.read_table(output)
+    assert str(table.schema.field("a").type) == "int64"
+    assert table.column("a").to_pylist() == [None] * 5 + list(range(5))
+    assert pq.ParquetFile(output).num_row_groups == 2
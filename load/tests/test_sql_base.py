@@ -0,0 +1,95 @@
+import gzip
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import sqlalchemy as sa
+
+from src.sqlite import SQLSqlite
+from util.sql_base import dispose_engines, get_engine
+
+
+@pytest.fixture(autouse=True)
+def fresh_engines():
+    dispose_engines()
+    yield
+    dispose_engines()
+
+
+def test_engine_is_reused_per_credentials(tmp_path):
+    first = SQLSqlite(credentials={"database": str(tmp_path / "a.db")})
+    again = SQLSqlite(credentials={"database": str(tmp_path / "a.db")})
+    other = SQLSqlite(credentials={"database": str(tmp_path / "b.db")})
+    assert first.engine is first.engine
+    assert again.engine is first.engine
+    assert other.engine is not first.engine
+
+    engine = first.engine
+    dispose_engines()
+    assert first.engine is not engine
+
+
+def test_engine_options_are_part_of_the_key():
+    url = sa.engine.URL.create("sqlite")
+    engine = get_engine(url, pool_recycle=60)
+    assert get_engine(url, pool_recycle=60) is engine
+    assert get_engine(url, pool_recycle=120) is not engine
+    assert get_engine(url, ("PRAGMA cache_size = -1024",), pool_recycle=60) is not (
+        engine
+    )
+
+
+def test_pool_options_are_passed_through():
+    # in-memory SQLite pools one connection per thread
+    sql = SQLSqlite(credentials={}, pool_size=3, pool_recycle=60, pool_pre_ping=False)
+    pool = sql.engine.pool
+    assert isinstance(pool, sa.pool.SingletonThreadPool)
+    assert pool.size == 3
+    assert pool._recycle == 60
+    assert not pool._pre_ping
+
+
+def test_pool_size_is_dropped_for_pools_without_one(tmp_path):
+    sql = SQLSqlite(credentials={"database": str(tmp_path / "a.db")}, pool_size=3)
+    assert "pool_size" not in sql.engine_options
+    assert isinstance(sql.engine.pool, sa.pool.NullPool)
+
+
+def make_table():
+    return sa.Table(
+        "hashtags",
+        sa.MetaData(),
+        sa.Column("_id", sa.String, primary_key=True),
+        sa.Column("_created_at", sa.DateTime),
+        sa.Column("_filename", sa.String),
+        sa.Column("hashtag", sa.String),
+        sa.Column("tweet_count", sa.Integer),
+    )
+
+
+def test_bulk_load_jsonl_and_parquet(tmp_path):
+    jsonl = tmp_path / "a.jsonl.gz"
+    with gzip.open(jsonl, "wt") as f:
+        for i in range(5):
+            f.write(json.dumps({"hashtag": f"h{i}", "tweet_count": i}) + "\n")
+        # a partially written last line is skipped
+        f.write('{"hashtag": ')
+    parquet = tmp_path / "b.parquet"
+    pq.write_table(
+        pa.table({"hashtag": ["x", "y"], "tweet_count": [7, 8], "extra": [1, 2]}),
+        parquet,
+    )
+
+    sql = SQLSqlite(credentials={"database": str(tmp_path / "load.db")})
+    stats = sql.bulk_load([str(jsonl), str(parquet)], make_table(), batch_size=2)
+    assert (stats.files, stats.rows) == (2, 7)
+    assert stats.elapsed > 0
+    assert str(stats).startswith("Loaded 7 rows from 2 files in ")
+
+    with sql.engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT _filename, count(*), count(DISTINCT _id), sum(tweet_count) "
+            + "FROM hashtags GROUP BY _filename ORDER BY _filename"
+        ).fetchall()
+    assert rows == [("a.jsonl.gz", 5, 5, 10), ("b.parquet", 2, 2, 15)]
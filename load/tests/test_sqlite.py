@@ -0,0 +1,97 @@
+import json
+
+import pytest
+import sqlalchemy as sa
+
+from src.sqlite import SQLSqlite
+from util.sql_enums import Synchronous
+
+
+def make_table():
+    table = sa.Table(
+        "nodes",
+        sa.MetaData(),
+        sa.Column("hashtag", sa.String, primary_key=True),
+        sa.Column("community", sa.Integer),
+    )
+    sa.Index("ix_nodes_community", table.c.community)
+    return table
+
+
+def write_rows(path, rows):
+    with open(path, "w") as f:
+        f.writelines(json.dumps(row) + "\n" for row in rows)
+    return str(path)
+
+
+def index_names(sql):
+    with sql.engine.connect() as conn:
+        return [
+            name
+            for (name,) in conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index' "
+                + "AND sql IS NOT NULL"
+            )
+        ]
+
+
+def row_count(sql):
+    with sql.engine.connect() as conn:
+        return conn.exec_driver_sql("SELECT count(*) FROM nodes").scalar()
+
+
+def test_connections_use_the_pragma_profile(tmp_path):
+    sql = SQLSqlite(
+        credentials={"database": str(tmp_path / "profile.db")},
+        synchronous=Synchronous.FULL,
+        mmap_size=1024**2,
+        cache_size=-2048,
+        busy_timeout=1234,
+    )
+    with sql.engine.connect() as conn:
+        pragmas = {
+            pragma: conn.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+            for pragma in (
+                "journal_mode",
+                "synchronous",
+                "mmap_size",
+                "cache_size",
+                "temp_store",
+                "busy_timeout",
+            )
+        }
+    # synchronous FULL is 2, temp_store MEMORY is 2
+    assert pragmas == {
+        "journal_mode": "wal",
+        "synchronous": 2,
+        "mmap_size": 1024**2,
+        "cache_size": -2048,
+        "temp_store": 2,
+        "busy_timeout": 1234,
+    }
+
+
+def test_fast_bulk_load_rebuilds_indexes(tmp_path):
+    sql = SQLSqlite(
+        credentials={"database": str(tmp_path / "fast.db")}, fast_bulk_load=True
+    )
+    rows = [{"hashtag": f"h{i}", "community": i % 3} for i in range(25)]
+    stats = sql.bulk_load(
+        [write_rows(tmp_path / "nodes.jsonl", rows)], make_table(), batch_size=10
+    )
+    assert (stats.files, stats.rows) == (1, 25)
+    assert row_count(sql) == 25
+    assert index_names(sql) == ["ix_nodes_community"]
+
+
+def test_failed_fast_bulk_load_keeps_indexes(tmp_path):
+    sql = SQLSqlite(
+        credentials={"database": str(tmp_path / "failed.db")}, fast_bulk_load=True
+    )
+    table = make_table()
+    good = write_rows(tmp_path / "good.jsonl", [{"hashtag": "a", "community": 1}])
+    # the same primary key again fails the load
+    with pytest.raises(sa.exc.IntegrityError):
+        sql.bulk_load([good, good], table)
+    assert row_count(sql) == 0
+    assert index_names(sql) == ["ix_nodes_community"]
@@ -0,0 +1,153 @@
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Sequence
+from dataclasses import dataclass, field
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+ARROW_EXTENSIONS = (".arrow", ".feather", ".parquet")
+
+
+def rows_to_record_batch(
+    columns: List[str], rows: Sequence[Sequence]
+) -> "pa.RecordBatch":
+    """
+    Transpose a batch of DB-API rows into one Arrow array per column.
+
+    A column that is NULL in every row has the `null` type.
+    """
+    import pyarrow as pa
+
+    if not rows:
+        return pa.RecordBatch.from_arrays(
+            [pa.array([], pa.null()) for _ in columns], names=columns
+        )
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values) for values in zip(*rows)], names=columns
+    )
+
+
+def _fill_null_types(schema: "pa.Schema", other: "pa.Schema") -> "pa.Schema":
+    """`schema`, with its null-typed fields given their type in `other`"""
+    import pyarrow as pa
+
+    return pa.schema(
+        [other.field(f.name) if pa.types.is_null(f.type) else f for f in schema]
+    )
+
+
+@dataclass
+class RecordBatchFileWriter:
+    """
+    Writes Arrow record batches to an Arrow IPC (.arrow/.feather) or
+    .parquet file, whose schema is fixed when the file is opened.
+
+    Each batch's types are inferred from its values, so a column that is
+    NULL throughout a batch has the `null` type. Batches are held back
+    until every column has a real type, or `max_buffered_rows` are held,
+    after which columns with no values yet are written as strings.
+    Later batches are cast to the file's schema.
+
+    Requires the optional `pyarrow` package.
+
+    Raises
+    ------
+    NotImplementedError
+        if the file is not an Arrow or Parquet file
+    """
+
+    filename: str
+    max_buffered_rows: int = 100_000
+    schema: Optional["pa.Schema"] = field(default=None, init=False)
+    _writer: Any = field(default=None, init=False)
+    _buffered: List["pa.RecordBatch"] = field(default_factory=list, init=False)
+
+    def __post_init__(self):
+        if not self.filename.endswith(ARROW_EXTENSIONS):
+            raise NotImplementedError(
+                f"Cannot write Arrow batches to {self.filename}. "
+                + f"Use one of the following extensions:\n{', '.join(ARROW_EXTENSIONS)}"
+            )
+
+    def _open(self, schema: "pa.Schema") -> None:
+        import pyarrow as pa
+
+        # columns with no values yet
+        self.schema = pa.schema(
+            [
+                f.with_type(pa.string()) if pa.types.is_null(f.type) else f
+                for f in schema
+            ]
+        )
+        if self.filename.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(self.filename, self.schema)
+        else:
+            self._writer = pa.ipc.new_file(self.filename, self.schema)
+
+    def _write(self, batch: "pa.RecordBatch") -> None:
+        import pyarrow as pa
+
+        if batch.schema == self.schema:
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write_table(pa.Table.from_batches([batch]).cast(self.schema))
+
+    def _buffered_schema(self) -> "pa.Schema":
+        schema = self._buffered[0].schema
+        for batch in self._buffered[1:]:
+            schema = _fill_null_types(schema, batch.schema)
+        return schema
+
+    def _flush(self) -> None:
+        self._open(self._buffered_schema())
+        for batch in self._buffered:
+            self._write(batch)
+        self._buffered = []
+
+    def write_batch(self, batch: "pa.RecordBatch") -> None:
+        import pyarrow as pa
+
+        if self._writer is not None:
+            self._write(batch)
+            return
+        self._buffered.append(batch)
+        typed = not any(pa.types.is_null(f.type) for f in self._buffered_schema())
+        buffered_rows = sum(buffered.num_rows for buffered in self._buffered)
+        if typed or buffered_rows >= self.max_buffered_rows:
+            self._flush()
+
+    def close(self) -> None:
+        if self._buffered:
+            self._flush()
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_record_batches(batches: Iterable["pa.RecordBatch"], output: str) -> int:
+    """
+    Write Arrow record batches to an Arrow IPC (.arrow/.feather)
+    or .parquet file, one batch at a time
+
+    Returns
+    -------
+    row_count: int
+        The number of rows written
+
+    Raises
+    ------
+    NotImplementedError
+        if the output is not an Arrow or Parquet file
+    """
+    row_count = 0
+    with RecordBatchFileWriter(output) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            row_count += batch.num_rows
+    return row_count
@@ -0,0 +1,285 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import re
+from pathlib import Path
+from time import perf_counter
+from dataclasses import dataclass, field
+
+from util.sql_base import SQLBase
+from util.sql_enums import FileType
+
+# e.g. `-- depends_on: create_tables.sql, staging.py` in a query file
+DEPENDS_ON = re.compile(r"^\s*(?:--|#)\s*depends_on:(.*)$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class QueryJob:
+    """
+    A query file to run, with its parameters and the jobs it must follow.
+    """
+
+    name: str
+    query_file: str
+    params: dict = field(default_factory=dict)
+    depends_on: Tuple[str, ...] = ()
+
+
+@dataclass
+class QueryJobResult:
+    """
+    Outcome of running a single QueryJob.
+    """
+
+    job: QueryJob
+    elapsed: float = 0.0
+    row_count: Optional[int] = None
+    rows: Optional[List[Tuple]] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+    @property
+    def summary(self) -> str:
+        if self.row_count is None:
+            return f"{self.elapsed:.2f}s, no row count"
+        return f"{self.elapsed:.2f}s, {self.row_count} rows"
+
+
+class SkippedException(Exception):
+    """A job was not run because a job it depends on failed"""
+
+
+def read_depends_on(query_file: str) -> Tuple[str, ...]:
+    """The names in a query file's `depends_on:` comments"""
+    with open(query_file, "r") as f:
+        text = f.read()
+    return tuple(
+        name.strip()
+        for match in DEPENDS_ON.findall(text)
+        for name in match.split(",")
+        if name.strip()
+    )
+
+
+def read_directory(directory: str, params: Optional[dict] = None) -> List[QueryJob]:
+    """
+    Every .sql and .py query file in a directory, named by file name.
+
+    Dependencies are declared in the files themselves, with comments like
+    `-- depends_on: other.sql` or `# depends_on: other.sql`.
+
+    Parameters
+    ----------
+    directory: str
+        The directory of query files
+    params: Optional[dict]
+        Parameters to pass to every query
+
+    Returns
+    -------
+    jobs: List[QueryJob]
+        The jobs in file name order
+    """
+    suffixes = {file_type.value for file_type in FileType}
+    jobs = []
+    for path in sorted(Path(directory).iterdir()):
+        if path.suffix not in suffixes or path.name.startswith("__"):
+            continue
+        jobs.append(
+            QueryJob(
+                name=path.name,
+                query_file=str(path),
+                params=dict(params or {}),
+                depends_on=read_depends_on(str(path)),
+            )
+        )
+    return jobs
+
+
+def read_manifest(manifest_file: str, params: Optional[dict] = None) -> List[QueryJob]:
+    """
+    Read a JSONL manifest of query jobs.
+
+    Each line is a JSON object with a `query_file` key, relative to the
+    manifest, and optional `name`, `params` and `depends_on` keys.
+    Jobs are named by their `query_file` unless given a `name`.
+
+    Parameters
+    ----------
+    manifest_file: str
+        The JSONL manifest
+    params: Optional[dict]
+        Parameters to pass to every query, which a job's own `params`
+        override
+
+    Raises
+    ------
+    ValueError
+        if a line has no `query_file`
+    """
+    base = os.path.dirname(os.path.abspath(manifest_file))
+    jobs = []
+    with open(manifest_file, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "query_file" not in entry:
+                raise ValueError(
+                    f"Line {line_number} of {manifest_file} is missing query_file"
+                )
+            jobs.append(
+                QueryJob(
+                    name=entry.get("name", entry["query_file"]),
+                    query_file=os.path.join(base, entry["query_file"]),
+                    params={**(params or {}), **entry.get("params", {})},
+                    depends_on=tuple(entry.get("depends_on", ())),
+                )
+            )
+    return jobs
+
+
+def read_jobs(path: str, params: Optional[dict] = None) -> List[QueryJob]:
+    """Read jobs from a directory of query files or a JSONL manifest"""
+    if os.path.isdir(path):
+        return read_directory(path, params)
+    return read_manifest(path, params)
+
+
+def check_dependencies(jobs: Iterable[QueryJob]) -> None:
+    """
+    Raises
+    ------
+    ValueError
+        if job names repeat, a dependency is unknown, or dependencies
+        form a cycle
+    """
+    jobs = list(jobs)
+    names = [job.name for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("Query job names must be unique.")
+    remaining = {job.name: set(job.depends_on) for job in jobs}
+    for job in jobs:
+        unknown = set(job.depends_on) - remaining.keys()
+        if unknown:
+            raise ValueError(
+                f"{job.name} depends on unknown jobs: {', '.join(sorted(unknown))}"
+            )
+    while remaining:
+        ready = [name for name, depends_on in remaining.items() if not depends_on]
+        if not ready:
+            raise ValueError(
+                f"Dependency cycle between: {', '.join(sorted(remaining))}"
+            )
+        for name in ready:
+            del remaining[name]
+        for depends_on in remaining.values():
+            depends_on.difference_update(ready)
+
+
+@dataclass
+class QueryRunner:
+    """
+    Run query jobs against one connector, and so one engine and pool.
+
+    A job starts once every job it depends on has succeeded, and jobs
+    that do not depend on each other run concurrently.
+    """
+
+    sql: SQLBase
+    max_workers: int = 4
+    return_results: bool = False
+    results: List[QueryJobResult] = field(default_factory=list, init=False)
+
+    def _run_job(self, job: QueryJob) -> QueryJobResult:
+        start = perf_counter()
+        try:
+            outcome = self.sql.run_query_file(
+                job.query_file, job.params, return_results=self.return_results
+            )
+        except Exception as e:
+            return QueryJobResult(job=job, elapsed=perf_counter() - start, error=e)
+        return QueryJobResult(
+            job=job,
+            elapsed=perf_counter() - start,
+            row_count=outcome.row_count,
+            rows=outcome.rows,
+        )
+
+    def run(self, jobs: Iterable[QueryJob]) -> List[QueryJobResult]:
+        """
+        Run every job whose dependencies succeed, skipping the rest.
+
+        Parameters
+        ----------
+        jobs: Iterable[QueryJob]
+            The jobs to run
+
+        Returns
+        -------
+        results: List[QueryJobResult]
+            One result per job, in the order the jobs were given
+
+        Raises
+        ------
+        ValueError
+            if the jobs' dependencies are invalid
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        jobs = list(jobs)
+        check_dependencies(jobs)
+        results: Dict[str, QueryJobResult] = {}
+        pending = {job.name: job for job in jobs}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name, job in list(pending.items()):
+                    finished = [
+                        results.get(dependency) for dependency in job.depends_on
+                    ]
+                    failed = [
+                        result.job.name
+                        for result in finished
+                        if result is not None and not result.succeeded
+                    ]
+                    if failed:
+                        results[name] = QueryJobResult(
+                            job=job,
+                            error=SkippedException(f"{', '.join(failed)} failed"),
+                        )
+                        del pending[name]
+                    elif all(result is not None for result in finished):
+                        running[executor.submit(self._run_job, job)] = name
+                        del pending[name]
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    del running[future]
+                    results[result.job.name] = result
+                    status = result.summary if result.succeeded else "failed"
+                    self.sql.logger.info(f"{result.job.name} {status}")
+
+        self.results = [results[job.name] for job in jobs]
+        return self.results
+
+    @staticmethod
+    def report(results: List[QueryJobResult]) -> str:
+        """Summarise a batch run, with every query's timing and row count."""
+        failures = [result for result in results if not result.succeeded]
+        lines = [f"{len(results) - len(failures)} of {len(results)} queries succeeded."]
+        for result in results:
+            if result.succeeded:
+                lines.append(f"  {result.job.name}: {result.summary}")
+            else:
+                lines.append(
+                    f"  {result.job.name}: {type(result.error).__name__}: "
+                    + f"{result.error}"
+                )
+        return "\n".join(lines)
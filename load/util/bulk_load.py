@@ -0,0 +1,108 @@
+from typing import IO, Iterable, Iterator, List
+import gzip
+import io
+import json
+import os
+import uuid
+from datetime import date, datetime, timezone
+from dataclasses import dataclass
+
+import sqlalchemy as sa
+
+# added to every row when the table has them and the file does not
+META_COLUMNS = ("_id", "_created_at", "_filename")
+
+
+@dataclass
+class LoadStats:
+    """
+    Rows loaded, and how long it took
+    """
+
+    files: int = 0
+    rows: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"Loaded {self.rows} rows from {self.files} files "
+            + f"in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/s)"
+        )
+
+
+def open_jsonl(filename: str) -> IO[bytes]:
+    """Open a plain, gzip- or zstd-compressed JSONL file"""
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rb")
+    if filename.endswith(".zst"):
+        import zstandard
+
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(
+                open(filename, "rb"), read_across_frames=True, closefd=True
+            )
+        )
+    return open(filename, "rb")
+
+
+def read_batches(filename: str, batch_size: int) -> Iterator[List[dict]]:
+    """
+    Stream a JSONL or Parquet file as lists of at most `batch_size` rows
+    """
+    if filename.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for record_batch in pq.ParquetFile(filename).iter_batches(
+            batch_size=batch_size
+        ):
+            yield record_batch.to_pylist()
+        return
+
+    batch = []
+    with open_jsonl(filename) as f:
+        for line in f:
+            # skip blank lines and a partially written last line
+            if not line.endswith(b"\n") or not line.strip():
+                continue
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def table_rows(table: sa.Table, filename: str, batch: Iterable[dict]) -> List[dict]:
+    """
+    Shape rows for a table: keep only its columns, give every row every
+    column, and fill in any meta columns the table has
+    """
+    columns = [column.name for column in table.columns]
+    meta = {
+        # naive UTC, like BigQuery's current_datetime("UTC")
+        "_created_at": datetime.now(timezone.utc).replace(tzinfo=None),
+        "_filename": os.path.basename(filename),
+    }
+    rows = []
+    for row in batch:
+        shaped = {column: row.get(column) for column in columns}
+        for column in META_COLUMNS:
+            if column in shaped and shaped[column] is None:
+                shaped[column] = str(uuid.uuid4()) if column == "_id" else meta[column]
+        rows.append(shaped)
+    return rows
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_row(row: dict) -> bytes:
+    """A row as one line of newline-delimited JSON"""
+    return json.dumps(row, default=_json_default).encode("utf-8") + b"\n"
@@ -1,13 +1,94 @@
 from abc import ABC, abstractmethod, abstractproperty
-from typing import Optional, Callable, Union
+from typing import Any, Optional, Callable, Dict, Tuple, Union
 from importlib.util import spec_from_file_location, module_from_spec
+from types import ModuleType
+from weakref import WeakKeyDictionary
+import hashlib
+import json
+import os
 import sys
+import threading
 from dataclasses import dataclass, field
 
 import sqlalchemy as sa
 
 from util.sql_enums import FileType
 
+_cache_lock = threading.RLock()
+# absolute path -> (modification time, .sql query or .py module)
+_loaded: Dict[str, Tuple[float, Any]] = {}
+# query function -> encoded params -> statement
+_statements: "WeakKeyDictionary[Callable, Dict[str, Any]]" = WeakKeyDictionary()
+# statement -> (dialect class, paramstyle) -> compiled statement
+_compiled: "WeakKeyDictionary[Any, Dict[Tuple, Any]]" = WeakKeyDictionary()
+
+
+def _load_cached(file_path: str, load: Callable[[str], Any]) -> Any:
+    """
+    Load a query file once per modification time, so a query file
+    that has not changed is read or imported once per process
+    """
+    path = os.path.abspath(file_path)
+    mtime = os.stat(path).st_mtime_ns
+    with _cache_lock:
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        loaded = load(path)
+        _loaded[path] = (mtime, loaded)
+        return loaded
+
+
+def module_name(file_path: str) -> str:
+    """
+    A module name unique to a query file's path, so query files
+    with the same name do not replace each other in `sys.modules`
+    """
+    path = os.path.abspath(file_path)
+    digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:12]
+    stem = "".join(c if c.isalnum() else "_" for c in os.path.basename(path))
+    return f"_query_{stem}_{digest}"
+
+
+def load_module(file_path: str) -> ModuleType:
+    """Import a .py query file, or reuse it if it has not changed"""
+
+    def load(path: str) -> ModuleType:
+        name = module_name(path)
+        spec = spec_from_file_location(name, path)
+        module = module_from_spec(spec)
+        sys.modules[name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[name]
+            raise
+        return module
+
+    return _load_cached(file_path, load)
+
+
+def compile_statement(statement, dialect: sa.engine.Dialect):
+    """
+    Compile a statement for a dialect, once per statement and dialect,
+    for executing on a raw DB-API cursor. Statements executed through
+    SQLAlchemy reuse its own compiled cache instead.
+    """
+    key = (type(dialect), dialect.paramstyle)
+    with _cache_lock:
+        compiled = _compiled.setdefault(statement, {}).get(key)
+        if compiled is None:
+            compiled = _compiled[statement][key] = statement.compile(dialect=dialect)
+        return compiled
+
+
+def clear_query_caches() -> None:
+    """Forget every loaded query file, built statement and compiled statement"""
+    with _cache_lock:
+        _loaded.clear()
+        _statements.clear()
+        _compiled.clear()
+
 
 @dataclass(frozen=True)
 class Query(ABC):
@@ -22,7 +103,10 @@ class Query(ABC):
     @staticmethod
     @abstractmethod
     def execute_query(engine: sa.engine, query: str, **kwargs):
-        """Abstract method for executing a query"""
+        """
+        Abstract method for executing a query in a transaction,
+        returning its rows, or None if it returns none
+        """
 
     @staticmethod
     @abstractmethod
@@ -34,6 +118,16 @@ class Query(ABC):
     def get_query_string(query: Union[Callable, sa.sql.elements.TextClause]):
         """Abstract method for getting the string rep of a query"""
 
+    @staticmethod
+    @abstractmethod
+    def statement(
+        query: Union[Callable, sa.sql.elements.TextClause], params: dict
+    ) -> Tuple[sa.sql.expression.Executable, Optional[dict]]:
+        """
+        Abstract method for getting the statement to execute for a query,
+        and the bind parameters to execute it with
+        """
+
 
 @dataclass(frozen=True)
 class SQLQuery(Query):
@@ -45,21 +139,30 @@ class SQLQuery(Query):
 
     @staticmethod
     def execute_query(engine: sa.engine, query: str, **kwargs):
-        with engine.connect() as conn:
-            result = conn.execute(query, **kwargs)
-            conn.commit()
-        return result
+        # read the rows before the connection is returned to the pool,
+        # as the result is unusable once it is
+        with engine.begin() as conn:
+            result = conn.execute(query, kwargs)
+            return result.fetchall() if result.returns_rows else None
 
     @staticmethod
     def find_query(file_path: str):
-        with open(file_path, "r") as f:
-            query = sa.text(f.read())
-        return query
+        def load(path: str) -> sa.sql.elements.TextClause:
+            with open(path, "r") as f:
+                return sa.text(f.read())
+
+        return _load_cached(file_path, load)
 
     @staticmethod
     def get_query_string(query: sa.sql.elements.TextClause) -> str:
         return str(query)
 
+    @staticmethod
+    def statement(
+        query: sa.sql.elements.TextClause, params: dict
+    ) -> Tuple[sa.sql.elements.TextClause, Optional[dict]]:
+        return query, params or None
+
 
 @dataclass(frozen=True)
 class PyQuery(Query):
@@ -67,19 +170,36 @@ class PyQuery(Query):
 
     @staticmethod
     def execute_query(engine: sa.engine, query: sa.select, **kwargs):
-        with engine.connect() as conn:
+        with engine.begin() as conn:
             result = conn.execute(query(**kwargs))
-            conn.commit()
-        return result
+            return result.fetchall() if result.returns_rows else None
 
     @staticmethod
     def find_query(file_path: str, function_name: Optional[str] = "query") -> sa.select:
-        spec = spec_from_file_location(function_name, file_path)
-        module = module_from_spec(spec)
-        sys.modules[function_name] = module
-        spec.loader.exec_module(module)
-        return getattr(module, function_name)
+        return getattr(load_module(file_path), function_name)
 
     @staticmethod
     def get_query_string(query: Callable) -> str:
-        return str(query())
+        return str(PyQuery.statement(query, {})[0])
+
+    @staticmethod
+    def statement(
+        query: Callable, params: dict
+    ) -> Tuple[sa.sql.expression.Executable, None]:
+        """
+        Build a query function's statement, once per set of parameters.
+
+        A query module that sets `CACHE_STATEMENTS = False`, e.g. one that
+        reads data files, has its statement built on every call.
+        """
+        # parameters are passed to the query function, as main.py does
+        if not getattr(sys.modules.get(query.__module__), "CACHE_STATEMENTS", True):
+            return query(params=params), None
+        key = json.dumps(params, sort_keys=True, default=str)
+        with _cache_lock:
+            statement = _statements.setdefault(query, {}).get(key)
+        if statement is None:
+            statement = query(params=params)
+            with _cache_lock:
+                statement = _statements[query].setdefault(key, statement)
+        return statement, None
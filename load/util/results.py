@@ -0,0 +1,135 @@
+from typing import IO, Any, List, Sequence
+import csv
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from enum import Enum
+
+from util.arrow import RecordBatchFileWriter, rows_to_record_batch
+from util.bulk_load import encode_row
+
+
+@dataclass
+class ResultBatch:
+    """
+    A batch of rows fetched from a streaming result, with its column names
+    """
+
+    columns: List[str]
+    rows: List[Sequence[Any]]
+
+
+@dataclass
+class ResultWriter(ABC):
+    """
+    Abstract class for writing query results to a file one batch at a time,
+    so only one batch is held in memory.
+    """
+
+    filename: str
+
+    @abstractmethod
+    def write_batch(self, batch: ResultBatch) -> None:
+        """Abstract method for writing one batch of rows"""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Abstract method for finishing the file"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+@dataclass
+class JSONLResultWriter(ResultWriter):
+    """
+    Writes each row as one JSON object
+    """
+
+    file: IO = field(init=False)
+
+    def __post_init__(self):
+        self.file = open(self.filename, "wb")
+
+    def write_batch(self, batch: ResultBatch) -> None:
+        self.file.writelines(
+            encode_row(dict(zip(batch.columns, row))) for row in batch.rows
+        )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+@dataclass
+class CSVResultWriter(ResultWriter):
+    """
+    Writes a header row, then every row
+    """
+
+    file: IO = field(init=False)
+
+    def __post_init__(self):
+        self.file = open(self.filename, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.header_written = False
+
+    def write_batch(self, batch: ResultBatch) -> None:
+        if not self.header_written:
+            self.writer.writerow(batch.columns)
+            self.header_written = True
+        self.writer.writerows(
+            [
+                json.dumps(value) if isinstance(value, (dict, list)) else value
+                for value in row
+            ]
+            for row in batch.rows
+        )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+@dataclass
+class ParquetResultWriter(ResultWriter):
+    """
+    Writes each batch as one Parquet row group, with the schema
+    inferred as in util.arrow.RecordBatchFileWriter.
+
+    Requires the optional `pyarrow` package.
+    """
+
+    def __post_init__(self):
+        self.writer = RecordBatchFileWriter(self.filename)
+
+    def write_batch(self, batch: ResultBatch) -> None:
+        self.writer.write_batch(rows_to_record_batch(batch.columns, batch.rows))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class ResultWriters(Enum):
+    CSV = (".csv", CSVResultWriter)
+    JSONL = (".jsonl", JSONLResultWriter)
+    PARQUET = (".parquet", ParquetResultWriter)
+
+
+def get_result_writer(filename: str) -> ResultWriter:
+    """
+    Open a writer for a results file, picked by its extension
+
+    Raises
+    ------
+    NotImplementedError
+        if the extension is not one of the ResultWriters
+    """
+    for extension, writer in (writers.value for writers in ResultWriters):
+        if filename.endswith(extension):
+            return writer(filename)
+    raise NotImplementedError(
+        f"Cannot write results to {filename}. Use one of the following "
+        + f"extensions:\n{', '.join(writers.value[0] for writers in ResultWriters)}"
+    )
@@ -1,21 +1,107 @@
-from typing import Optional, Callable, List, Tuple, Dict, Union
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Callable,
+    Iterator,
+    List,
+    Tuple,
+    Dict,
+    Union,
+)
 import logging
 import sys
 import os
+import threading
+from time import perf_counter
 from pathlib import Path
 from abc import ABC
 from dataclasses import dataclass, field
 
 import sqlalchemy as sa
 
+from util.arrow import rows_to_record_batch, write_record_batches
+from util.bulk_load import LoadStats, read_batches, table_rows
+from util.results import ResultBatch, get_result_writer
 from util.sql_enums import ConnectionString
 from util.query import SQLQuery, PyQuery, Query
 
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+_engines: Dict[Tuple, sa.engine.base.Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(
+    url: sa.engine.URL, connect_statements: Tuple[str, ...] = (), **options
+) -> sa.engine.base.Engine:
+    """
+    Get the engine for a URL and set of engine options,
+    creating it and its connection pool on first use.
+
+    Engines are shared across the process, so every SQLBase instance
+    pointing at the same database reuses the same pool.
+
+    Parameters
+    ----------
+    url: sa.engine.URL
+    connect_statements: Tuple[str, ...]
+        Statements to run on every new database connection,
+        e.g. SQLite PRAGMAs
+    options:
+        Keyword arguments for `sa.engine.create_engine`
+    """
+    key = (url, connect_statements, tuple(sorted(options.items())))
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = sa.engine.create_engine(url, **options)
+            if connect_statements:
+                sa.event.listen(engine, "connect", _run_statements(connect_statements))
+    return engine
+
+
+def _run_statements(statements: Tuple[str, ...]) -> Callable:
+    def on_connect(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return on_connect
+
+
+def dispose_engines() -> None:
+    """Close every pooled connection and forget every engine"""
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.dispose()
+
+
+@dataclass
+class QueryOutcome:
+    """
+    The number of rows a query returned or changed, if the database
+    reports one, and the rows themselves if they were asked for
+    """
+
+    row_count: Optional[int]
+    rows: Optional[List[Tuple]] = None
+
 
 @dataclass
 class SQLBase(ABC):
     conn_string: ConnectionString
     credentials: dict
+    # None keeps the dialect's default pool size
+    pool_size: Optional[int] = None
+    pool_pre_ping: bool = True
+    pool_recycle: int = 3600
 
     @property
     def queriers(self) -> Dict[str, Query]:
@@ -35,14 +121,37 @@ class SQLBase(ABC):
         logger.handlers = [handler]
         return logger
 
+    @property
+    def url(self) -> sa.engine.URL:
+        return sa.engine.URL.create(self.conn_string.value, **self.credentials)
+
+    @property
+    def engine_options(self) -> dict:
+        options = dict(pool_pre_ping=self.pool_pre_ping, pool_recycle=self.pool_recycle)
+        if self.pool_size is not None:
+            url = self.url
+            pool_class = url.get_dialect().get_pool_class(url)
+            # ignored for pools without a size, e.g. file SQLite's NullPool
+            if issubclass(pool_class, (sa.pool.QueuePool, sa.pool.SingletonThreadPool)):
+                options["pool_size"] = self.pool_size
+        return options
+
+    @property
+    def connect_statements(self) -> Tuple[str, ...]:
+        """Statements to run on every new connection, none by default"""
+        return ()
+
     @property
     def engine(self) -> sa.engine.base.Engine:
         """
         Property for executing SQL queries, either
         string representations or SQLAlchemy select objects.
+
+        The engine, and its connection pool, are created once per URL
+        and reused by every later query.
         """
-        return sa.engine.create_engine(
-            sa.URL.create(self.conn_string.value, **self.credentials)
+        return get_engine(
+            self.url, connect_statements=self.connect_statements, **self.engine_options
         )
 
     def validate_query_file(self, query_file: str) -> None:
@@ -80,6 +189,37 @@ class SQLBase(ABC):
                 + f"{', '.join(self.queriers)}"
             )
 
+    def prepare_query_file(
+        self, query_file: str, params: Optional[dict] = None
+    ) -> Tuple[sa.sql.expression.Executable, Optional[dict]]:
+        """
+        Validate and read a query file, and build its statement
+
+        Returns
+        -------
+        statement: sa.sql.expression.Executable
+            The statement to execute
+        bind_params: Optional[dict]
+            The bind parameters to execute it with
+        """
+        self.validate_query_file(query_file)
+        querier = self.queriers.get(Path(query_file).suffix)
+        query = querier.find_query(query_file)
+        params = params or {}
+        return querier.statement(query, params)
+
+    def log_execution(self, conn: sa.engine.Connection, params: dict) -> None:
+        """
+        Log the next statement a connection executes, as the SQL that
+        SQLAlchemy compiled and cached for it, rather than compiling
+        the statement again just to log it
+        """
+
+        def log(conn, cursor, statement, parameters, context, executemany):
+            self.log_query(statement, **params)
+
+        sa.event.listen(conn, "before_cursor_execute", log, once=True)
+
     def execute_query_from_file(
         self,
         query_file: str,
@@ -87,30 +227,235 @@ class SQLBase(ABC):
         **kwargs,
     ) -> Optional[List[Tuple]]:
         """
-        Execute a query from its file, optionally returning the resulting
-        cursor object.
+        Execute a query from its file, optionally returning every row.
+
+        The rows are read before the connection is released. To read a
+        large result without holding it all in memory, use
+        `stream_query_file` instead.
 
         Params
         ------
         query_file: str
         return_results: Optional[bool]
+        params: Optional[dict]
+            Bind parameters for a .sql query, or the `params` argument
+            of a .py query's `query` function
 
         Returns
         -------
+        rows: Optional[List[Tuple]]
+            Every row, if `return_results` is set
+        """
+        outcome = self.run_query_file(
+            query_file, kwargs.get("params"), return_results=bool(return_results)
+        )
+        if return_results is True:
+            return outcome.rows
 
+    def run_query_file(
+        self,
+        query_file: str,
+        params: Optional[dict] = None,
+        return_results: bool = False,
+    ) -> QueryOutcome:
         """
-        file_suffix = Path(query_file).suffix
+        Execute a query from its file in a single transaction,
+        reading its results before the connection is released
 
-        querier = self.queriers.get(file_suffix)
-        query = querier.find_query(query_file)
+        Parameters
+        ----------
+        query_file: str
+            The .sql or .py file containing the query
+        params: Optional[dict]
+            Bind parameters for a .sql query, or the `params` argument
+            of a .py query's `query` function
+        return_results: bool
+            Whether to keep the returned rows, rather than only count them
 
-        # log query
-        query_string = querier.get_query_string(query)
-        self.log_query(query_string, **kwargs)
+        Returns
+        -------
+        outcome: QueryOutcome
+            The number of rows returned, or for statements that return
+            no rows, the number changed
+        """
+        statement, bind_params = self.prepare_query_file(query_file, params)
 
-        results = querier.execute_query(self.engine, query, **kwargs)
-        if return_results is True:
-            return results.fetchall()
+        with self.engine.begin() as conn:
+            self.log_execution(conn, params or {})
+            result = conn.execute(statement, bind_params or {})
+            if not result.returns_rows:
+                # -1 when the database does not count, e.g. for DDL
+                return QueryOutcome(
+                    row_count=result.rowcount if result.rowcount >= 0 else None
+                )
+            if return_results:
+                rows = result.fetchall()
+                return QueryOutcome(row_count=len(rows), rows=rows)
+            return QueryOutcome(row_count=sum(1 for _ in result))
+
+    def stream_query_file(
+        self,
+        query_file: str,
+        params: Optional[dict] = None,
+        batch_size: int = 10_000,
+    ) -> Iterator[ResultBatch]:
+        """
+        Execute a query from its file, yielding its rows in batches.
+
+        Results are streamed with a server-side cursor where the dialect
+        supports one, so at most `batch_size` rows are held at a time.
+        The connection stays checked out until the generator is exhausted
+        or closed.
+
+        Parameters
+        ----------
+        query_file: str
+            The .sql or .py file containing the query
+        params: Optional[dict]
+            Bind parameters for a .sql query, or the `params` argument
+            of a .py query's `query` function
+        batch_size: int
+            The number of rows to fetch at a time
+
+        Yields
+        ------
+        batch: ResultBatch
+            Column names, and up to `batch_size` rows
+        """
+        statement, bind_params = self.prepare_query_file(query_file, params)
+
+        with self.engine.begin() as conn:
+            self.log_execution(conn, params or {})
+            result = conn.execution_options(stream_results=True).execute(
+                statement, bind_params or {}
+            )
+            if not result.returns_rows:
+                return
+            columns = list(result.keys())
+            for partition in result.partitions(batch_size):
+                yield ResultBatch(columns=columns, rows=partition)
+
+    def write_query_results(
+        self,
+        query_file: str,
+        output: str,
+        params: Optional[dict] = None,
+        batch_size: int = 10_000,
+    ) -> int:
+        """
+        Stream a query's results into a .jsonl, .csv or .parquet file,
+        one batch at a time
+
+        Returns
+        -------
+        row_count: int
+            The number of rows written
+        """
+        row_count = 0
+        with get_result_writer(output) as writer:
+            for batch in self.stream_query_file(query_file, params, batch_size):
+                writer.write_batch(batch)
+                row_count += len(batch.rows)
+        return row_count
+
+    def export_arrow(
+        self,
+        query_file: str,
+        params: Optional[dict] = None,
+        batch_size: int = 10_000,
+        max_streams: int = 1,
+    ) -> Iterator["pa.RecordBatch"]:
+        """
+        Execute a query from its file, yielding its results as
+        Apache Arrow record batches.
+
+        By default, rows are streamed as in `stream_query_file` and each
+        batch is transposed into one Arrow array per column. Connectors
+        override this with a faster path where the database has one.
+
+        Requires the optional `pyarrow` package.
+
+        Parameters
+        ----------
+        query_file: str
+            The .sql or .py file containing the query
+        params: Optional[dict]
+            Bind parameters for a .sql query, or the `params` argument
+            of a .py query's `query` function
+        batch_size: int
+            The number of rows to fetch at a time
+        max_streams: int
+            The most result streams to read in parallel, where the
+            database can split a result into streams
+
+        Yields
+        ------
+        batch: pa.RecordBatch
+            Up to `batch_size` rows
+        """
+        for batch in self.stream_query_file(query_file, params, batch_size):
+            yield rows_to_record_batch(batch.columns, batch.rows)
+
+    def export_arrow_file(
+        self,
+        query_file: str,
+        output: str,
+        params: Optional[dict] = None,
+        batch_size: int = 10_000,
+        max_streams: int = 1,
+    ) -> int:
+        """
+        Export a query's results into an Arrow IPC (.arrow/.feather) or
+        .parquet file, one record batch at a time
+
+        Returns
+        -------
+        row_count: int
+            The number of rows written
+        """
+        return write_record_batches(
+            self.export_arrow(query_file, params, batch_size, max_streams), output
+        )
+
+    def bulk_load(
+        self,
+        filenames: List[str],
+        table: sa.Table,
+        batch_size: int = 10_000,
+        destination: Optional[str] = None,
+    ) -> LoadStats:
+        """
+        Stream JSONL or Parquet files into a table, inserting each batch
+        of rows with a single executemany, one transaction per file
+
+        Parameters
+        ----------
+        filenames: List[str]
+            .jsonl(.gz/.zst) or .parquet files, one row per line or record
+        table: sa.Table
+            The table to load into, created if it does not exist
+        batch_size: int
+            The number of rows to read and insert at a time
+        destination: Optional[str]
+            Unused, as the table's own name is loaded into
+
+        Returns
+        -------
+        stats: LoadStats
+        """
+        stats = LoadStats()
+        start = perf_counter()
+        table.create(self.engine, checkfirst=True)
+        insert = sa.insert(table)
+        for filename in filenames:
+            with self.engine.begin() as conn:
+                for batch in read_batches(filename, batch_size):
+                    conn.execute(insert, table_rows(table, filename, batch))
+                    stats.rows += len(batch)
+            stats.files += 1
+            self.logger.info(f"Loaded {filename}")
+        stats.elapsed = perf_counter() - start
+        return stats
 
     def reflect_table(self, table_name, schema_name):
         return sa.Table(
@@ -9,3 +9,12 @@ class ConnectionString(Enum):
 class FileType(Enum):
     PY = ".py"
     SQL = ".sql"
+
+
+class Synchronous(Enum):
+    """SQLite's `PRAGMA synchronous` levels"""
+
+    OFF = "OFF"
+    NORMAL = "NORMAL"
+    FULL = "FULL"
+    EXTRA = "EXTRA"